@@ -1,9 +1,14 @@
 import tkinter as tk
 from tkinter import ttk
+import multiprocessing
 import os
+import queue
+import threading
 import supporting_strat_auto as ssa
 from datetime import datetime
 from Initialization import install
+from helpful_tools.progress import QueueReporter
+from helpful_tools.workbook_cache import invalidate_cache
 
 
 ##########################
@@ -16,6 +21,9 @@ from Initialization import install
 
 ##########################
 
+# How often the window picks up progress and log events from the invoicing thread, in milliseconds
+POLL_INTERVAL_MS = 100
+
 
 class InvoiceGenerator:
     def __init__(self, master):
@@ -30,6 +38,10 @@ class InvoiceGenerator:
         self.install_packages_button = tk.Button(master, text="Install Packages", command=self.install_packages)
         self.install_packages_button.pack(pady=5)
 
+        # Create the 'Clear Cache' button
+        self.clear_cache_button = tk.Button(master, text="Clear Cache", command=self.clear_cache)
+        self.clear_cache_button.pack(pady=5)
+
         # Create the 'Create Invoices' button
         self.button = tk.Button(master, text="Create Invoices", command=self.create_invoices)
         self.button.pack(pady=20)
@@ -50,41 +62,99 @@ class InvoiceGenerator:
         self.command_window = tk.Text(master, height=10)
         self.command_window.pack()
 
+        # Invoicing runs in a worker thread that posts its progress to this queue
+        self.events = queue.Queue()
+        self.worker = None
+
     def install_packages(self):
         install(self, 'pandas')
         install(self, 'xlsxwriter')
         install(self, 'openpyxl')
         install(self, 'unidecode')
+        install(self, 'pyarrow')
 
-    def run_auto_code(self):
-        # Code for generating invoices goes here
-        self.log("Creating invoices...")
+    def clear_cache(self):
+        removed = invalidate_cache()
+        self.log(f'Workbook cache cleared ({removed} entries removed).')
 
-        path, month = ssa.line_invoice_generation(self)
-        self.log("Invoice generation complete.")
+    @staticmethod
+    def run_auto_code(reporter):
+        # Runs in the worker thread, so it only reports through the queue and never touches the window
+        reporter.log("Creating invoices...")
+
+        path, month = ssa.line_invoice_generation(reporter)
+        reporter.log("Invoice generation complete.")
 
         return path, month
 
     def create_invoices(self):
+        if self.worker is not None and self.worker.is_alive():
+            self.log("Invoices are already being created.")
+            return
+
         self.progress_bar["value"] = 0
-        self.progress_bar.update()
-        output_dir, output_month = self.run_auto_code()
+        self.button.config(state=tk.DISABLED)
+        reporter = QueueReporter(self.events)
+        self.worker = threading.Thread(target=reporter.run, args=(self.run_auto_code,), daemon=True)
+        self.worker.start()
+        self.master.after(POLL_INTERVAL_MS, self.drain_events)
+
+    def drain_events(self):
+        # Apply everything the worker posted since the last poll, redrawing the window once
+        finished = False
+        progress = None
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+
+            kind = event[0]
+            if kind == 'progress':
+                progress = event[1]
+            elif kind == 'log':
+                self.write_log(event[1], event[2], event[3])
+            elif kind == 'done':
+                finished = True
+                self.open_output(*event[1])
+            elif kind == 'error':
+                finished = True
+                self.write_log("Invoice generation failed:\n" + event[1])
+
+        if progress is not None:
+            self.progress_bar["value"] = progress
+
+        if finished:
+            self.button.config(state=tk.NORMAL)
+        else:
+            self.master.after(POLL_INTERVAL_MS, self.drain_events)
+
+    def open_output(self, output_dir, output_month):
         os.startfile(output_dir)
         invoice_file = os.path.join(output_dir, "Aviad_BNB_" + output_month + ".xlsx")
         os.startfile(invoice_file)
 
     def log(self, message, no_time=False):
-        # Append the message to the command window
+        # Append the message to the command window and redraw it right away, for work done on the main thread
+        self.write_log(message, no_time)
+        self.command_window.update()
 
-        now = datetime.now()
+    def write_log(self, message, no_time=False, logged_at=None):
+        # Append the message to the command window, stamped with the time it was logged (defaults to now)
+
+        now = logged_at or datetime.now()
         current_time = now.strftime("%H:%M:%S")
         if no_time:
             self.command_window.insert(tk.END, message + "\n")
         else:
             self.command_window.insert(tk.END, current_time + ": " + message + "\n")
-        self.command_window.update()
+        self.command_window.see(tk.END)
 
 
-root = tk.Tk()
-invoice_generator = InvoiceGenerator(root)
-root.mainloop()
+if __name__ == '__main__':
+    # The input workbooks are loaded in worker processes. They re-import this module, so the window must only be
+    # created by the parent, and the frozen .exe needs freeze_support to start them.
+    multiprocessing.freeze_support()
+    root = tk.Tk()
+    invoice_generator = InvoiceGenerator(root)
+    root.mainloop()
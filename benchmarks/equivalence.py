@@ -0,0 +1,168 @@
+"""
+Differential check between two invoicing engines.
+
+Both engines run on their own copy of the same input files, starting from the same reference numbers, and their
+invoice workbooks are compared cell by cell (see helpful_tools.workbook_diff). The diff report is saved as JSON and
+the exit code is 1 when the workbooks differ, so the check can gate a change to the pipeline.
+
+    python -m benchmarks.equivalence --model-dir ModelFiles
+    python -m benchmarks.equivalence --synthetic 2023-04 --scale 5
+    python -m benchmarks.equivalence --workbooks old.xlsx new.xlsx
+
+The legacy engine builds its paths with backslashes, so it only runs on Windows.
+"""
+import argparse
+import os
+import shutil
+import sys
+import traceback
+from datetime import datetime
+
+import supporting_strat_auto as ssa
+from helpful_tools import *
+from helpful_tools.synthetic_portfolio import generate_portfolio, scaled_portfolio
+
+# Reference numbers both engines start from
+START_NUMBERS = (30000, 1, 1)
+
+
+class LegacyApp:
+    """
+    Stand-in for the window, for the legacy pipeline. It sets app.progress_bar['value'] and calls update() itself.
+    """
+
+    def __init__(self, reporter):
+        self.reporter = reporter
+        self.progress_bar = self
+
+    def __setitem__(self, key, value):
+        self.reporter.progress(value)
+
+    def update(self):
+        pass
+
+    def log(self, message, no_time=False):
+        self.reporter.log(message, no_time)
+
+
+def run_legacy(reporter, work_dir, month, year):
+    """
+    Run supporting_strat_auto_OLDFILE from work_dir. It reads ModelFiles and writes its reports there.
+
+    The legacy pipeline takes the month from the Airbnb file name, so month and year are not used.
+
+    Returns:
+        str: Path of the invoice workbook.
+    """
+    import supporting_strat_auto_OLDFILE as legacy
+    path, month_name = legacy.line_invoice_generation(LegacyApp(reporter))
+    # The legacy pipeline joins the workbook path with a backslash
+    return path + '\\' + invoice_workbook_name(month_name)
+
+
+def run_current(reporter, work_dir, month, year):
+    """
+    Run supporting_strat_auto on the ModelFiles of work_dir.
+
+    Returns:
+        str: Path of the invoice workbook.
+    """
+    path, month_name = ssa.line_invoice_generation(reporter, model_dir=os.path.join(work_dir, 'ModelFiles'),
+                                                   month=month, year=year)
+    return os.path.join(path, invoice_workbook_name(month_name))
+
+
+ENGINES = {'legacy': run_legacy, 'current': run_current}
+
+
+def run_engine(name, model_dir, work_dir, month=None, year=None, reporter=None):
+    """
+    Run an engine on a fresh copy of model_dir. Both engines read and write the working directory, so the run
+    changes into work_dir/name and changes back afterwards.
+
+    Args:
+        name (str): Engine name, a key of ENGINES.
+        model_dir (str): Directory holding the input files. It is copied, not changed.
+        work_dir (str): Directory the engines run in.
+        month (int, optional): Month to invoice. Defaults to the month in the Airbnb file name.
+        year (int, optional): Year of month.
+        reporter (optional): Progress sink. Defaults to a NullReporter.
+
+    Returns:
+        str: Absolute path of the invoice workbook.
+    """
+    engine_dir = os.path.join(work_dir, name)
+    shutil.rmtree(engine_dir, ignore_errors=True)
+    shutil.copytree(model_dir, os.path.join(engine_dir, 'ModelFiles'))
+
+    cwd = os.getcwd()
+    os.chdir(engine_dir)
+    try:
+        write_reference_numbers(*START_NUMBERS, month or 0, year or 0)
+        workbook = ENGINES[name](reporter or NullReporter(), engine_dir, month, year)
+        return os.path.abspath(workbook)
+    finally:
+        os.chdir(cwd)
+
+
+def parse_month(value):
+    """
+    Parse a YYYY-MM month argument into (month, year).
+    """
+    try:
+        date = datetime.strptime(value, '%Y-%m')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Expected a month as YYYY-MM, got "{value}".')
+    return date.month, date.year
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the invoice workbooks of two invoicing engines.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--model-dir', help='Directory holding the input files.')
+    source.add_argument('--synthetic', type=parse_month, metavar='YYYY-MM',
+                        help='Generate a synthetic portfolio for this month and run on it.')
+    source.add_argument('--workbooks', nargs=2, metavar=('EXPECTED', 'ACTUAL'),
+                        help='Compare two existing workbooks without running the engines.')
+    parser.add_argument('--scale', type=float, default=1.0, help='Size of the synthetic portfolio. Defaults to 1.')
+    parser.add_argument('--expected', choices=list(ENGINES), default='legacy', help='Reference engine.')
+    parser.add_argument('--actual', choices=list(ENGINES), default='current', help='Engine under test.')
+    parser.add_argument('--work-dir', default=os.path.join('benchmarks', 'work', 'equivalence'))
+    parser.add_argument('--tolerance', type=float, default=MONEY_TOLERANCE,
+                        help=f'Largest difference between equal numbers. Defaults to {MONEY_TOLERANCE}.')
+    parser.add_argument('--sort-rows', action='store_true', help='Ignore the order of the rows in each sheet.')
+    parser.add_argument('--max-cell-diffs', type=int, default=50, help='Differing cells listed per sheet.')
+    parser.add_argument('--report', default=None, help='Diff report file. Defaults to diff_report.json in the work '
+                                                      'directory.')
+    args = parser.parse_args(argv)
+
+    work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    if args.workbooks:
+        expected, actual = args.workbooks
+    else:
+        month = year = None
+        model_dir = args.model_dir
+        if args.synthetic:
+            month, year = args.synthetic
+            model_dir = os.path.join(work_dir, 'ModelFiles')
+            shutil.rmtree(model_dir, ignore_errors=True)
+            generate_portfolio(model_dir, month, year, **scaled_portfolio(args.scale))
+        try:
+            expected = run_engine(args.expected, model_dir, work_dir, month, year)
+            actual = run_engine(args.actual, model_dir, work_dir, month, year)
+        except Exception:
+            print(traceback.format_exc(), file=sys.stderr)
+            print('An engine failed, nothing was compared.', file=sys.stderr)
+            return 2
+
+    report = compare_workbooks(expected, actual, money_tolerance=args.tolerance, max_cell_diffs=args.max_cell_diffs,
+                               sort_rows=args.sort_rows)
+    report_path = write_diff_report(report, args.report or os.path.join(work_dir, 'diff_report.json'))
+    print(format_diff_report(report))
+    print(f'Diff report saved to {report_path}')
+    return 0 if report['equivalent'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+Benchmarks of the invoicing pipeline at fixed portfolio sizes.
+
+Every size gets a synthetic portfolio (see helpful_tools.synthetic_portfolio). The main stages are timed on their own,
+on the same loaded inputs and with a number of repeats, and then the whole pipeline runs once with its own stage
+spans. Results are written as JSON to benchmarks/results so runs can be compared over time. The exit status is 1 when
+any stage or full run failed.
+
+    python -m benchmarks.pipeline --sizes small medium --repeat 3
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import traceback
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import supporting_strat_auto as ssa
+from helpful_tools import *
+from helpful_tools.synthetic_portfolio import generate_portfolio
+
+# Portfolio sizes. 'large' produces about 1M rows in the Airbnb payout export.
+SIZES = {
+    'small': {'owners': 62, 'listings': 100, 'reservations': 2_500, 'vrbo_reservations': 250},
+    'medium': {'owners': 620, 'listings': 1_000, 'reservations': 25_000, 'vrbo_reservations': 2_500},
+    'large': {'owners': 6_200, 'listings': 10_000, 'reservations': 330_000, 'vrbo_reservations': 25_000},
+}
+FILENAMES = ['reservations', 'airbnb', 'Current', 'VRBO_']
+BENCHMARK_MONTH = (4, 2023)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+REPLACE_RE = "[^A-Za-z0-9_ -:&]+"
+
+
+def time_stage(function, repeat):
+    """
+    Run function repeat times and return its timings. A failing stage is reported instead of stopping the run.
+
+    Returns:
+        tuple: ({'runs': [...], 'median_seconds': ...} or {'error': traceback}, result of the last run).
+    """
+    runs = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            result = function()
+        except Exception:
+            return {'runs': runs, 'error': traceback.format_exc()}, None
+        runs.append(time.perf_counter() - started)
+    return {'runs': runs, 'median_seconds': statistics.median(runs)}, result
+
+
+def enrich(dataframes):
+    # Same enrichment as line_invoice_generation, on copies so every repeat starts from the loaded frames
+    frames = {key: df.copy() for key, df in dataframes.items()}
+    cleaning = frames['cleaning']
+    for key in ['bnb', 'check']:
+        frames[key] = reformat_and_update_files(frames[key], cleaning)
+    frames['vrbo'] = reformat_and_update_files(frames['vrbo'], cleaning, 'Property ID', 'VRBO_ID', reformat=False)
+    return clean_dataframes(frames)
+
+
+def prepare(frames):
+    # Same column preparation as line_invoice_generation
+    bnb_col = prepare_dataframe_columns(frames['bnb'], ['Listing', 'Amount', 'Type', 'Confirmation Code', 'Nights'],
+                                        REPLACE_RE, text_columns=['Listing'])
+    cleaning_col = prepare_dataframe_columns(frames['cleaning'],
+                                             ['ListingBNB', 'QBO', 'Cleaning', 'Tax_Location', 'Pest', 'Landscape',
+                                              'Internet/Cable', 'Bus_Lic', 'VRBO_ID', 'Code', 'Output'], REPLACE_RE,
+                                             text_columns=['ListingBNB', 'QBO'])
+    customer_col = prepare_dataframe_columns(frames['customer_info'],
+                                             ['Customer-QBO', 'Expense_Flat', 'Credit', 'Clean', 'Hosp', 'Management',
+                                              'Magpercent'], REPLACE_RE, text_columns=['Customer-QBO'])
+    check_col = prepare_dataframe_columns(frames['check'], ['Listing'], REPLACE_RE)
+    vrbo_col = pd.DataFrame(frames['vrbo'], columns=['Property ID', 'Reservation ID', 'Payout', 'Nights', 'Check-out'])
+    bnb_col = remove_extra_spaces(bnb_col, ['Listing'])
+    cleaning_col = remove_extra_spaces(cleaning_col, ['ListingBNB'])
+    check_col = remove_extra_spaces(check_col, ['Listing'])
+    return bnb_col, cleaning_col, customer_col, check_col, vrbo_col
+
+
+def benchmark_size(name, portfolio, work_dir, repeat, seed=0):
+    """
+    Generate the portfolio of one size and time every stage on it.
+
+    Returns:
+        dict: Portfolio arguments, input row counts, per-stage timings and the end to end run report.
+    """
+    month, year = BENCHMARK_MONTH
+    size_dir = os.path.join(work_dir, name)
+    model_dir = os.path.join(size_dir, 'ModelFiles')
+    shutil.rmtree(size_dir, ignore_errors=True)
+    os.makedirs(size_dir)
+
+    result = {'portfolio': portfolio, 'stages': {}}
+    started = time.perf_counter()
+    paths = generate_portfolio(model_dir, month, year, seed=seed, **portfolio)
+    result['generate_seconds'] = time.perf_counter() - started
+
+    reporter = NullReporter()
+    report_dir = os.path.join(size_dir, 'Report')
+    os.makedirs(report_dir)
+    stages = result['stages']
+    cache_dir = os.path.join(size_dir, 'WorkbookCache')
+
+    def load_cold():
+        invalidate_cache(cache_dir)
+        return load_files(reporter, model_dir, FILENAMES, report_dir, cache_dir=cache_dir)[0]
+
+    stages['load_cold'], dataframes = time_stage(load_cold, repeat)
+    if dataframes is None:
+        return result
+    stages['load_warm'], _ = time_stage(
+        lambda: load_files(reporter, model_dir, FILENAMES, report_dir, cache_dir=cache_dir)[0], repeat)
+    result['rows'] = {key: len(df) for key, df in dataframes.items() if len(df)}
+
+    stages['reformat_and_update_files'], frames = time_stage(lambda: enrich(dataframes), repeat)
+    if frames is None:
+        return result
+    stages['prepare_dataframe_columns'], prepared = time_stage(lambda: prepare(frames), repeat)
+    if prepared is None:
+        return result
+    bnb_col, cleaning_col, customer_col, check_col, vrbo_col = prepared
+
+    stages['find_diff_and_concat'], _ = time_stage(
+        lambda: (find_diff_and_concat(bnb_col, cleaning_col, 'Listing', 'ListingBNB'),
+                 find_diff_and_concat(vrbo_col, cleaning_col, 'Property ID', 'VRBO_ID')), repeat)
+    stages['aggregate_customer_data'], unit = time_stage(
+        lambda: aggregate_customer_data(customer_col, cleaning_col, bnb_col, check_col, vrbo_col, month), repeat)
+    if unit is not None:
+        invoice_date, due_date = generate_dates(month, year)
+        tax_rates = build_tax_rates(frames.get('tax_rates'))
+        stages['invoicing'], _ = time_stage(
+            lambda: process_invoices(reporter, sort_and_prepare_unit(unit.copy()), invoice_date, due_date, month,
+                                     30000, 1, 1, tax_rates), repeat)
+
+    def vrbo_store():
+        store_path = os.path.join(size_dir, VRBO_STORE_NAME)
+        if os.path.exists(store_path):
+            os.remove(store_path)
+        with VrboStore(store_path) as store:
+            store.import_organizer(paths['vrbo_organizer'])
+            return carry_over_vrbo_stays(frames['vrbo'], store, month, year)
+
+    stages['carry_over_vrbo_stays'], _ = time_stage(vrbo_store, repeat)
+    result['end_to_end'] = run_end_to_end(size_dir, model_dir, month, year)
+    return result
+
+
+def run_end_to_end(size_dir, model_dir, month, year):
+    """
+    Run the whole pipeline once, writing the workbook, and return its stage report.
+
+    size_dir is the workspace of the run: its report folder, reference numbers and warehouse are written there.
+    """
+    timer = StageTimer()
+    workspace = Workspace(size_dir, model_dir)
+    try:
+        write_reference_numbers(30000, 1, 1, month, year, workspace.numbers_file)
+        ssa.line_invoice_generation(NullReporter(), month=month, year=year, timer=timer, workspace=workspace)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    report = timer.to_dict()
+    if error:
+        report['error'] = error
+    return report
+
+
+def environment():
+    """
+    Describe the machine and library versions, so results from different runs can be told apart.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def format_summary(results):
+    """
+    Return one line per size and stage with the median time.
+    """
+    lines = []
+    for name, result in results['sizes'].items():
+        lines.append(f'{name}: {result["portfolio"]}')
+        for stage, timing in result['stages'].items():
+            value = f'{timing["median_seconds"]:10.3f} s' if 'median_seconds' in timing else '    failed'
+            lines.append(f'  {stage:<28}{value}')
+        end_to_end = result.get('end_to_end')
+        if end_to_end:
+            value = 'failed' if 'error' in end_to_end else f'{end_to_end["total_wall_seconds"]:10.3f} s'
+            lines.append(f'  {"end to end":<28}{value}')
+    return '\n'.join(lines)
+
+
+def failures(results):
+    """
+    Return the errors of the stages and full runs that failed, by '<size> <stage>'.
+    """
+    errors = {}
+    for name, result in results['sizes'].items():
+        for stage, timing in result['stages'].items():
+            if 'error' in timing:
+                errors[f'{name} {stage}'] = timing['error']
+        if 'error' in (result.get('end_to_end') or {}):
+            errors[f'{name} end to end'] = result['end_to_end']['error']
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the invoicing pipeline on synthetic portfolios.')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small', 'medium'])
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage. The median is reported.')
+    parser.add_argument('--work-dir', default=os.path.join('benchmarks', 'work'),
+                        help='Where the synthetic portfolios and outputs are written.')
+    parser.add_argument('--output', default=None, help='Results file. Defaults to benchmarks/results/<time>.json.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    work_dir = os.path.abspath(args.work_dir)
+    results = {'started': datetime.now().isoformat(timespec='seconds'), 'repeat': args.repeat,
+               'environment': environment(), 'sizes': {}}
+    for name in args.sizes:
+        print(f'Benchmarking {name}...', flush=True)
+        results['sizes'][name] = benchmark_size(name, SIZES[name], work_dir, args.repeat, args.seed)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2, default=str)
+
+    print(format_summary(results))
+    print(f'Results saved to {output}')
+
+    # A benchmark that crashes must not pass silently
+    errors = failures(results)
+    for stage, error in errors.items():
+        print(f'\n{stage} failed:\n{error}', file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,21 @@
+from .customer_data_aggregation import *
+from .data_utilities import *
+from .date_and_reference import *
+from .excel_utilities import *
+from .exporters import *
+from .file_management import *
+from .initial_df_creation import *
+from .invoice_processing import *
+from .listing_management import *
+from .money import *
+from .progress import *
+from .record_buffer import *
+from .sales_tax import *
+from .source_schemas import *
+from .stage_timer import *
+from .vrbo_store import *
+from .warehouse import *
+from .workbook_cache import *
+from .workbook_diff import *
+from .workbook_writer import *
+from .workspace import *
@@ -2,6 +2,8 @@
 import numpy as np
 import pandas as pd
 
+from .money import from_cents, to_cents
+
 
 def isnan(value):
     """Check if a value is NaN."""
@@ -11,10 +13,19 @@ def isnan(value):
         return False
 
 
+UNIT_COLUMNS = ['Customer', 'Listing', 'Income', 'CleaningFee', 'Checkouts', 'TaxLocation', 'Pest', 'Landscape',
+                'Internet/Cable', 'Bus_Lic', 'Expense', 'CreditMemo', 'Clean', 'Hosp', 'Management', 'Magpercent',
+                'VRBO_ID', 'VRBO_PAYOUT', 'VRBO_Nights', 'Code', 'BNB_90_Day', 'VRBO_90_Day']
+
+
 def aggregate_customer_data(customer_col, cleaning_col, bnb_col, check_col, vrbo_col, month):
     """
     Aggregates data across multiple dataframes to create a comprehensive customer unit dataframe.
 
+    Each source is summarized with a single groupby and the summaries are joined onto the customer listings, so the
+    cost grows linearly with the number of listings and payout rows. Payouts are summed in cents, so the income
+    columns hold exact cent amounts.
+
     Args:
         customer_col (pd.DataFrame): DataFrame containing customer-QBO information.
         cleaning_col (pd.DataFrame): DataFrame containing cleaning listings and related information.
@@ -24,61 +35,86 @@ def aggregate_customer_data(customer_col, cleaning_col, bnb_col, check_col, vrbo
         month (int): Current month for processing.
 
     Returns:
-        pd.DataFrame: Aggregated unit dataframe with comprehensive customer data.
+        pd.DataFrame: Aggregated unit dataframe with comprehensive customer data, one row per customer listing.
     """
-    unit = pd.DataFrame()
-    for customer in customer_col['Customer-QBO']:
-        customer_listing = cleaning_col[cleaning_col['QBO'] == customer]
-        for index, row in customer_listing.iterrows():
-            vrbo_90_day_amount = bnb_90_day_amount = income = vrbo_payout = vrbo_nights = 0
-            vrbo_id = 'none'
-            listing = bnb_col[bnb_col['Listing'] == row['ListingBNB']]
-            if not listing.empty:
-                # Logic for BNB amount and reservation count
-                income, bnb_90_day_amount = calculate_bnb_income(listing, month)
-
-            reservation_count = len(check_col[check_col['Listing'] == row['ListingBNB']])
-            vrbo_payout, vrbo_nights, vrbo_90_day_amount = calculate_vrbo_payout(row['VRBO_ID'], vrbo_col, month)
-
-            unit_new = pd.DataFrame({
-                'Customer': [customer],
-                'Listing': [row['ListingBNB']],
-                'Income': [income],
-                'CleaningFee': [row['Cleaning']],
-                'Checkouts': [reservation_count],
-                'TaxLocation': [row['Tax_Location']],
-                # Add other columns as per the original structure
-                'VRBO_ID': [vrbo_id],
-                'VRBO_PAYOUT': [vrbo_payout],
-                'VRBO_Nights': [vrbo_nights],
-                'BNB_90_Day': [bnb_90_day_amount],
-                'VRBO_90_Day': [vrbo_90_day_amount]
-                # Continue adding other fields
-            })
-            unit = pd.concat([unit, unit_new], ignore_index=True)
-
-    unit.columns = ['Customer', 'Listing', 'Income', 'CleaningFee', 'Checkouts', 'TaxLocation',
-                    'VRBO_ID', 'VRBO_PAYOUT', 'VRBO_Nights', 'BNB_90_Day', 'VRBO_90_Day']
-    return unit
+    # One row per (customer, listing), in customer order and then listing order
+    listings = customer_col.merge(cleaning_col, left_on='Customer-QBO', right_on='QBO', how='inner')
+
+    bnb_summary = summarize_bnb_income(bnb_col)
+    checkouts = check_col['Listing'].astype(object).value_counts()
+    vrbo_summary = summarize_vrbo_payout(vrbo_col, month)
+
+    listing_key = listings['ListingBNB']
+    has_vrbo = listings['VRBO_ID'].notnull()
+    vrbo_key = listings['VRBO_ID'].where(has_vrbo)
+
+    unit = pd.DataFrame({
+        'Customer': listings['Customer-QBO'],
+        'Listing': listing_key,
+        'Income': from_cents(listing_key.map(bnb_summary['Income']).fillna(0)),
+        'CleaningFee': listings['Cleaning'],
+        'Checkouts': listing_key.map(checkouts).fillna(0).astype(int),
+        'TaxLocation': listings['Tax_Location'],
+        'Pest': listings['Pest'],
+        'Landscape': listings['Landscape'],
+        'Internet/Cable': listings['Internet/Cable'],
+        'Bus_Lic': listings['Bus_Lic'],
+        'Expense': listings['Expense_Flat'],
+        'CreditMemo': listings['Credit'],
+        'Clean': listings['Clean'],
+        'Hosp': listings['Hosp'],
+        'Management': listings['Management'],
+        'Magpercent': listings['Magpercent'],
+        'VRBO_ID': listings['VRBO_ID'].astype(object).where(has_vrbo, 'none'),
+        'VRBO_PAYOUT': from_cents(vrbo_key.map(vrbo_summary['VRBO_PAYOUT']).fillna(0)),
+        'VRBO_Nights': vrbo_key.map(vrbo_summary['VRBO_Nights']).fillna(0).astype(int),
+        'Code': listings['Code'],
+        'BNB_90_Day': from_cents(listing_key.map(bnb_summary['BNB_90_Day']).fillna(0)),
+        'VRBO_90_Day': from_cents(vrbo_key.map(vrbo_summary['VRBO_90_Day']).fillna(0)),
+    }, columns=UNIT_COLUMNS)
+    return unit.reset_index(drop=True)
+
+
+def summarize_bnb_income(bnb_col):
+    """
+    Calculates total income and 90 day term amounts for every Airbnb listing.
 
+    Pass-through rows do not count as income, but every row of a stay longer than 89 nights counts towards the
+    90 day amount.
+
+    Returns:
+        pd.DataFrame: 'Income' and 'BNB_90_Day' in cents, indexed by listing.
+    """
+    pass_through = bnb_col['Type'].astype(object).str.contains('Pass', case=False, regex=False, na=False)
+    amounts = pd.DataFrame({
+        'Listing': bnb_col['Listing'].astype(object),
+        'Income': to_cents(bnb_col['Amount'].where(~pass_through, 0)),
+        'BNB_90_Day': to_cents(bnb_col['Amount'].where(bnb_col['Nights'] > 89, 0)),
+    })
+    return amounts.groupby('Listing', sort=False)[['Income', 'BNB_90_Day']].sum()
 
-def calculate_bnb_income(listing, month):
-    """Calculates total income and 90 day term amounts for Airbnb listings."""
-    income = listing['Amount'].sum()
-    bnb_90_day_amount = listing[listing['Nights'] > 89]['Amount'].sum()
-    return income, bnb_90_day_amount
 
+def summarize_vrbo_payout(vrbo_col, month):
+    """
+    Calculates total payout, cleaning count and 90 day term amounts for every VRBO property.
 
-def calculate_vrbo_payout(vrbo_id, vrbo_col, month):
-    """Calculates total payout, nights, and 90 day term amounts for VRBO listings."""
-    if isnan(vrbo_id):
-        return 0, 0, 0
+    The cleaning count is the number of reservations, less the rows checking out in another month since their
+    cleaning is invoiced in that month.
 
-    vrbo_payouts = vrbo_col[vrbo_col['Property ID'] == vrbo_id]
-    vrbo_payout = vrbo_payouts['Payout'].sum()
-    vrbo_nights = vrbo_payouts['Nights'].sum()
-    vrbo_90_day_amount = vrbo_payouts[vrbo_payouts['Nights'] > 89]['Payout'].sum()
-    return vrbo_payout, vrbo_nights, vrbo_90_day_amount
+    Returns:
+        pd.DataFrame: 'VRBO_PAYOUT' and 'VRBO_90_Day' in cents and 'VRBO_Nights', indexed by property ID.
+    """
+    payouts = pd.DataFrame({
+        'Property ID': vrbo_col['Property ID'],
+        'Reservation ID': vrbo_col['Reservation ID'],
+        'VRBO_PAYOUT': to_cents(vrbo_col['Payout']),
+        'VRBO_90_Day': to_cents(vrbo_col['Payout'].where(vrbo_col['Nights'] > 89, 0)),
+        'Other_Month': vrbo_col['Check-out'].dt.month != month,
+    })
+    grouped = payouts.groupby('Property ID', sort=False)
+    summary = grouped[['VRBO_PAYOUT', 'VRBO_90_Day']].sum()
+    summary['VRBO_Nights'] = grouped['Reservation ID'].nunique(dropna=False) - grouped['Other_Month'].sum()
+    return summary
 
 
 def sort_and_prepare_unit(unit):
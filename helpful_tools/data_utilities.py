@@ -1,25 +1,69 @@
 import math
-import re
 
 import pandas as pd
 
+LISTING_KEY_REGEX = r"[^A-Za-z0-9_]+"
+
 
 def reformat_and_update_files(df, customer_df, listing_column='Listing', customer_column='ListingBNB', reformat=True):
     """
     Reformat listings in a DataFrame and update customer codes based on another DataFrame.
-    """
-    replace_regex = r"[^A-Za-z0-9_]+"
-    for index, row in df.iterrows():
-        listing = row[listing_column]
-        if pd.notnull(listing) and reformat:
-            listing = re.sub(replace_regex, ' ', listing).strip()
-            customer_info = customer_df[customer_df[customer_column] == listing]
-            if not customer_info.empty:
-                df.at[index, 'Code'] = customer_info['Code'].iloc[0]
-                df.at[index, 'Customer'] = customer_info['QBO'].iloc[0]
+
+    Listing keys are normalized in one vectorized pass on both sides and joined against a lookup table holding the
+    first Code and QBO of each listing, so the cost grows linearly with the number of rows. Rows without a match keep
+    their current Code and Customer.
+
+    Args:
+        df (pd.DataFrame): Export to enrich (Airbnb, Reservations or VRBO).
+        customer_df (pd.DataFrame): Cleaning Fee Report with the listing, 'Code' and 'QBO' columns.
+        listing_column (str): Listing column of df.
+        customer_column (str): Listing column of customer_df.
+        reformat (bool): Normalize the listing names before matching. Disable for ID columns.
+
+    Returns:
+        pd.DataFrame: df with 'Code' and 'Customer' filled in for matched rows.
+    """
+    if df.empty or listing_column not in df or customer_column not in customer_df:
+        return df
+
+    lookup = build_listing_lookup(customer_df, customer_column, reformat)
+    keys = normalize_listing_keys(df[listing_column]) if reformat else df[listing_column]
+    found = keys.isin(lookup.index) & keys.notnull()
+    if found.any():
+        matched_keys = keys[found].astype(object)
+        df.loc[found, 'Code'] = matched_keys.map(lookup['Code'])
+        df.loc[found, 'Customer'] = matched_keys.map(lookup['QBO'])
     return df
 
 
+def normalize_listing_keys(series):
+    """
+    Normalize listing names for matching: runs of non-word characters become one space, then the name is stripped.
+    Nulls stay null.
+    """
+    return clean_text_column(series, LISTING_KEY_REGEX, null_replacement=None)
+
+
+def build_listing_lookup(customer_df, customer_column='ListingBNB', reformat=True):
+    """
+    Build a lookup table from listing key to the first matching 'Code' and 'QBO'.
+
+    Args:
+        customer_df (pd.DataFrame): Cleaning Fee Report.
+        customer_column (str): Listing column of customer_df.
+        reformat (bool): Normalize the listing names the same way as the export listings.
+
+    Returns:
+        pd.DataFrame: 'Code' and 'QBO' columns indexed by unique listing key.
+    """
+    lookup = pd.DataFrame(customer_df, columns=[customer_column, 'Code', 'QBO'])
+    if reformat:
+        lookup[customer_column] = normalize_listing_keys(lookup[customer_column])
+    lookup = lookup[lookup[customer_column].notnull()]
+    lookup = lookup.drop_duplicates(subset=customer_column, keep='first')
+    return lookup.set_index(customer_column)[['Code', 'QBO']]
+
+
 def clean_dataframes(dataframes):
     """
     Clean specific dataframes by removing undesired rows.
@@ -71,27 +115,59 @@ def is_nan(value):
         return False
 
 
-def prepare_dataframe_columns(df, columns, replace_re, null_replacement='NULL'):
+def prepare_dataframe_columns(df, columns, replace_re, null_replacement='NULL', text_columns=None):
     """
     Cleans and prepares specified columns of a DataFrame.
 
+    Only the text columns are cleaned, so numeric and date columns keep the dtypes declared in the source schema.
+    Categorical columns are cleaned once per category instead of once per row.
+
     Args:
         df (pd.DataFrame): The DataFrame to process.
         columns (list): List of columns to include in the output DataFrame.
         replace_re (str): Regular expression pattern for replacement.
         null_replacement (str): Value to replace null/NaN entries.
+        text_columns (list, optional): Columns to clean. Defaults to every object or categorical column.
 
     Returns:
         pd.DataFrame: The cleaned and prepared DataFrame.
     """
     df_col = pd.DataFrame(df, columns=columns)
-    for col in columns:
-        df_col.loc[df_col[col].isnull(), col] = null_replacement
-        # Assuming the unidecode operation was handled elsewhere if needed
-        df_col[col] = df_col[col].str.replace(replace_re, ' ', regex=True).str.strip()
+    if text_columns is None:
+        text_columns = [col for col in columns
+                        if df_col[col].dtype == object or isinstance(df_col[col].dtype, pd.CategoricalDtype)]
+    for col in text_columns:
+        df_col[col] = clean_text_column(df_col[col], replace_re, null_replacement)
     return df_col
 
 
+def clean_text_column(series, replace_re, null_replacement='NULL'):
+    """
+    Replace nulls and characters matching replace_re in a text column, then strip it.
+
+    Args:
+        series (pd.Series): Object or categorical column.
+        replace_re (str): Regular expression pattern for replacement.
+        null_replacement (str, optional): Value to replace null/NaN entries. None keeps them null.
+
+    Returns:
+        pd.Series: The cleaned column. Categorical columns stay categorical when no two categories collapse.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if null_replacement is not None:
+            if null_replacement not in series.cat.categories:
+                series = series.cat.add_categories([null_replacement])
+            series = series.fillna(null_replacement)
+        categories = series.cat.categories
+        cleaned = pd.Series(categories.astype(object), index=categories).str.replace(replace_re, ' ', regex=True).str.strip()
+        return series.map(cleaned)
+
+    if null_replacement is not None:
+        series = series.where(series.notnull(), null_replacement)
+    # Assuming the unidecode operation was handled elsewhere if needed
+    return series.str.replace(replace_re, ' ', regex=True).str.strip()
+
+
 def remove_extra_spaces(df, columns):
     """
     Removes extra spaces from specified columns in a DataFrame.
@@ -1,19 +1,25 @@
 import datetime
+import fnmatch
 import os
 import re
 
+# Month number by the first three letters of its name
+MONTH_NUMBERS = {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+                 'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12}
 
-def date_from_airbnb_name(file_name):
+
+def date_from_airbnb_name(file_name, model_dir='ModelFiles'):
     """
     Determine month and year based on Airbnb filename.
 
     Args:
         file_name (str): Partial or full name of the Airbnb file.
+        model_dir (str, optional): Directory holding the input files. Defaults to 'ModelFiles'.
 
     Returns:
         tuple: A tuple containing the month and year extracted from the file name.
     """
-    for file in os.listdir('ModelFiles/.'):
+    for file in os.listdir(model_dir):
         if fnmatch.fnmatch(file, '*.xlsx') and file_name in file:
             date_part = ''.join([char for char in file.split('-')[1] if char.isdigit()])
             month = int(date_part[:2])
@@ -104,10 +110,7 @@ def month_name_to_number(month_name):
     Returns:
         int: The month number.
     """
-    month_name = month_name.strip()[:3].lower()
-    month_numbers = {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-                     'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12}
-    return month_numbers[month_name]
+    return MONTH_NUMBERS[month_name.strip()[:3].lower()]
 
 
 def generate_dates(month, year):
@@ -123,3 +126,19 @@ def generate_dates(month, year):
     due_date = datetime.datetime(next_year, next_month, 5)
 
     return invoice_date.strftime('%m/%d/%Y'), due_date.strftime('%m/%d/%Y')
+
+
+def month_range(start, end):
+    """
+    List the months from start to end, both included.
+
+    Args:
+        start (tuple): First (month, year).
+        end (tuple): Last (month, year).
+
+    Returns:
+        list: (month, year) tuples in order.
+    """
+    first = start[1] * 12 + start[0] - 1
+    last = end[1] * 12 + end[0] - 1
+    return [(period % 12 + 1, period // 12) for period in range(first, last + 1)]
@@ -1,47 +1,35 @@
-import os
 from os.path import exists
 from shutil import copyfile
 
 import pandas as pd
 
+from .date_and_reference import MONTH_NUMBERS
+from .workbook_writer import estimate_column_widths
 
-def manage_vrbo_data(vrbo, vrbo_save_path, month, month_name, year, mtn, number2month):
-    """
-    Manages VRBO data, including filtering, updating, and saving to Excel.
+VRBO_ORGANIZER_SHEET = 'VRBO Check Outs'
+# Columns of a VRBO stay used for invoicing, see vrbo_col in line_invoice_generation
+VRBO_COLUMNS = ['Property ID', 'Reservation ID', 'Payout', 'Nights', 'Check-out']
 
-    Args:
-        vrbo (pd.DataFrame): The VRBO DataFrame to process.
-        vrbo_save_path (str): Path where the VRBO data is saved.
-        month (int): The current month as an integer.
-        month_name (str): The current month as a name.
-        year (int): The current year.
-        mtn (function): Function to convert month name to number.
-        number2month (function): Function to convert number to month name.
-    """
-    vrbo_wrong_month = vrbo[vrbo['Check-out'].dt.month != month]
-    keep_locations = []
-    vrbo_new = pd.DataFrame()
 
-    if exists(vrbo_save_path):
-        vrbo_new = pd.read_excel(vrbo_save_path)
-        for idx, row in vrbo_wrong_month.iterrows():
-            if not (vrbo_new['Reservation ID'] == row['Reservation ID']).any():
-                vrbo_new = pd.concat([vrbo_new, pd.DataFrame([row])], ignore_index=True)
-                vrbo_new.iloc[-1, 'Month'] = number2month(row['Check-out'].month)
-                vrbo_new.iloc[-1, 'Year'] = row['Check-out'].year
+def read_vrbo_organizer(vrbo_save_path):
+    """
+    Read the VRBO Date Organizer, or an empty one when it does not exist yet.
 
-        # Filter to keep relevant listings
-        for idx, row in vrbo_new.iterrows():
-            if mtn(row['Month']) >= month and row['Year'] >= year:
-                keep_locations.append(idx)
+    Returns:
+        pd.DataFrame: Year, Month (name) and the VRBO_COLUMNS of each stored stay.
+    """
+    if not exists(vrbo_save_path):
+        return pd.DataFrame(columns=['Year', 'Month'] + VRBO_COLUMNS)
+    return pd.read_excel(vrbo_save_path, sheet_name=0)
 
-        vrbo_new = vrbo_new.iloc[keep_locations]
-        vrbo_new.loc[vrbo_new['Payout'] != 0, 'Payout'] = 0
 
-        # Save updated VRBO data
-        if not vrbo_new.empty:
-            os.remove(vrbo_save_path)  # Ensure the file is removed before saving if it exists
-            vrbo_new.to_excel(vrbo_save_path, index=False)
+def month_numbers(months):
+    """
+    Month numbers of a column of month names (full or abbreviated) or numbers. Unknown months are NaN.
+    """
+    numbers = pd.to_numeric(months, errors='coerce')
+    names = months.astype(str).str.strip().str[:3].str.lower().map(MONTH_NUMBERS)
+    return numbers.fillna(names)
 
 
 def copy_excel_file(source_path, destination_path):
@@ -55,19 +43,13 @@ def copy_excel_file(source_path, destination_path):
     copyfile(source_path, destination_path)
 
 
-def auto_adjust_columns_width(writer, sheet_name, df):
+def auto_adjust_columns_width(writer, sheet_name, df, money_columns=None):
     """
-    Auto-adjusts column widths in an Excel sheet.
+    Auto-adjusts column widths in an Excel sheet, see estimate_column_widths.
     """
-    workbook = writer.book
     worksheet = writer.sheets[sheet_name]
-    for idx, col in enumerate(df):
-        series = df[col]
-        max_len = max((
-            series.astype(str).map(len).max(),  # len of largest item
-            len(str(series.name))  # len of column name/header
-        )) + 1  # adding a little extra space
-        worksheet.set_column(idx, idx, max_len)  # set column width
+    for idx, width in estimate_column_widths(df, money_columns).items():
+        worksheet.set_column(idx, idx, width)  # set column width
 
 
 def write_dataframe_to_excel(writer, df, sheet_name, format_columns=None):
@@ -81,4 +63,4 @@ def write_dataframe_to_excel(writer, df, sheet_name, format_columns=None):
         worksheet = writer.sheets[sheet_name]
         for col_idx in format_columns:
             worksheet.set_column(col_idx, col_idx, None, format_col)
-    auto_adjust_columns_width(writer, sheet_name, df)
+    auto_adjust_columns_width(writer, sheet_name, df, format_columns)
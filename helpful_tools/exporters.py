@@ -0,0 +1,159 @@
+import os
+
+import pandas as pd
+
+from .file_management import invoice_workbook_name
+from .workbook_writer import StreamingWorkbookWriter
+
+try:
+    import pyarrow
+    PARQUET_ERRORS = (ValueError, TypeError, pyarrow.ArrowException)
+except ImportError:
+    # Parquet export is unavailable without pyarrow
+    pyarrow = None
+    PARQUET_ERRORS = (ValueError, TypeError)
+
+# Date format of the QuickBooks import templates
+QUICKBOOKS_DATE_FORMAT = '%m/%d/%Y'
+
+
+class _Exporter:
+    # Exporters are context managers that close themselves
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+
+class XlsxExporter(_Exporter):
+    """
+    Every table as a sheet of the month's invoice workbook. This is the default export.
+    """
+
+    def __init__(self, path, month_name):
+        """
+        Args:
+            path (str): Report directory of the month.
+            month_name (str): Name of the month, used in the file name.
+        """
+        self.location = os.path.join(path, invoice_workbook_name(month_name))
+        self.writer = StreamingWorkbookWriter(self.location)
+
+    def write_table(self, name, df, money_columns=None, widths=None):
+        """
+        Write a table as a sheet. money_columns and widths are passed on to StreamingWorkbookWriter.write_sheet.
+
+        Returns:
+            int: Number of rows written.
+        """
+        return self.writer.write_sheet(name, df, money_columns, widths)
+
+    def close(self):
+        self.writer.close()
+
+
+class CsvExporter(_Exporter):
+    """
+    Every table as a CSV file, ready for the QuickBooks import. Columns stay in the order of the table, money is
+    written with two decimals and dates as mm/dd/yyyy.
+    """
+
+    extension = 'csv'
+
+    def __init__(self, path, month_name):
+        """
+        Args:
+            path (str): Report directory of the month.
+            month_name (str): Name of the month, used in the directory name.
+        """
+        stem = os.path.splitext(invoice_workbook_name(month_name))[0]
+        self.location = os.path.join(path, f'{stem}_{self.extension}')
+        os.makedirs(self.location, exist_ok=True)
+
+    def write_table(self, name, df, money_columns=None, widths=None):
+        """
+        Write a table to <name>.csv. widths is ignored.
+
+        Returns:
+            int: Number of rows written.
+        """
+        df = df.copy()
+        for column in df.columns[list(money_columns or [])]:
+            df[column] = pd.to_numeric(df[column], errors='coerce').map('{:.2f}'.format, na_action='ignore')
+        df.to_csv(self._file(name), index=False, date_format=QUICKBOOKS_DATE_FORMAT)
+        return len(df)
+
+    def _file(self, name):
+        return os.path.join(self.location, f'{name}.{self.extension}')
+
+
+class ParquetExporter(CsvExporter):
+    """
+    Every table as a Parquet file, for tools that read the outputs without openpyxl. Needs pyarrow.
+    """
+
+    extension = 'parquet'
+
+    def __init__(self, path, month_name):
+        if pyarrow is None:
+            raise ImportError('Exporting to Parquet requires pyarrow. Install it with: pip install pyarrow')
+        super().__init__(path, month_name)
+
+    def write_table(self, name, df, money_columns=None, widths=None):
+        """
+        Write a table to <name>.parquet, see write_parquet. money_columns and widths are ignored.
+
+        Returns:
+            int: Number of rows written.
+        """
+        write_parquet(df, self._file(name))
+        return len(df)
+
+
+def write_parquet(df, file_path):
+    """
+    Write a DataFrame to a Parquet file without its index. Text columns that pyarrow cannot encode, e.g. mixing
+    numbers and text, are written as text.
+
+    Args:
+        df (pd.DataFrame): Data to write.
+        file_path (str): Path of the Parquet file.
+
+    Returns:
+        str: file_path.
+    """
+    df = df.copy()
+    df.columns = [str(column) for column in df.columns]
+    try:
+        df.to_parquet(file_path, index=False)
+    except PARQUET_ERRORS:
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].astype(str).where(df[column].notna(), None)
+        df.to_parquet(file_path, index=False)
+    return file_path
+
+
+EXPORTERS = {'xlsx': XlsxExporter, 'csv': CsvExporter, 'parquet': ParquetExporter}
+
+
+def open_exporter(export_format, path, month_name):
+    """
+    Create the exporter for a format.
+
+    Args:
+        export_format (str): One of EXPORTERS: 'xlsx', 'csv' or 'parquet'.
+        path (str): Report directory of the month.
+        month_name (str): Name of the month.
+
+    Returns:
+        Exporter with write_table(name, df, money_columns=None, widths=None) and close(). It is a context manager,
+        and its location attribute is the file or directory it writes to.
+    """
+    if export_format not in EXPORTERS:
+        raise ValueError(f'Unknown export format "{export_format}". Choose one of: {", ".join(EXPORTERS)}.')
+    return EXPORTERS[export_format](path, month_name)
@@ -13,12 +13,21 @@ def remove_directory_if_exists(directory):
         print("Directory does not exist.")
 
 
-def setup_directory_structure(app, month_name, year):
+def setup_directory_structure(app, month_name, year, base_dir=None):
     """
     Setup and clean directory structure for reports.
+
+    Args:
+        app: Application context for logging.
+        month_name (str): Name of the report month.
+        year (int): Year of the report month.
+        base_dir (str, optional): Directory the "<year> Reports" folders are kept in, e.g. Workspace.root. Defaults to
+            the working directory.
+
+    Returns:
+        str: The emptied report directory of the month.
     """
-    cwd = os.getcwd()
-    path_year = os.path.join(cwd, f'{year} Reports')
+    path_year = os.path.join(base_dir or os.getcwd(), f'{year} Reports')
     path_month = os.path.join(path_year, f'{month_name} Report')
 
     remove_directory_if_exists(path_month)
@@ -28,3 +37,10 @@ def setup_directory_structure(app, month_name, year):
         app.log('The new directory is created!')
 
     return path_month
+
+
+def invoice_workbook_name(month_name):
+    """
+    Name of the month's invoice workbook in the report directory.
+    """
+    return f'Aviad_BNB_{month_name}.xlsx'
@@ -1,15 +1,89 @@
-from data_utilities import initialize_dataframes
+import os
+from concurrent.futures import ProcessPoolExecutor
+from shutil import copyfile
 
+import numpy as np
+import pandas as pd
 
-def load_files(app, filepath, filenames, path):
+from .data_utilities import initialize_dataframes
+from .progress import update_progress_bar
+from .source_schemas import apply_schema, schema_columns
+from .workbook_cache import cached_read_workbook, default_cache_dir
+
+# Dataframe filled by each input file, by lowercase filename prefix. Current.xlsx fills one dataframe per sheet.
+FILE_SOURCES = {'reservations': 'check', 'airbnb': 'bnb', 'vrbo_': 'vrbo'}
+CURRENT_SHEETS = {'cleaning': 'Cleaning', 'customer_info': 'Customer', 'tax_rates': 'Tax Rates'}
+
+
+def plan_ingestion(filepath, filenames):
+    """
+    Decide which sheets to read from each file in the model directory.
+
+    Args:
+        filepath (str): Path to the model files.
+        filenames (list): List of filename prefixes to process.
+
+    Returns:
+        list: (file name, sheet requests) tuples, in directory order. Sheet requests map a dataframe key to the
+            sheet that fills it and the schema columns to read, as expected by read_workbook.
+    """
+    tasks = []
+    for fil in os.listdir(filepath):
+        sheet_requests = {}
+        for prefix in filenames:
+            if not fil.lower().startswith(prefix.lower()):
+                continue
+            if prefix.lower() == 'current':
+                sheet_requests.update({key: {'sheet': name, 'columns': schema_columns(key)}
+                                       for key, name in CURRENT_SHEETS.items()})
+            elif prefix.lower() in FILE_SOURCES:
+                key = FILE_SOURCES[prefix.lower()]
+                sheet_requests[key] = {'sheet': 0, 'columns': schema_columns(key)}
+        if sheet_requests:
+            tasks.append((fil, sheet_requests))
+    return tasks
+
+
+def read_workbook(file_full_path, sheet_requests, cache_dir=None):
+    """
+    Read every requested sheet of one input file. Runs inside the ingestion worker processes.
+
+    Only the requested columns are read, and they are converted to their schema dtypes before the frames are sent
+    back to the parent process.
+
+    Args:
+        file_full_path (str): Path to the input file.
+        sheet_requests (dict): Dataframe key -> sheet request, see cached_read_workbook.
+        cache_dir (str, optional): Workbook cache directory.
+
+    Returns:
+        dict: Dataframe key -> pd.DataFrame.
+    """
+    if not file_full_path.endswith('.xlsx'):
+        frames = {}
+        for key, request in sheet_requests.items():
+            columns = request.get('columns')
+            usecols = (lambda col: col in columns) if columns is not None else None
+            frames[key] = pd.read_csv(file_full_path, usecols=usecols)
+    else:
+        frames = cached_read_workbook(file_full_path, sheet_requests, cache_dir=cache_dir)
+    return {key: apply_schema(df, key) for key, df in frames.items()}
+
+
+def load_files(app, filepath, filenames, path, cache_dir=None, max_workers=None):
     """
     Load necessary files and create dataframes.
 
+    Every input file is read in its own worker process and opened at most once, so the load takes about as long as
+    the slowest file. Workbooks are read through the workbook cache, so unchanged inputs are not parsed again.
+
     Args:
         app: Application context for logging.
         filepath (str): Path to the model files.
         filenames (list): List of filenames to process.
         path (str): Path to the report directory.
+        cache_dir (str, optional): Workbook cache directory. Defaults to the cache next to the model files.
+        max_workers (int, optional): Number of worker processes. Defaults to one per file, up to the CPU count.
     """
     reformat_info = {
         'bnb': {'path': '', 'sheet': ''},
@@ -17,37 +91,82 @@ def load_files(app, filepath, filenames, path):
         'vrbo': {'path': '', 'sheet': ''}
     }
 
-    num_files = len(os.listdir(filepath))
-    progress_vals = np.linspace(3, 15, num=num_files)
-    file_idx = 0
-
     dataframes = initialize_dataframes()
+    tasks = plan_ingestion(filepath, filenames)
+    if not tasks:
+        return dataframes, reformat_info
 
-    for fil in os.listdir(filepath):
-        app.progress_bar["value"] = int(progress_vals[file_idx])
-        app.progress_bar.update()
-        file_idx += 1
-        file_full_path = os.path.join(filepath, fil)
-
-        for fname in range(len(filenames)):
-            if fil.lower().startswith(filenames[fname].lower()):
-                df = pd.read_excel(file_full_path) if fil.endswith('.xlsx') else pd.read_csv(file_full_path)
-                reformat_info_key = list(reformat_info.keys())[fname] if fname < len(reformat_info) else None
-
-                if reformat_info_key:
-                    reformat_info[reformat_info_key]['path'] = os.path.join(path, fil)
-                    reformat_info[reformat_info_key]['sheet'] = fil
-
-                if fname == 2:  # Special handling for Current with multiple sheets
-                    xl = pd.ExcelFile(file_full_path)
-                    for des_sub_name in ['Cleaning', 'Customer']:
-                        sheet = [s for s in xl.sheet_names if des_sub_name in s]
-                        if sheet:
-                            name_str = ''.join(sheet)
-                            dataframes[des_sub_name.lower()] = pd.read_excel(file_full_path, sheet_name=name_str)
-                            if des_sub_name == 'Customer':
-                                copyfile(file_full_path, os.path.join(path, fil))
-                else:
-                    dataframes[list(dataframes.keys())[fname]] = df
+    progress_vals = np.linspace(3, 15, num=len(tasks))
+    max_workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(read_workbook, os.path.join(filepath, fil), sheet_requests, cache_dir)
+                   for fil, sheet_requests in tasks]
+
+        # Collect in directory order so a later file still wins over an earlier one with the same prefix
+        for file_idx, ((fil, sheet_requests), future) in enumerate(zip(tasks, futures)):
+            frames = future.result()
+            dataframes.update(frames)
+            update_progress_bar(app, int(progress_vals[file_idx]))
+
+            for key in sheet_requests:
+                if key in reformat_info:
+                    reformat_info[key]['path'] = os.path.join(path, fil)
+                    reformat_info[key]['sheet'] = fil
+
+            if 'customer_info' in frames:
+                copyfile(os.path.join(filepath, fil), os.path.join(path, fil))
 
     return dataframes, reformat_info
+
+
+def load_reference_data(app, filepath, cache_dir=None):
+    """
+    Load the sheets of Current.xlsx (Cleaning Fee Report, Customer Report and Tax Rates) on their own, so several
+    months can share them.
+
+    Args:
+        app: Application context for logging.
+        filepath (str): Path to the model files.
+        cache_dir (str, optional): Workbook cache directory.
+
+    Returns:
+        tuple: Dataframe key -> pd.DataFrame for the CURRENT_SHEETS, and the path of the Current workbook (None when
+            there is none).
+    """
+    tasks = plan_ingestion(filepath, ['Current'])
+    frames = {}
+    for fil, sheet_requests in tasks:
+        frames.update(read_workbook(os.path.join(filepath, fil), sheet_requests, cache_dir))
+    source = os.path.join(filepath, tasks[-1][0]) if tasks else None
+    return frames, source
+
+
+def warm_workbook_cache(filepaths, filenames, cache_dir=None, max_workers=None):
+    """
+    Read the input workbooks of several model directories at once in worker processes, so the load_files calls that
+    follow are served from the workbook cache.
+
+    Args:
+        filepaths (list): Model directories.
+        filenames (list): List of filename prefixes to process.
+        cache_dir (str, optional): Workbook cache directory. Defaults to default_cache_dir().
+        max_workers (int, optional): Number of worker processes. Defaults to one per file, up to the CPU count.
+
+    Returns:
+        int: Number of workbooks read.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    jobs = [(os.path.join(filepath, fil), sheet_requests, cache_dir)
+            for filepath in filepaths for fil, sheet_requests in plan_ingestion(filepath, filenames)
+            if fil.endswith('.xlsx')]
+    if not jobs:
+        return 0
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(jobs), os.cpu_count() or 1)) as pool:
+        list(pool.map(_cache_workbook, *zip(*jobs)))
+    return len(jobs)
+
+
+def _cache_workbook(file_full_path, sheet_requests, cache_dir):
+    # Runs inside the worker processes. The frames stay in the cache instead of being sent back.
+    cached_read_workbook(file_full_path, sheet_requests, cache_dir=cache_dir)
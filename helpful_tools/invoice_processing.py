@@ -1,54 +1,423 @@
+import numpy as np
 import pandas as pd
 
-def process_invoices(unit_grouped, unit_names, progress_update_callback):
+from .customer_data_aggregation import isnan
+from .date_and_reference import month_number_to_name
+from .money import format_money, from_cents, scale_cents, sum_cents, to_cents
+from .progress import update_progress_bar
+from .record_buffer import RecordBuffer
+from .sales_tax import TAXABLE_COLUMNS, compute_sales_tax
+
+# Columns of the output tables, in the order QuickBooks imports them
+INVOICE_COLUMNS = ['RefNumber', 'Customer', 'TxnDate', 'DueDate', 'Msg', 'LineItem', 'LineDesc', 'LineQty',
+                   'LineUnitPrice', 'LineAmount', 'Location', 'LineServiceDate']
+CREDIT_MEMO_COLUMNS = ['RefNumber', 'Customer', 'TxnDate', 'LineServiceDate', 'LineItem', 'LineDesc', 'LineQty',
+                       'LineUnitPrice', 'LineAmount', 'Location']
+CHECK_COLUMNS = ['RefNumber', 'BankAccount', 'TxnDate', 'Vendor', 'ExpenseAmount', 'PrivateNote', 'ExpenseDesc',
+                 'ExpenseAccount']
+SALES_RECEIPT_COLUMNS = ['RefNumber', 'Customer', 'TxnDate', 'Location', 'BankAccount', 'PaymentMethod', 'Msg',
+                         'ToBePrinted', 'ToBeEmailed', 'LineServiceDate', 'LineItem', 'LineDesc', 'LineQty',
+                         'LineUnitPrice', 'LineAmount', 'LineTaxable']
+JOURNAL_COLUMNS = ['RefNumber', 'TxnDate', 'PrivateNote', 'IsAdjustment', 'Account', 'LineAmount', 'LineDesc',
+                   'Location', 'Entity']
+
+# Money is computed in cents and written as dollar floats so the accounting format applies
+OUTPUT_DTYPES = {'LineUnitPrice': float, 'LineAmount': float, 'ExpenseAmount': float, 'Income': float,
+                 'Municipality': float, 'County': float, 'Hospitality_Tax': float}
+
+
+# Credit memo groups of unit, in the order their invoices are numbered
+CREDIT_MEMO_GROUPS = ['CM', 'NULL']
+
+
+def money_column_positions(df):
+    """
+    Return the positions of the money columns (the OUTPUT_DTYPES) of an output table, to pass as money_columns to
+    an exporter.
+    """
+    return [idx for idx, column in enumerate(df.columns) if column in OUTPUT_DTYPES]
+
+
+def partition_unit(unit):
     """
-    Processes invoices based on grouped unit data.
+    Partition unit once by (CreditMemo, Customer, TaxLocation, CleaningFee).
 
     Args:
-        unit_grouped (pd.DataFrameGroupBy): Grouped unit DataFrame by 'CreditMemo'.
-        unit_names (list): List of unique customer names.
-        progress_update_callback (function): Function to call for updating progress.
+        unit (pd.DataFrame): Prepared unit DataFrame, see sort_and_prepare_unit.
 
     Returns:
-        tuple: DataFrames for different invoice types and logs.
+        dict: CreditMemo -> customer -> (row positions, [(tax location, [(cleaning fee, row positions), ...]), ...]).
+            Customers keep their order in unit. Tax locations and cleaning fees are in order of first appearance for
+            the customer, which is the order the invoice lines are written in.
     """
-    # Placeholder for actual logic to process invoices, which includes:
-    # - Iterating through each group in unit_grouped
-    # - Iterating through each customer in unit_names
-    # - Calculating totals, applying conditions, and aggregating data
-    # - Creating and returning various DataFrames like entry_CM, entry_NCM, sales_entry, tax_issues, etc.
-
-    # Example placeholders for returned DataFrames (to be replaced with actual processing logic)
-    entry_CM = pd.DataFrame()  # Credit Memo entries
-    entry_NCM = pd.DataFrame()  # Non-Credit Memo entries
-    # Add other necessary DataFrames as per the original logic
-
-    for ug, (group_name, group_df) in enumerate(unit_grouped):
-        if group_name == 'CM':
-            # Process credit memo entries
-            pass  # Replace with actual logic
-        elif group_name == 'NULL':
-            # Process non-credit memo entries
-            pass  # Replace with actual logic
-        else:
-            # Handle error or unexpected group
-            print('Unexpected group encountered:', group_name)
-
-        for n, name in enumerate(unit_names):
-            progress_update_callback(n)  # Update progress based on the callback function
-
-            # Further processing for each customer
-            pass  # Replace with actual logic
-
-    return entry_CM, entry_NCM  # Return actual DataFrames instead of placeholders
-
-def update_progress_bar(app, value):
+    # Factorize the tax location so a missing one forms its own partition
+    tax_codes, tax_values = pd.factorize(unit['TaxLocation'], use_na_sentinel=False)
+    keys = [unit['CreditMemo'], unit['Customer'], pd.Series(tax_codes, index=unit.index), unit['CleaningFee']]
+
+    customer_parts = {}
+    for (credit_memo, customer, tax_code, clean), positions in unit.groupby(keys, sort=False).indices.items():
+        customer_parts.setdefault((credit_memo, customer), []).append((tax_code, clean, positions))
+
+    partitions = {}
+    for (credit_memo, customer), parts in customer_parts.items():
+        tax_first = {}
+        clean_first = {}
+        for tax_code, clean, positions in parts:
+            tax_first[tax_code] = min(tax_first.get(tax_code, positions[0]), positions[0])
+            clean_first[clean] = min(clean_first.get(clean, positions[0]), positions[0])
+
+        tax_partitions = {}
+        for tax_code, clean, positions in sorted(parts, key=lambda part: (tax_first[part[0]], clean_first[part[1]])):
+            tax_partitions.setdefault(tax_code, (tax_values[tax_code], []))[1].append((clean, positions))
+
+        customer_positions = np.sort(np.concatenate([positions for _, _, positions in parts]))
+        partitions.setdefault(credit_memo, {})[customer] = (customer_positions, list(tax_partitions.values()))
+    return partitions
+
+
+def process_invoices(app, unit, invoice_date, due_date, month, invoice_no, check_no, journal_no, tax_rates):
     """
-    Updates the application's progress bar to the specified value.
+    Processes invoices based on the unit data.
+
+    unit is partitioned once by credit memo group, customer, tax location and cleaning fee, and only the partitions
+    that exist are visited. Invoice numbers are still assigned as if every customer were visited in both credit
+    memo groups, so numbering does not depend on which customers are present in each group.
+
+    Every amount is computed in int64 cents (see money.py) and only converted to dollars when a line is written, so
+    the totals, checks and journal entries add up exactly.
 
     Args:
         app: Application instance with a progress bar attribute.
-        value (int): The value to set the progress bar to.
+        unit (pd.DataFrame): Prepared unit DataFrame, see sort_and_prepare_unit.
+        invoice_date (str): Invoice date, mm/dd/YYYY.
+        due_date (str): Due date, mm/dd/YYYY.
+        month (int): Month being invoiced.
+        invoice_no (int): Last invoice number used.
+        check_no (int): Next check number.
+        journal_no (int): Next journal entry number.
+        tax_rates (pd.DataFrame): Hospitality tax rates by tax location, see build_tax_rates.
+
+    Returns:
+        tuple: Dict of output DataFrames (entry_CM, entry_NCM, sales_entry, credit_memo, sales_receipts,
+            journal_entries, checks, tax_issues, man_issues) and the (invoice_no, check_no, journal_no) to continue
+            from.
     """
-    app.progress_bar["value"] = value
-    app.progress_bar.update()
\ No newline at end of file
+    unit_names = unit['Customer'].unique()
+    customer_index = {name: n for n, name in enumerate(unit_names)}
+    progress_vals = np.linspace(25, 95, num=len(unit_names))
+    first_invoice_no = invoice_no
+
+    # Item descriptions that are currently desired
+    item = ['CLEANING FEE', 'HOSPITALITY TAX', 'MANAGEMENT FEE']
+
+    # Output rows are appended to buffers and only turned into DataFrames once every customer is done
+    entries = {}
+    taxable = RecordBuffer(TAXABLE_COLUMNS, OUTPUT_DTYPES)
+    credit_memo = RecordBuffer(CREDIT_MEMO_COLUMNS, OUTPUT_DTYPES)
+    sales_receipts = RecordBuffer(SALES_RECEIPT_COLUMNS, OUTPUT_DTYPES)
+    checks = RecordBuffer(CHECK_COLUMNS, OUTPUT_DTYPES)
+    journal_entries = RecordBuffer(JOURNAL_COLUMNS, OUTPUT_DTYPES)
+    tax_issue_rows = []
+    man_issue_rows = []
+
+    partitions = partition_unit(unit)
+    for group_name in partitions:
+        if group_name not in CREDIT_MEMO_GROUPS:
+            app.log('There was an error separating by CM!!! Have Steven look into it please!')
+    group_names = [group_name for group_name in CREDIT_MEMO_GROUPS if group_name in partitions]
+
+    for ug, group_name in enumerate(group_names):
+        entry = RecordBuffer(INVOICE_COLUMNS, OUTPUT_DTYPES)
+        # (customer, item, unit price in cents) -> position of that cleaning line in entry
+        cleaning_lines = {}
+
+        for customer_name, (customer_positions, tax_partitions) in partitions[group_name].items():
+            n = customer_index[customer_name]
+            update_progress_bar(app, int(progress_vals[n]))
+
+            # InvoiceNo
+            invoice_no = first_invoice_no + ug * len(unit_names) + n + 1
+
+            # Separate by name
+            unit_loop = unit.iloc[customer_positions]
+
+            # Determine the total income
+            income_total_init = sum_cents(unit_loop['Income'])
+
+            # If VRBO, add to income but keep separate for tax information
+            if not all(unit_loop['VRBO_ID'] == 'none'):
+                income_total = income_total_init + sum_cents(unit_loop['VRBO_PAYOUT'])
+            else:
+                income_total = income_total_init
+
+            # Check if un-invoiced
+            un_invoiced = False
+            # If all entries say omit, this is un-invoiced
+            if unit_loop['Clean'].iloc[0] == 'omit' and unit_loop['Hosp'].iloc[0] == 'omit' and \
+                    unit_loop['Management'].iloc[
+                        0] == 'omit':
+                un_invoiced = True
+
+            # Initialization
+            total_cleaning_fee = 0
+            total_amount = 0
+            # management_fee = 0
+            pest_fee = 0
+            bus_lic = 0
+            landscaping_fee = 0
+            cable_fee = 0
+            expense = 0
+            clean_count = 0
+            cleaning_written = False
+            # hospitality_written = False
+            tax_adjustment_90_day = 0
+
+            # Separate based on cleaning fee and tax location, only visiting the combinations that exist
+            for tax, clean_partitions in tax_partitions:
+                for clean, repeat_positions in clean_partitions:
+                    unit_repeat = unit.iloc[repeat_positions]
+
+                    # Initialize necessary values
+                    cleaning_fee = 0
+                    num_cleaning_fee = 0
+                    amount_less_clean = 0
+                    taxed = False
+                    tax_adjustment_90_day = 0
+
+                    # Cleaning fee
+                    if not isnan(unit_repeat['CleaningFee'].iloc[0]) or \
+                            not unit_repeat['Clean'].str.contains('omit', case=False).any():
+                        cleaning_fee = to_cents(unit_repeat['CleaningFee'].iloc[0])
+                        num_cleaning_fee = int(unit_repeat['Checkouts'].sum())
+                        # Add a cleaning fee for VRBO reports
+                        num_cleaning_fee = num_cleaning_fee + int(unit_repeat['VRBO_Nights'].sum())
+                        total_cleaning_fee = total_cleaning_fee + cleaning_fee * num_cleaning_fee
+
+                    # Hospitality tax
+                    repeat_income = sum_cents(unit_repeat['Income'])
+                    if not unit_repeat['Clean'].str.contains('omit', regex=False, case=False).any():
+                        tax_adjustment_90_day = sum_cents(unit_repeat['BNB_90_Day']) + \
+                                                sum_cents(unit_repeat['VRBO_90_Day'])
+                        income_less_clean = repeat_income - cleaning_fee * num_cleaning_fee
+                        amount_less_clean = income_less_clean - tax_adjustment_90_day
+                        total_amount += amount_less_clean
+                        taxed = True
+
+                    # If the customer has nothing to invoice, skip it
+                    if total_cleaning_fee == 0 and repeat_income == 0:
+                        continue
+
+                    # Log the taxable amount. The tax of every line is computed at once by compute_sales_tax.
+                    if isnan(tax):
+                        tax_issue_rows.append(unit_repeat)
+                    elif taxed:
+                        taxable.append([tax, income_less_clean, tax_adjustment_90_day])
+
+                    # Log Cleaning Fee
+                    if not un_invoiced:
+                        # Was there a cleaning fee already reported for this customer? If so add this to what is listed
+                        # already.
+                        prev_cleaning = cleaning_lines.get((customer_name, item[0], cleaning_fee))
+
+                        if prev_cleaning is None:
+                            if not unit_repeat['Clean'].str.contains('del', regex=False, case=False).any():
+                                cleaning_written = True
+                                clean_count += 1
+                                position = entry.append(
+                                    [invoice_no, customer_name, invoice_date, due_date, '', item[0], item[0],
+                                     num_cleaning_fee, from_cents(cleaning_fee),
+                                     from_cents(cleaning_fee * num_cleaning_fee), tax, invoice_date])
+                                cleaning_lines[(customer_name, item[0], cleaning_fee)] = position
+                        else:
+                            cleaning_written = True
+                            new_cleaning_number = entry.get(prev_cleaning, 'LineQty') + num_cleaning_fee
+                            new_cleaning_amount = new_cleaning_number * cleaning_fee
+                            entry.set(prev_cleaning, 'LineQty', new_cleaning_number)
+                            entry.set(prev_cleaning, 'LineAmount', from_cents(new_cleaning_amount))
+
+                # If any fee is below 0, then make them 0.
+                total_amount = max(0, total_amount)
+
+                # If the customer has nothing to invoice, skip it
+                if total_cleaning_fee == 0 and total_amount == 0:
+                    continue
+
+            # If the customer has nothing to invoice, skip it
+            if total_cleaning_fee == 0 and total_amount == 0 and tax_adjustment_90_day == 0 \
+                    and sum_cents(unit_loop['VRBO_PAYOUT']) == 0:
+                continue
+
+            if not isnan(unit_loop['Expense'].iloc[0]):
+                expense = to_cents(unit_loop['Expense'].iloc[0])
+            # Management fee
+            total_management = income_total - total_cleaning_fee - expense
+            man_rate = unit_loop['Magpercent'].iloc[0]
+            if isnan(man_rate):
+                if unit_loop['Management'].str.contains('omit', regex=False, case=False).any():
+                    man_rate = 0.00
+                else:
+                    man_issue_rows.append(unit_loop)
+            # A missing rate is reported in man_issues and charges no fee until it is filled in
+            management_fee = 0 if isnan(man_rate) else scale_cents(total_management, 0.01 * man_rate)
+            if management_fee < 0:
+                management_fee = 0
+
+            # If any fee is below 0, then make them 0.
+            total_management = max(0, total_management)
+
+            # Create the memo
+            # Change formatting of memo values
+            income_memo = format_money(income_total)
+            expense_memo = format_money(expense)
+            cleaning_memo = format_money(total_cleaning_fee)
+            total_memo = format_money(total_management)
+            manage_memo = format_money(management_fee)
+
+            # If cleaning fee or expenses are 0, do not include in memo
+            memo = 'INCOME ' + income_memo
+            if total_cleaning_fee != 0:
+                memo += ' - CLEANING ' + cleaning_memo
+            if expense != 0:
+                memo += ' - EXPENSES ' + expense_memo
+            memo += ' = ' + total_memo + ' | MANAGEMENT FEE ' + str(man_rate) + '% --> ' + manage_memo
+
+            # Place the memo in the cleaning fee and hospitality tax sections
+            if cleaning_written:
+                for cl in range(1, clean_count + 1):
+                    entry.set(-cl, 'Msg', memo)
+
+            # The customer's own tax location, even when none of its cleaning lines were written. A customer with
+            # several takes the last one, like its last cleaning line.
+            tax_location = tax_partitions[-1][0]
+
+            # Log Management Fee
+            if not unit_loop['Management'].iloc[0] == 'omit':
+                if not unit_loop['Management'].str.contains('del', regex=False, case=False).any():
+                    entry.append(
+                        [invoice_no, customer_name, invoice_date, due_date, memo, item[2], item[2], 0.01 * man_rate,
+                         from_cents(total_management), from_cents(management_fee), tax_location, invoice_date])
+
+            # Log Pest Control Fee
+            if not unit_loop['Pest'].isnull().values.all():
+                pest_fee = sum_cents(unit_loop['Pest'])
+                entry.append([invoice_no, customer_name, invoice_date, due_date, memo, 'SERVICES', 'PEST CONTROL', 1,
+                              from_cents(pest_fee), from_cents(pest_fee), tax_location, invoice_date])
+
+            # Log Landscaping Fee
+            if not unit_loop['Landscape'].isnull().values.all():
+                landscaping_fee = sum_cents(unit_loop['Landscape'])
+                entry.append([invoice_no, customer_name, invoice_date, due_date, memo, 'SERVICES', 'LANDSCAPING', 1,
+                              from_cents(landscaping_fee), from_cents(landscaping_fee), tax_location, invoice_date])
+
+            # Log Internet/Cable Fee
+            if not unit_loop['Internet/Cable'].isnull().values.all():
+                cable_fee = sum_cents(unit_loop['Internet/Cable'])
+                entry.append([invoice_no, customer_name, invoice_date, due_date, memo, 'SERVICES', 'INTERNET_CABLE', 1,
+                              from_cents(cable_fee), from_cents(cable_fee), tax_location, invoice_date])
+
+            # Log Pest Control Fee
+            if not unit_loop['Bus_Lic'].isnull().values.all():
+                bus_lic = sum_cents(unit_loop['Bus_Lic'])
+                entry.append([invoice_no, customer_name, invoice_date, due_date, memo, 'SERVICES', 'BUSINESS LICENSE', 1,
+                              from_cents(bus_lic), from_cents(bus_lic), tax_location, invoice_date])
+
+            # Credit Memo/Checks
+            if (unit_loop['CreditMemo'] == 'CM').any():
+                # Create item description for Credit Memo
+                item_cm = 'Deposits in Trust'
+                item_cm_desc = 'Funds Collected on Behalf of Client'
+
+                # Log Credit Memo
+                credit_memo.append([invoice_no, customer_name, invoice_date, invoice_date, item_cm, item_cm_desc,
+                                    1, from_cents(income_total), from_cents(income_total), tax_location])
+
+                # Sales Receipts
+                item_sr = 'TRUST Clearing Account'
+                bnb_sales = False
+                vrbo_sales = False
+                bnb_income = sum_cents(unit_loop['Income'])
+                vrbo_income = sum_cents(unit_loop['VRBO_PAYOUT'])
+                total_sale_amt = from_cents(bnb_income + vrbo_income)
+                if not bnb_income == 0:
+                    bnb_sales = True
+                if not vrbo_income == 0:
+                    vrbo_sales = True
+                if bnb_sales and not vrbo_sales:
+                    pmnt_meth = 'AirBNB'
+                elif not bnb_sales and vrbo_sales:
+                    pmnt_meth = 'VRBO'
+                elif bnb_sales and vrbo_sales:
+                    pmnt_meth = 'BOTH'
+                else:
+                    pmnt_meth = ''
+
+                bnb_income = format_money(bnb_income)
+                vrbo_income = format_money(vrbo_income)
+                sales_msg = f'Receipt income in trust from - AirBNB Amount: {bnb_income} | VRBO Amount: {vrbo_income}'
+                line_itm = 'Deposits in Trust'
+
+                # Log Sales Receipts
+                sales_receipts.append([invoice_no, customer_name, invoice_date, tax_location, item_sr, pmnt_meth,
+                                       sales_msg, 'N', 'N', invoice_date, line_itm, sales_msg, 1, total_sale_amt,
+                                       total_sale_amt, 'NON'])
+
+                # Checks
+                # Reference number
+                ref_num = 'ABB TR ' + f'{check_no:05d}'
+                # Bank Account
+                bank = 'ABB Trust #5241'
+
+                # Expense descriptions
+                expense_desc = month_number_to_name(month) + ' Earning'
+                expense_acc = 'Accounts Receivable (A/R)'
+
+                # Create an expense amount by taking the total income and subtracting the total cleaning fees, the
+                # hospitality tax and the management fee.
+                total_invoice = total_cleaning_fee + management_fee + pest_fee + bus_lic + landscaping_fee + cable_fee
+                expense_amt = income_total - total_invoice
+
+                # Memo
+                income_check_memo = format_money(income_total)
+                total_invoice_memo = format_money(total_invoice)
+                expense_check_memo = format_money(expense_amt)
+                private_note = 'INCOME ' + income_check_memo + ' - CREDIT MEMO APPLIED TO INVOICE ' + total_invoice_memo + \
+                               ' = MONTHLY EARNINGS ' + expense_check_memo
+
+                checks.append([ref_num, bank, invoice_date, customer_name, from_cents(expense_amt), private_note,
+                               expense_desc, expense_acc])
+                check_no += 1
+
+                # Journal Entries
+                ref_num = 'PMT ' + f'{journal_no:05d}'
+                customer = unit_loop['Customer'].iloc[0]
+                prvt_note = f'Payment {customer} to #{invoice_no}'
+                debit_acct = 'Accounts Receivable (A/R)'
+                credit_acct = 'ABB Trust #5241'
+
+                # Log Journal Entries
+                # Debit
+                journal_entries.append([ref_num, invoice_date, prvt_note, 'False', debit_acct,
+                                        from_cents(total_invoice), debit_acct, tax_location, customer])
+                # Credit
+                journal_entries.append([ref_num, invoice_date, prvt_note, 'False', credit_acct,
+                                        -from_cents(total_invoice), credit_acct, tax_location, customer])
+                journal_no += 1
+
+        entries[group_name] = entry
+
+    invoice_no = first_invoice_no + len(group_names) * len(unit_names)
+
+    empty_entry = RecordBuffer(INVOICE_COLUMNS, OUTPUT_DTYPES)
+    tables = {
+        'entry_CM': entries.get('CM', empty_entry).to_frame(),
+        'entry_NCM': entries.get('NULL', empty_entry).to_frame(),
+        'sales_entry': compute_sales_tax(taxable.to_frame(), tax_rates),
+        'credit_memo': credit_memo.to_frame(),
+        'sales_receipts': sales_receipts.to_frame(),
+        'journal_entries': journal_entries.to_frame(),
+        'checks': checks.to_frame(),
+        'tax_issues': pd.concat(tax_issue_rows, ignore_index=True) if tax_issue_rows else pd.DataFrame(),
+        'man_issues': pd.concat(man_issue_rows, ignore_index=True) if man_issue_rows else pd.DataFrame(),
+    }
+    return tables, (invoice_no, check_no, journal_no)
+
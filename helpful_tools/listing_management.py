@@ -1,13 +1,19 @@
+import os
 import re
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 import pandas as pd
 
 
-def separate_listings_based_on_output(cleaning_col, bnb, vrbo, path, month, year):
+def separate_listings_based_on_output(cleaning_col, bnb, vrbo, path, month, year, max_workers=None):
     """
     Separates listings into different Excel files based on the 'Output' column in the cleaning_col DataFrame.
 
+    Each owner named in 'Output' gets a "<owner> Reservations <month>_<year>.xlsx" workbook with their Airbnb and
+    VRBO reservations. The reservations are split by owner in one pass, and the workbooks are written by a pool of
+    worker processes.
+
     Args:
         cleaning_col (pd.DataFrame): DataFrame with cleaning information including 'Output', 'ListingBNB', and 'VRBO_ID' columns.
         bnb (pd.DataFrame): DataFrame with Airbnb listings.
@@ -15,21 +21,60 @@ def separate_listings_based_on_output(cleaning_col, bnb, vrbo, path, month, year
         path (str): Base path to save the Excel files.
         month (int): Current month for file naming.
         year (int): Current year for file naming.
+        max_workers (int, optional): Number of worker processes. Defaults to one per owner, up to the CPU count.
+            1 writes the workbooks in this process.
+
+    Returns:
+        list: Paths of the workbooks written.
+    """
+    owners = cleaning_col['Output'].astype(object).map(
+        lambda output: isinstance(output, str) and re.match(r'(\w+)', output) is not None)
+    owner_listings = cleaning_col.loc[owners, ['Output', 'ListingBNB', 'VRBO_ID']]
+    if owner_listings.empty:
+        return []
+
+    bnb_rows = rows_by_owner(bnb['Listing'], owner_listings['ListingBNB'], owner_listings['Output'])
+    vrbo_rows = rows_by_owner(vrbo['Property ID'], owner_listings['VRBO_ID'], owner_listings['Output'])
+
+    jobs = []
+    for name in owner_listings['Output'].astype(object).unique():
+        file_path = os.path.join(path, f'{name} Reservations {month}_{year}.xlsx')
+        jobs.append((file_path, bnb.iloc[bnb_rows.get(name, [])], vrbo.iloc[vrbo_rows.get(name, [])]))
+
+    max_workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+    if max_workers == 1:
+        return [write_owner_reservations(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(write_owner_reservations, *zip(*jobs)))
+
+
+def rows_by_owner(keys, owner_keys, owner_names):
+    """
+    Find the rows of each owner's listings in one merge and group by, instead of one isin filter per owner.
+
+    Args:
+        keys (pd.Series): Listing of each reservation.
+        owner_keys (pd.Series): Listings of the owners. A listing may belong to several owners.
+        owner_names (pd.Series): Owner of each entry of owner_keys.
+
+    Returns:
+        dict: Owner -> positions of their reservations, in the order of keys.
+    """
+    reservations = pd.DataFrame({'key': np.asarray(keys, dtype=object), 'row': np.arange(len(keys))})
+    listings = pd.DataFrame({'key': np.asarray(owner_keys, dtype=object),
+                             'owner': np.asarray(owner_names, dtype=object)}).drop_duplicates()
+    matched = reservations.merge(listings, on='key')
+    return {owner: np.sort(rows.to_numpy()) for owner, rows in matched.groupby('owner', sort=False)['row']}
+
+
+def write_owner_reservations(file_path, filtered_bnb, filtered_vrbo):
+    """
+    Write one owner's reservations workbook. Runs inside the worker processes.
+
+    Returns:
+        str: file_path.
     """
-    aviad_excel = defaultdict(lambda: {'listings2find': [], 'vrbo_ids': []})
-
-    for index, row in cleaning_col.iterrows():
-        try:
-            if isinstance(row['Output'], str) and re.match(r'(\w+)', row['Output']):
-                aviad_excel[row['Output']]['listings2find'].append(row['ListingBNB'])
-                aviad_excel[row['Output']]['vrbo_ids'].append(row['VRBO_ID'])
-        except TypeError:
-            pass  # Handle empty or NaN values
-
-    for name, info in aviad_excel.items():
-        filtered_bnb = bnb[bnb['Listing'].isin(info['listings2find'])]
-        filtered_vrbo = vrbo[vrbo['Property ID'].isin(info['vrbo_ids'])]
-
-        with pd.ExcelWriter(f"{path}\\{name} Reservations {month}_{year}.xlsx", engine='xlsxwriter') as writer:
-            filtered_bnb.to_excel(writer, index=False, sheet_name='AirBNB')
-            filtered_vrbo.to_excel(writer, index=False, sheet_name='VRBO')
+    with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
+        filtered_bnb.to_excel(writer, index=False, sheet_name='AirBNB')
+        filtered_vrbo.to_excel(writer, index=False, sheet_name='VRBO')
+    return file_path
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+
+def to_cents(amount):
+    """
+    Convert dollar amounts to int64 cents, rounding to the nearest cent. NaN counts as 0.
+
+    Args:
+        amount (float, array-like or pd.Series): Dollar amounts.
+
+    Returns:
+        int, np.ndarray or pd.Series: Cents, of the same kind as amount.
+    """
+    cents = np.rint(np.nan_to_num(np.asarray(amount, dtype=float) * 100)).astype(np.int64)
+    if isinstance(amount, pd.Series):
+        return pd.Series(cents, index=amount.index, name=amount.name)
+    return int(cents) if np.ndim(cents) == 0 else cents
+
+
+def from_cents(cents):
+    """
+    Convert cents back to dollar floats, e.g. for writing the output sheets.
+
+    Args:
+        cents (int, array-like, pd.Series or pd.DataFrame): Amounts in cents.
+
+    Returns:
+        float, np.ndarray, pd.Series or pd.DataFrame: Dollar amounts, of the same kind as cents.
+    """
+    if isinstance(cents, (pd.Series, pd.DataFrame)):
+        return cents.astype(float) / 100
+    dollars = np.asarray(cents, dtype=float) / 100
+    return float(dollars) if np.ndim(dollars) == 0 else dollars
+
+
+def sum_cents(amounts):
+    """
+    Sum dollar amounts exactly, in cents. NaN counts as 0.
+    """
+    return int(np.sum(to_cents(amounts)))
+
+
+def scale_cents(cents, rate):
+    """
+    Multiply cents by a rate (a fee or tax fraction) and round back to whole cents.
+
+    Args:
+        cents (int, array-like or pd.Series): Amounts in cents.
+        rate (float or array-like): Rate to apply, e.g. 0.015 for 1.5%.
+
+    Returns:
+        int, np.ndarray or pd.Series: Cents, of the same kind as cents.
+    """
+    scaled = np.rint(np.asarray(cents, dtype=float) * rate).astype(np.int64)
+    if isinstance(cents, pd.Series):
+        return pd.Series(scaled, index=cents.index, name=cents.name)
+    return int(scaled) if np.ndim(scaled) == 0 else scaled
+
+
+def format_money(cents):
+    """
+    Format cents as '$1,234.56', the way amounts are written in the memos.
+
+    Args:
+        cents (int, array-like or pd.Series): Amounts in cents.
+
+    Returns:
+        str or np.ndarray: The formatted amount, or an array of them for array input.
+    """
+    if np.ndim(cents) == 0:
+        return _format_cents(int(cents))
+    return np.array([_format_cents(int(value)) for value in np.asarray(cents)], dtype=object)
+
+
+def _format_cents(cents):
+    sign = '-' if cents < 0 else ''
+    dollars, remainder = divmod(abs(cents), 100)
+    return f'${sign}{dollars:,}.{remainder:02d}'
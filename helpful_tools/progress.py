@@ -0,0 +1,108 @@
+import sys
+import traceback
+from datetime import datetime
+
+
+class QueueReporter:
+    """
+    Stand-in for the GUI app when the pipeline runs in a worker thread.
+
+    Progress and log messages are posted to a queue as events instead of touching Tk, which may only be used from
+    the main thread. The GUI drains the queue on a timer, see InvoiceGenerator.drain_events. Events are tuples:
+    ('progress', value), ('log', message, no_time, time), ('done', result) and ('error', message). A log event carries
+    the time it was posted, so the window shows when the message was written rather than when it was drained.
+    """
+
+    def __init__(self, events):
+        """
+        Args:
+            events (queue.Queue): Queue the events are posted to.
+        """
+        self.events = events
+        self._last_progress = None
+
+    def progress(self, value):
+        """
+        Post a progress bar value. Repeated values are dropped since they would not change the bar.
+        """
+        value = int(value)
+        if value != self._last_progress:
+            self._last_progress = value
+            self.events.put(('progress', value))
+
+    def log(self, message, no_time=False):
+        """
+        Post a message for the command window, with the current time.
+        """
+        self.events.put(('log', message, no_time, datetime.now()))
+
+    def run(self, target, *args):
+        """
+        Run target(self, *args) and post its result as a 'done' event, or the traceback as an 'error' event.
+        """
+        try:
+            result = target(self, *args)
+        except Exception:
+            self.events.put(('error', traceback.format_exc()))
+        else:
+            self.events.put(('done', result))
+
+
+class ConsoleReporter:
+    """
+    Progress sink for headless runs. Log messages are printed with the time, and progress only every 10 percent.
+    """
+
+    def __init__(self, stream=None, show_progress=True):
+        """
+        Args:
+            stream (file, optional): Where to print. Defaults to sys.stdout.
+            show_progress (bool, optional): Print the progress steps. Defaults to True.
+        """
+        self.stream = stream or sys.stdout
+        self.show_progress = show_progress
+        self._next_step = 10
+
+    def progress(self, value):
+        """
+        Print the progress each time it passes another 10 percent.
+        """
+        if self.show_progress and value >= self._next_step:
+            print(f'Progress: {int(value)}%', file=self.stream)
+            self._next_step = (int(value) // 10 + 1) * 10
+
+    def log(self, message, no_time=False):
+        """
+        Print a message, prefixed with the time unless no_time is set.
+        """
+        if no_time:
+            print(message, file=self.stream)
+        else:
+            print(datetime.now().strftime("%H:%M:%S") + ": " + message, file=self.stream)
+
+
+class NullReporter:
+    """
+    Progress sink that discards everything, for benchmarks and tests.
+    """
+
+    def progress(self, value):
+        pass
+
+    def log(self, message, no_time=False):
+        pass
+
+
+def update_progress_bar(app, value):
+    """
+    Updates the application's progress bar to the specified value.
+
+    Args:
+        app: Application instance, either with a progress method (e.g. QueueReporter) or a progress bar attribute.
+        value (int): The value to set the progress bar to.
+    """
+    if hasattr(app, 'progress'):
+        app.progress(value)
+    else:
+        app.progress_bar["value"] = value
+        app.progress_bar.update()
@@ -0,0 +1,55 @@
+import pandas as pd
+
+
+class RecordBuffer:
+    """
+    Append-only table of output rows, stored as one list per column.
+
+    Appending a row is O(1) and the DataFrame is only built once, by to_frame, instead of concatenating a one-row
+    DataFrame per line item and copying everything accumulated so far.
+    """
+
+    def __init__(self, columns, dtypes=None):
+        """
+        Args:
+            columns (list): Column names, in output order.
+            dtypes (dict, optional): Column -> dtype applied by to_frame. Columns not in the buffer are ignored.
+        """
+        self.columns = list(columns)
+        self.dtypes = {col: dtype for col, dtype in (dtypes or {}).items() if col in self.columns}
+        self._data = {col: [] for col in self.columns}
+
+    def __len__(self):
+        return len(self._data[self.columns[0]])
+
+    def append(self, row):
+        """
+        Append one row given in column order.
+
+        Returns:
+            int: Position of the new row.
+        """
+        if len(row) != len(self.columns):
+            raise ValueError(f'Expected {len(self.columns)} values, got {len(row)}.')
+        for col, value in zip(self.columns, row):
+            self._data[col].append(value)
+        return len(self) - 1
+
+    def get(self, position, column):
+        """
+        Return the value of column in the row at position. Negative positions count from the end.
+        """
+        return self._data[column][position]
+
+    def set(self, position, column, value):
+        """
+        Overwrite the value of column in the row at position. Negative positions count from the end.
+        """
+        self._data[column][position] = value
+
+    def to_frame(self):
+        """
+        Materialize the buffered rows as a DataFrame with the declared dtypes.
+        """
+        df = pd.DataFrame(self._data, columns=self.columns)
+        return df.astype(self.dtypes) if self.dtypes else df
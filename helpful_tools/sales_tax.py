@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from .money import from_cents, scale_cents, to_cents
+
+SALES_ENTRY_COLUMNS = ['Tax_Location', 'Income', 'Municipality', 'County', 'Hospitality_Tax']
+TAXABLE_COLUMNS = ['Tax_Location', 'Taxable_Cents', 'Exempt_Cents']
+
+# Rates used for tax locations missing from the 'Tax Rates' sheet: 3% hospitality tax split evenly between the
+# municipality and the county, with stays of 90 nights or more exempt.
+DEFAULT_TAX_RATE = {'Municipality': 0.015, 'County': 0.015, 'Exempt_90_Day': True}
+
+
+def build_tax_rates(tax_df=None):
+    """
+    Build the hospitality tax rate table.
+
+    Args:
+        tax_df (pd.DataFrame, optional): 'Tax Rates' sheet of Current.xlsx with 'Tax_Location', 'Municipality',
+            'County' and 'Exempt_90_Day' columns. Rates are fractions (0.015 for 1.5%). Blank cells fall back to
+            DEFAULT_TAX_RATE.
+
+    Returns:
+        pd.DataFrame: 'Municipality', 'County' and 'Exempt_90_Day' indexed by tax location.
+    """
+    columns = list(DEFAULT_TAX_RATE)
+    if tax_df is None or tax_df.empty or 'Tax_Location' not in tax_df:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='Tax_Location'))
+
+    rates = pd.DataFrame(tax_df, columns=['Tax_Location'] + columns)
+    rates = rates[rates['Tax_Location'].notnull()].drop_duplicates(subset='Tax_Location', keep='first')
+    for column in ['Municipality', 'County']:
+        rates[column] = pd.to_numeric(rates[column], errors='coerce').fillna(DEFAULT_TAX_RATE[column])
+    rates['Exempt_90_Day'] = rates['Exempt_90_Day'].map(parse_flag)
+    return rates.set_index('Tax_Location')[columns]
+
+
+def parse_flag(value, default=DEFAULT_TAX_RATE['Exempt_90_Day']):
+    """
+    Read a yes/no cell. Blank cells return default.
+    """
+    if isinstance(value, str):
+        return value.strip().lower() not in ['no', 'n', 'false', 'f', '0', '']
+    if pd.isnull(value):
+        return default
+    return bool(value)
+
+
+def compute_sales_tax(taxable, tax_rates):
+    """
+    Compute the hospitality tax of every taxable line at once.
+
+    Args:
+        taxable (pd.DataFrame): One row per taxed (customer, tax location, cleaning fee) line with 'Tax_Location',
+            'Taxable_Cents' (income less cleaning fees) and 'Exempt_Cents' (income from stays of 90 nights or more),
+            both in cents.
+        tax_rates (pd.DataFrame): Rate table from build_tax_rates.
+
+    Returns:
+        pd.DataFrame: Sales tax lines with SALES_ENTRY_COLUMNS in dollars. The municipality and county taxes are
+            rounded to the cent from the exact taxable amount, and Hospitality_Tax is their sum, so the parts always
+            add up to the total. Lines with nothing to tax are left out.
+    """
+    locations = taxable['Tax_Location']
+    municipality_rate = _rate_column(locations, tax_rates, 'Municipality').astype(float)
+    county_rate = _rate_column(locations, tax_rates, 'County').astype(float)
+    exempt = _rate_column(locations, tax_rates, 'Exempt_90_Day').astype(bool)
+
+    income = taxable['Taxable_Cents'].to_numpy(dtype=np.int64)
+    base = income - np.where(exempt, taxable['Exempt_Cents'].to_numpy(dtype=np.int64), 0)
+    keep = base != 0
+    municipality = scale_cents(base, municipality_rate)[keep]
+    county = scale_cents(base, county_rate)[keep]
+
+    return pd.DataFrame({
+        'Tax_Location': locations.to_numpy()[keep],
+        'Income': from_cents(base[keep]),
+        'Municipality': from_cents(municipality),
+        'County': from_cents(county),
+        'Hospitality_Tax': from_cents(municipality + county),
+    }, columns=SALES_ENTRY_COLUMNS)
+
+
+def _rate_column(locations, tax_rates, column):
+    """
+    Look up one rate column for every location, using the default rate for unknown locations.
+    """
+    return locations.map(tax_rates[column]).fillna(DEFAULT_TAX_RATE[column]).to_numpy()
+
+
+def rollup_sales_tax(sales_entry):
+    """
+    Sum the sales tax lines per tax location, in order of first appearance. Amounts are summed in cents so the
+    totals are exact.
+
+    Args:
+        sales_entry (pd.DataFrame): Sales tax lines from compute_sales_tax.
+
+    Returns:
+        pd.DataFrame: One row per tax location with SALES_ENTRY_COLUMNS.
+    """
+    amounts = SALES_ENTRY_COLUMNS[1:]
+    cents = sales_entry[['Tax_Location']].assign(**{col: to_cents(sales_entry[col]) for col in amounts})
+    totals = cents.groupby('Tax_Location', sort=False)[amounts].sum()
+    return from_cents(totals).reset_index()[SALES_ENTRY_COLUMNS]
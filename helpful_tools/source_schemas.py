@@ -0,0 +1,114 @@
+import pandas as pd
+
+# Columns read from each input source and the dtype they are stored as. Every other column of the exports is
+# skipped at read time. Names that repeat on many rows are categoricals, money and counts are float64 (blank cells
+# become NaN) and dates are datetime64.
+SOURCE_SCHEMAS = {
+    'bnb': {
+        'Date': 'datetime64[ns]',
+        'Type': 'category',
+        'Confirmation Code': 'object',
+        'Start Date': 'datetime64[ns]',
+        'Nights': 'float64',
+        'Guest': 'object',
+        'Listing': 'category',
+        'Amount': 'float64',
+        'Host Fee': 'float64',
+        'Cleaning Fee': 'float64',
+    },
+    'check': {
+        'Confirmation code': 'object',
+        'Start date': 'datetime64[ns]',
+        'End date': 'datetime64[ns]',
+        '# of nights': 'float64',
+        'Listing': 'category',
+        'Earnings': 'float64',
+    },
+    'vrbo': {
+        'Property ID': 'float64',
+        'Address': 'object',
+        'Reservation ID': 'object',
+        'Traveler First Name': 'object',
+        'Traveler Last Name': 'object',
+        'Booking status': 'category',
+        'Check-in': 'datetime64[ns]',
+        'Check-out': 'datetime64[ns]',
+        'Nights': 'float64',
+        'Gross booking amount': 'float64',
+        'Deductions': 'float64',
+        'Payout': 'float64',
+    },
+    'cleaning': {
+        'Code': 'object',
+        'ListingBNB': 'object',
+        'QBO': 'object',
+        'Cleaning': 'float64',
+        'Tax_Location': 'object',
+        'VRBO_ID': 'float64',
+        'Pest': 'float64',
+        'Landscape': 'float64',
+        'Internet/Cable': 'float64',
+        'Output': 'object',
+        'Bus_Lic': 'float64',
+    },
+    'customer_info': {
+        'Customer-QBO': 'object',
+        'Expense_Flat': 'float64',
+        'Credit': 'object',
+        'Magpercent': 'float64',
+        'Clean': 'object',
+        'Hosp': 'object',
+        'Management': 'object',
+    },
+    'tax_rates': {
+        'Tax_Location': 'object',
+        'Municipality': 'float64',
+        'County': 'float64',
+        'Exempt_90_Day': 'object',
+    },
+}
+
+# Sources read with every column. The schema still sets the dtypes of its columns. The Cleaning Fee Report is small,
+# and its rows are written whole to the Missing Customer sheet.
+READ_ALL_COLUMNS = {'cleaning'}
+
+
+def schema_columns(source):
+    """
+    Return the columns to read for a source, or None to read every column of an unknown source or of the
+    READ_ALL_COLUMNS.
+
+    Args:
+        source (str): Dataframe key of the source, e.g. 'bnb'.
+
+    Returns:
+        list or None: Column names in schema order, or None to read every column.
+    """
+    schema = SOURCE_SCHEMAS.get(source)
+    return list(schema) if schema is not None and source not in READ_ALL_COLUMNS else None
+
+
+def apply_schema(df, source):
+    """
+    Convert the columns of a freshly read source to their declared dtypes.
+
+    Values that cannot be converted become NaN/NaT instead of failing the run. Columns missing from the export are
+    left missing.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to convert.
+        source (str): Dataframe key of the source, e.g. 'bnb'.
+
+    Returns:
+        pd.DataFrame: The converted DataFrame.
+    """
+    for column, dtype in SOURCE_SCHEMAS.get(source, {}).items():
+        if column not in df:
+            continue
+        if dtype == 'float64':
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+        elif dtype == 'datetime64[ns]':
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+        elif dtype == 'category':
+            df[column] = df[column].astype('category')
+    return df
@@ -0,0 +1,123 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class StageTimer:
+    """
+    Wall-clock time, CPU time, row counts and peak memory of the stages of an invoicing run.
+
+    Every stage runs inside a span, which can note how many rows it produced:
+
+        with timer.span('Aggregate unit', rows_in=len(bnb_col)) as stage:
+            unit = aggregate_customer_data(...)
+            stage['rows_out'] = len(unit)
+
+    Spans follow each other, they are not nested. Peak memory is only measured with trace_memory, since tracemalloc
+    slows down allocation heavy stages.
+    """
+
+    def __init__(self, trace_memory=False):
+        """
+        Args:
+            trace_memory (bool, optional): Measure the peak memory of each stage with tracemalloc. Defaults to False.
+        """
+        self.trace_memory = trace_memory
+        self.started = datetime.now()
+        self.stages = []
+
+    @contextmanager
+    def span(self, name, rows_in=None):
+        """
+        Measure the stage run inside the with block. The stage is recorded even if the block raises.
+
+        Args:
+            name (str): Stage name.
+            rows_in (int, optional): Number of rows the stage works on.
+
+        Yields:
+            dict: The stage record. Set 'rows_out' on it to record the number of rows produced.
+        """
+        stage = {'name': name, 'rows_in': rows_in, 'rows_out': None}
+        started_tracing = False
+        baseline = 0
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_seconds()
+        try:
+            yield stage
+        finally:
+            stage['wall_seconds'] = time.perf_counter() - wall_start
+            stage['cpu_seconds'] = _cpu_seconds() - cpu_start
+            if self.trace_memory:
+                stage['peak_memory_mb'] = (tracemalloc.get_traced_memory()[1] - baseline) / 2 ** 20
+                if started_tracing:
+                    tracemalloc.stop()
+            self.stages.append(stage)
+
+    def total(self):
+        """
+        Return the combined wall-clock time of the finished stages, in seconds.
+        """
+        return sum(stage['wall_seconds'] for stage in self.stages)
+
+    def format_table(self):
+        """
+        Return the finished stages as a text table, one line per stage followed by the total.
+        """
+        width = max([len(stage['name']) for stage in self.stages] + [len('Total')])
+        lines = [f'{"Stage":<{width}}  {"Wall s":>9}  {"CPU s":>9}  {"Rows in":>9}  {"Rows out":>9}  {"Peak MB":>9}']
+        for stage in self.stages:
+            lines.append(f'{stage["name"]:<{width}}  {stage["wall_seconds"]:9.3f}  {stage["cpu_seconds"]:9.3f}  '
+                         f'{_format_count(stage["rows_in"])}  {_format_count(stage["rows_out"])}  '
+                         f'{_format_memory(stage.get("peak_memory_mb"))}')
+        lines.append(f'{"Total":<{width}}  {self.total():9.3f}')
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        """
+        Return the run as a JSON serializable dict.
+        """
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'total_wall_seconds': round(self.total(), 4),
+            'stages': [{key: round(value, 4) if isinstance(value, float) else value for key, value in stage.items()}
+                       for stage in self.stages],
+        }
+
+    def write_report(self, file_path):
+        """
+        Write the run report as JSON.
+
+        Args:
+            file_path (str): Path of the report file.
+
+        Returns:
+            str: file_path.
+        """
+        with open(file_path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+        return file_path
+
+
+def _cpu_seconds():
+    # CPU time of this process and of its finished child processes, i.e. the ingestion workers
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _format_count(count):
+    return f'{count:>9,}' if count is not None else f'{"-":>9}'
+
+
+def _format_memory(megabytes):
+    return f'{megabytes:9.1f}' if megabytes is not None else f'{"-":>9}'
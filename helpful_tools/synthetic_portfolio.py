@@ -0,0 +1,338 @@
+import argparse
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .date_and_reference import month_number_to_name
+
+# Size and mix of the April 2023 portfolio the generator is calibrated on
+BASELINE_PORTFOLIO = {
+    'owners': 212,
+    'listings': 344,
+    'reservations': 880,
+    'vrbo_reservations': 80,
+    'long_stay_share': 0.015,
+    'dirty_name_share': 0.05,
+}
+
+NAME_ADJECTIVES = ['Cozy', 'Relaxing', 'Amazing', 'Sunny', 'Gorgeous', 'Charming', 'Spacious', 'Adorable', 'Modern',
+                   'Bright', 'Beautiful', 'Cute']
+NAME_TYPES = ['condo', 'studio', 'villa', 'cottage', 'duplex', 'townhouse', 'apartment', 'bungalow']
+NAME_PLACES = ['across from the beach', 'in the center of MB', 'by the golf course', 'with ocean view',
+               'near the boardwalk', 'in Little River', 'with pool', 'steps to the sand']
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Daniel', 'Karen']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee']
+STREETS = ['Holly Dr', 'Burris St', 'Dogwood Dr N', 'Wild Iris Dr', 'Ocean Blvd', 'Kings Hwy', 'Pine Ave', 'Oak St']
+# Characters the Airbnb and Reservations exports add around listing names, all removed by the listing cleanup
+DIRTY_PARTS = [' ★', '  ', ' | ', ' ~ ', ' ☀️']
+CODE_ALPHABET = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'))
+EXCEL_MAX_ROWS = 1_048_576
+
+CLEANING_FEES = ([99, 109, 89, 139, 169, 229, 299], [0.55, 0.16, 0.11, 0.06, 0.04, 0.04, 0.04])
+TAX_LOCATIONS = (['MB', 'NMB', 'COUNTY'], [0.67, 0.19, 0.14])
+EXPENSES = ([100, 150, 500, 800, 400], [0.56, 0.17, 0.15, 0.07, 0.05])
+
+
+def scaled_portfolio(scale):
+    """
+    Return the generate_portfolio size arguments for a portfolio scale times the size of BASELINE_PORTFOLIO.
+    """
+    sizes = {key: max(1, int(round(value * scale))) for key, value in BASELINE_PORTFOLIO.items()
+             if isinstance(value, int)}
+    shares = {key: value for key, value in BASELINE_PORTFOLIO.items() if not isinstance(value, int)}
+    return {**sizes, **shares}
+
+
+def generate_portfolio(out_dir, month, year, owners=212, listings=344, reservations=880, vrbo_reservations=80,
+                       long_stay_share=0.015, dirty_name_share=0.05, seed=0):
+    """
+    Write a synthetic set of input workbooks for one month, in the layout load_files expects.
+
+    The files are airbnb_MM_YYYY-MM_YYYY.xlsx, Reservations-Month_YYYY.xlsx, VRBO_MM_YYYY-MM_YYYY.xlsx, Current.xlsx
+    (Cleaning Fee Report and Customer Report sheets) and VRBO Date Organizer.xlsx. Amounts, stay lengths, fees and
+    the share of omitted, credit memo and VRBO customers follow the April 2023 portfolio. A few listings and VRBO
+    properties are left out of Current.xlsx so the Missing sheets are exercised too.
+
+    Args:
+        out_dir (str): Directory to write the workbooks to. Created if missing.
+        month (int): Month of the exports.
+        year (int): Year of the exports.
+        owners (int, optional): Number of customers in the Customer Report.
+        listings (int, optional): Number of listings in the Cleaning Fee Report.
+        reservations (int, optional): Number of Airbnb reservations. Each adds about three rows to the Airbnb export,
+            which has to fit on one Excel sheet, so at most about 340,000.
+        vrbo_reservations (int, optional): Number of VRBO reservations.
+        long_stay_share (float, optional): Share of stays of 90 nights or more.
+        dirty_name_share (float, optional): Share of listings whose name has extra characters in the exports.
+        seed (int, optional): Random seed. The same arguments always give the same workbooks.
+
+    Returns:
+        dict: Input name ('airbnb', 'reservations', 'vrbo', 'current', 'vrbo_organizer') -> file path.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    month_start = pd.Timestamp(year=year, month=month, day=1)
+
+    customers = _customer_report(rng, owners)
+    cleaning = _cleaning_fee_report(rng, listings, customers['Customer-QBO'].to_numpy(), dirty_name_share)
+    airbnb, check = _airbnb_exports(rng, cleaning, reservations, long_stay_share, month_start)
+    vrbo, organizer = _vrbo_exports(rng, cleaning, vrbo_reservations, long_stay_share, month_start)
+
+    period = f'{month:02d}_{year}-{month:02d}_{year}'
+    paths = {
+        'airbnb': os.path.join(out_dir, f'airbnb_{period}.xlsx'),
+        'reservations': os.path.join(out_dir, f'Reservations-{month_number_to_name(month)}_{year}.xlsx'),
+        'vrbo': os.path.join(out_dir, f'VRBO_{period}.xlsx'),
+        'current': os.path.join(out_dir, 'Current.xlsx'),
+        'vrbo_organizer': os.path.join(out_dir, 'VRBO Date Organizer.xlsx'),
+    }
+    _write_workbook(paths['airbnb'], {'Sheet1': airbnb})
+    _write_workbook(paths['reservations'], {'Sheet1': check})
+    _write_workbook(paths['vrbo'], {'Sheet1': vrbo})
+    _write_workbook(paths['current'], {'Cleaning Fee Report': cleaning.drop(columns='ExportName'),
+                                       'Customer Report': customers})
+    _write_workbook(paths['vrbo_organizer'], {'VRBO Check Outs': organizer})
+    return paths
+
+
+def _customer_report(rng, owners):
+    index = _numbered(np.arange(owners))
+    first = _pick(rng, FIRST_NAMES, owners)
+    last = _pick(rng, LAST_NAMES, owners)
+    company = rng.random(owners) < 0.3
+    names = np.where(company, pd.Series(last).str.upper().to_numpy() + ' HOLDINGS ' + index + ' LLC',
+                     first + ' ' + last + ' ' + index)
+
+    # About one customer in ten is not managed at all, and a few more only skip the management fee
+    unmanaged = rng.random(owners) < 0.1
+    management_omitted = unmanaged | (rng.random(owners) < 0.03)
+    magpercent = rng.choice([20, 15, 10, 5, 0], owners, p=[0.9, 0.02, 0.01, 0.01, 0.06]).astype(float)
+    magpercent[rng.random(owners) < 0.04] = np.nan
+
+    return pd.DataFrame({
+        'Customer-QBO': names,
+        'NOTE': None,
+        'Expense_Flat': np.where(rng.random(owners) < 0.5, rng.choice(EXPENSES[0], owners, p=EXPENSES[1]), np.nan),
+        'Credit': np.where(rng.random(owners) < 0.25, 'CM', None),
+        'Magpercent': magpercent,
+        'Clean': np.where(unmanaged, 'omit', np.where(rng.random(owners) < 0.01, 'del', None)),
+        'Hosp': np.where(unmanaged, 'omit', None),
+        'Management': np.where(management_omitted, 'omit', None),
+    })
+
+
+def _cleaning_fee_report(rng, listings, customer_names, dirty_name_share):
+    codes = 'U' + _numbered(np.arange(listings))
+    names = (codes + '-' + _pick(rng, NAME_ADJECTIVES, listings) + ' ' + _pick(rng, NAME_TYPES, listings) + ' ' +
+             _pick(rng, NAME_PLACES, listings))
+
+    # Every customer owns at least one listing, the others are spread over the customers at random
+    owner = np.concatenate([np.arange(min(listings, len(customer_names))),
+                            rng.integers(0, len(customer_names), max(0, listings - len(customer_names)))])
+    rng.shuffle(owner)
+    qbo = customer_names[owner].astype(object)
+    qbo[rng.random(listings) < 0.02] = 'NONE'
+
+    has_vrbo = rng.random(listings) < 0.29
+    vrbo_ids = np.full(listings, np.nan)
+    vrbo_ids[has_vrbo] = 2_000_000 + rng.permutation(np.flatnonzero(has_vrbo)) * 7 + rng.integers(0, 7, has_vrbo.sum())
+
+    output_owners = np.array([f'Owner Report {n + 1}' for n in range(max(1, listings // 300))])
+    separate = rng.random(listings) < 0.01
+
+    return pd.DataFrame({
+        'Code': codes,
+        'ListingBNB': names,
+        'ExportName': _dirty_names(rng, names, dirty_name_share),
+        'STATUS': 'Listed',
+        'LOCATION': 'Myrtle Beach, SC',
+        'QBO': qbo,
+        'Cleaning': np.where(rng.random(listings) < 0.03, np.nan,
+                             rng.choice(CLEANING_FEES[0], listings, p=CLEANING_FEES[1])),
+        'Tax_Location': np.where(rng.random(listings) < 0.005, None,
+                                 rng.choice(TAX_LOCATIONS[0], listings, p=TAX_LOCATIONS[1])),
+        'AirBNBaccount': 'name',
+        'VRBO_ID': vrbo_ids,
+        'Pest': _sometimes(rng, listings, 0.22, [6, 90, 70, 45, 10]),
+        'Landscape': _sometimes(rng, listings, 0.05, [50, 75, 100]),
+        'Internet/Cable': _sometimes(rng, listings, 0.05, [65, 80, 120]),
+        'Maintenance': np.nan,
+        'Output': np.where(separate, output_owners[rng.integers(0, len(output_owners), listings)], None),
+        'Bus_Lic': np.where(rng.random(listings) < 0.1, np.round(rng.uniform(15, 40, listings), 2), np.nan),
+    })
+
+
+def _airbnb_exports(rng, cleaning, reservations, long_stay_share, month_start):
+    """
+    Build the Airbnb transaction export and the Reservations export.
+    """
+    n = reservations
+    # A few popular listings take most of the bookings, and about 1% of the bookings are for unknown listings
+    popularity = rng.gamma(2.0, 1.0, len(cleaning))
+    listing = rng.choice(len(cleaning), n, p=popularity / popularity.sum())
+    listing_names = cleaning['ExportName'].to_numpy()[listing].astype(object)
+    unknown = rng.random(n) < 0.01
+    listing_names[unknown] = 'Unlisted ' + _numbered(np.flatnonzero(unknown))
+
+    nights = _stay_lengths(rng, n, long_stay_share)
+    end = _days_into(rng, month_start, n)
+    start = end - pd.to_timedelta(nights, unit='D')
+    paid = (start + pd.Timedelta(days=1)).clip(month_start, month_start + pd.offsets.MonthEnd(0))
+    amount = np.round(nights * rng.lognormal(np.log(120), 0.4, n), 2)
+    codes = 'HM' + _random_codes(rng, n, 8)
+    guests = _full_names(rng, n)
+    cleaning_fee = np.nan_to_num(cleaning['Cleaning'].to_numpy()[listing])
+
+    reservation_rows = pd.DataFrame({
+        'Date': paid, 'Type': 'Reservation', 'Confirmation Code': codes, 'Start Date': start, 'Nights': nights,
+        'Guest': guests, 'Listing': listing_names, 'Details': None, 'Reference': None, 'Currency': 'USD',
+        'Amount': amount, 'Paid Out': np.nan, 'Host Fee': np.round(amount * 0.031, 2), 'Cleaning Fee': cleaning_fee,
+        'Earnings Year': month_start.year,
+    })
+    payout_rows = reservation_rows.assign(
+        Type='Payout', **{'Confirmation Code': None, 'Start Date': pd.NaT, 'Nights': np.nan, 'Guest': None,
+                          'Listing': None, 'Details': 'Transfer to LINE PROPERTIES INC, Checking 5241 (USD)',
+                          'Amount': np.nan, 'Paid Out': amount, 'Host Fee': np.nan, 'Cleaning Fee': np.nan,
+                          'Earnings Year': None})
+    pass_through = reservation_rows[rng.random(n) < 0.9].copy()
+    pass_through['Type'] = 'Pass Through Tot'
+    pass_through['Amount'] = np.round(pass_through['Amount'] * 0.023, 2)
+    pass_through[['Host Fee', 'Cleaning Fee']] = 0
+    resolution = reservation_rows[rng.random(n) < 0.2].copy()
+    resolution['Type'] = 'Resolution Payout'
+    resolution['Amount'] = rng.choice([25, 50, 75, 100, 150], len(resolution)).astype(float)
+    resolution[['Host Fee', 'Cleaning Fee']] = np.nan
+    adjustment = reservation_rows[rng.random(n) < 0.006].copy()
+    adjustment['Type'] = 'Adjustment'
+    adjustment['Amount'] = -np.round(rng.uniform(10, 100, len(adjustment)), 2)
+
+    airbnb = pd.concat([payout_rows, reservation_rows, pass_through, resolution, adjustment], ignore_index=True)
+    airbnb = airbnb.sort_values('Date', ascending=False, kind='stable', ignore_index=True)
+
+    # The Reservations export lists the stays that checked out, a few cancelled ones are missing from it
+    listed = rng.random(n) < 0.96
+    check = pd.DataFrame({
+        'Confirmation code': codes, 'Status': 'Past guest', 'Guest name': guests,
+        'Contact': '+1 843-' + _numbered(rng.integers(0, 1000, n), 3) + '-' + _numbered(rng.integers(0, 10_000, n), 4),
+        '# of adults': rng.integers(1, 5, n), '# of children': rng.integers(0, 3, n), '# of infants': 0,
+        'Start date': start, 'End date': end, '# of nights': nights,
+        'Booked': start - pd.to_timedelta(rng.integers(1, 60, n), unit='D'), 'Listing': listing_names,
+        'Earnings': amount,
+    })[listed].reset_index(drop=True)
+    return airbnb, check
+
+
+def _vrbo_exports(rng, cleaning, vrbo_reservations, long_stay_share, month_start):
+    """
+    Build the VRBO payout export and the VRBO Date Organizer carried over from earlier months.
+    """
+    property_ids = cleaning['VRBO_ID'].dropna().to_numpy()
+    if len(property_ids) == 0:
+        property_ids = np.array([2_000_000.0])
+    n = vrbo_reservations
+    properties = property_ids[rng.integers(0, len(property_ids), n)]
+    # About 1% of the payouts are for properties missing from the Cleaning Fee Report
+    unknown = rng.random(n) < 0.01
+    properties[unknown] = 9_000_000 + np.flatnonzero(unknown)
+
+    nights = _stay_lengths(rng, n, long_stay_share)
+    check_in = _days_into(rng, month_start, n)
+    check_out = check_in + pd.to_timedelta(nights, unit='D')
+    gross = np.round(nights * rng.lognormal(np.log(140), 0.4, n), 2)
+    deductions = np.round(gross * 0.084, 2)
+    vrbo = pd.DataFrame({
+        'Property ID': properties.astype(np.int64), 'Unit ID': properties.astype(np.int64) + 570_631,
+        'Address': _numbered(rng.integers(100, 5000, n), 1) + ' ' + _pick(rng, STREETS, n),
+        'Reservation ID': 'HA-' + _random_codes(rng, n, 6),
+        'Traveler First Name': _pick(rng, FIRST_NAMES, n),
+        'Traveler Last Name': _pick(rng, LAST_NAMES, n),
+        'Booking status': 'Reserve', 'Check-in': check_in, 'Check-out': check_out, 'Nights': nights,
+        'Payout date': check_in + pd.Timedelta(days=1), 'Gross booking amount': gross, 'Deductions': deductions,
+        'Payout': np.round(gross - deductions, 2), 'Lodging Tax Owner Remits': 0, 'Tax Withheld': 0,
+        'Payout currency': 'USD',
+    })
+
+    # Stays paid out in an earlier month that check out this month, kept with a zero payout
+    carried = vrbo[rng.random(n) < 0.2].reset_index(drop=True)
+    carried['Check-out'] = _days_into(rng, month_start, len(carried))
+    carried['Check-in'] = carried['Check-out'] - pd.to_timedelta(carried['Nights'] + month_start.days_in_month,
+                                                                 unit='D')
+    carried['Payout date'] = carried['Check-in'] + pd.Timedelta(days=1)
+    carried['Payout'] = 0.0
+    carried.insert(0, 'Month', month_number_to_name(month_start.month))
+    carried.insert(0, 'Year', month_start.year)
+    return vrbo, carried
+
+
+def _stay_lengths(rng, n, long_stay_share):
+    nights = np.maximum(2, np.round(rng.lognormal(np.log(3.2), 0.6, n))).astype(int)
+    long_stay = rng.random(n) < long_stay_share
+    nights[long_stay] = rng.integers(90, 121, long_stay.sum())
+    return nights
+
+
+def _days_into(rng, month_start, n):
+    # Random days of the month starting at month_start
+    return pd.Series(month_start + pd.to_timedelta(rng.integers(0, month_start.days_in_month, n), unit='D'))
+
+
+def _dirty_names(rng, names, share):
+    dirty = rng.random(len(names)) < share
+    return np.where(dirty, names + _pick(rng, DIRTY_PARTS, len(names)), names)
+
+
+def _pick(rng, words, n):
+    # Random words as an object array, so they can be joined with + like Python strings
+    return np.array(words, dtype=object)[rng.integers(0, len(words), n)]
+
+
+def _sometimes(rng, n, share, values):
+    return np.where(rng.random(n) < share, rng.choice(values, n), np.nan)
+
+
+def _full_names(rng, n):
+    return _pick(rng, FIRST_NAMES, n) + ' ' + _pick(rng, LAST_NAMES, n)
+
+
+def _random_codes(rng, n, length):
+    # One row of random characters per code, viewed as a single fixed width string
+    codes = CODE_ALPHABET[rng.integers(0, len(CODE_ALPHABET), (n, length))].view(f'<U{length}').ravel()
+    return codes.astype(object)
+
+
+def _numbered(values, width=5):
+    return np.char.zfill(np.asarray(values).astype(str), width).astype(object)
+
+
+def _write_workbook(path, sheets):
+    for sheet_name, df in sheets.items():
+        if len(df) >= EXCEL_MAX_ROWS:
+            raise ValueError(f'{os.path.basename(path)} would need {len(df) + 1} rows on sheet "{sheet_name}", more '
+                             f'than Excel allows. Use fewer reservations.')
+    with pd.ExcelWriter(path, engine='xlsxwriter', datetime_format='mm/dd/yyyy') as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+if __name__ == '__main__':
+    # e.g. python -m helpful_tools.synthetic_portfolio SyntheticFiles --month 2023-04 --scale 10
+    parser = argparse.ArgumentParser(description='Write a synthetic month of input workbooks.')
+    parser.add_argument('out_dir', help='Directory to write the workbooks to.')
+    parser.add_argument('--month', default='2023-04', help='Month of the exports, as YYYY-MM.')
+    parser.add_argument('--scale', type=float, default=1.0, help='Size relative to the April 2023 portfolio.')
+    parser.add_argument('--seed', type=int, default=0)
+    for size in ['owners', 'listings', 'reservations', 'vrbo_reservations']:
+        parser.add_argument('--' + size.replace('_', '-'), type=int, default=None)
+    for share in ['long_stay_share', 'dirty_name_share']:
+        parser.add_argument('--' + share.replace('_', '-'), type=float, default=None)
+    args = parser.parse_args()
+
+    date = datetime.strptime(args.month, '%Y-%m')
+    portfolio = scaled_portfolio(args.scale)
+    portfolio.update({key: value for key, value in vars(args).items() if key in portfolio and value is not None})
+    for name, path in generate_portfolio(args.out_dir, date.month, date.year, seed=args.seed, **portfolio).items():
+        print(f'{name}: {path}')
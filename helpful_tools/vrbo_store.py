@@ -0,0 +1,234 @@
+import os
+import shutil
+import sqlite3
+
+import pandas as pd
+
+from .date_and_reference import month_number_to_name
+from .excel_utilities import VRBO_COLUMNS, VRBO_ORGANIZER_SHEET, month_numbers, read_vrbo_organizer
+
+VRBO_STORE_NAME = 'VRBO Carry Overs.sqlite'
+
+# The ids keep the type they have in the VRBO export (no column affinity), so they still match the VRBO_ID of the
+# Cleaning Fee Report when read back.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stays (
+    reservation_id PRIMARY KEY,
+    property_id,
+    nights REAL,
+    check_out TEXT,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stays_property ON stays (property_id);
+CREATE INDEX IF NOT EXISTS stays_check_out ON stays (year, month);
+"""
+
+
+class VrboStore:
+    """
+    SQLite store of the VRBO stays paid out in one month that check out in a later one, replacing the rewrite of the
+    VRBO Date Organizer workbook on every run.
+
+    Stays are keyed by Reservation ID and indexed by Property ID and check-out (year, month), so a month's
+    carry-overs are found without reading the others, and a run only writes the stays that changed. Their payout is
+    not kept: it was invoiced in the month it was paid, so carried over stays are invoiced with a payout of 0.
+
+        with VrboStore(os.path.join(filepath, VRBO_STORE_NAME)) as store:
+            carried_over = carry_over_vrbo_stays(vrbo, store, month, year)
+            store.export_xlsx(os.path.join(path, 'VRBO Date Organizer.xlsx'))
+    """
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path (str): Path of the SQLite file. It is created if it does not exist.
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(SCHEMA)
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM stays').fetchone()[0]
+
+    def upsert(self, stays):
+        """
+        Store stays, replacing the stored ones with the same Reservation ID.
+
+        Args:
+            stays (pd.DataFrame): Stays with the VRBO_COLUMNS. Their check-out gives the year and month they are
+                invoiced in, unless the frame has Year and Month columns.
+
+        Returns:
+            int: Number of stays written.
+        """
+        if stays.empty:
+            return 0
+        check_out = pd.to_datetime(stays['Check-out'])
+        years = stays['Year'] if 'Year' in stays else check_out.dt.year
+        months = month_numbers(stays['Month']) if 'Month' in stays else check_out.dt.month
+        rows = pd.DataFrame({
+            'reservation_id': stays['Reservation ID'],
+            'property_id': stays['Property ID'],
+            'nights': stays['Nights'],
+            'check_out': check_out.dt.strftime('%Y-%m-%d %H:%M:%S'),
+            'year': years,
+            'month': months,
+        }).dropna(subset=['reservation_id', 'year', 'month'])
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO stays VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (reservation_id) DO UPDATE SET '
+                'property_id = excluded.property_id, nights = excluded.nights, check_out = excluded.check_out, '
+                'year = excluded.year, month = excluded.month',
+                _python_rows(rows))
+        return len(rows)
+
+    def prune_before(self, year, month):
+        """
+        Remove the stays that checked out before a month.
+
+        Returns:
+            int: Number of stays removed.
+        """
+        with self.connection:
+            cursor = self.connection.execute('DELETE FROM stays WHERE year < ? OR (year = ? AND month < ?)',
+                                             (year, year, month))
+        return cursor.rowcount
+
+    def checking_out(self, year, month):
+        """
+        Return the stays checking out in a month, with the VRBO_COLUMNS and a Payout of 0.
+        """
+        return self._select('WHERE year = ? AND month = ?', (year, month))
+
+    def find(self, reservation_ids):
+        """
+        Return the stored stays with these Reservation IDs.
+        """
+        reservation_ids = list(reservation_ids)
+        placeholders = ', '.join('?' * len(reservation_ids))
+        return self._select(f'WHERE reservation_id IN ({placeholders})', _python_values(reservation_ids))
+
+    def for_property(self, property_id):
+        """
+        Return the stored stays of a property.
+        """
+        return self._select('WHERE property_id = ?', _python_values([property_id]))
+
+    def to_frame(self):
+        """
+        Return every stored stay as the VRBO Date Organizer lays it out: Year, Month (name) and the VRBO_COLUMNS.
+        """
+        stays = self._select('', (), with_period=True)
+        stays['Month'] = stays['Month'].map(month_number_to_name)
+        return stays
+
+    def export_xlsx(self, file_path):
+        """
+        Write the stored stays as a VRBO Date Organizer workbook, for people to read.
+
+        Returns:
+            str: file_path.
+        """
+        self.to_frame().to_excel(file_path, sheet_name=VRBO_ORGANIZER_SHEET, index=False)
+        return file_path
+
+    def import_organizer(self, organizer_path):
+        """
+        Load the stays of a VRBO Date Organizer workbook, e.g. the one kept before the store existed.
+
+        Returns:
+            int: Number of stays loaded.
+        """
+        return self.upsert(read_vrbo_organizer(organizer_path))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def _select(self, where, parameters, with_period=False):
+        query = (f'SELECT year, month, property_id, reservation_id, nights, check_out FROM stays {where} '
+                 f'ORDER BY year, month, check_out')
+        stays = pd.DataFrame(self.connection.execute(query, parameters).fetchall(),
+                             columns=['Year', 'Month', 'Property ID', 'Reservation ID', 'Nights', 'Check-out'])
+        stays['Check-out'] = pd.to_datetime(stays['Check-out'])
+        stays['Payout'] = 0
+        return stays[(['Year', 'Month'] if with_period else []) + VRBO_COLUMNS]
+
+
+def open_vrbo_store(model_dir, organizer_name='VRBO Date Organizer.xlsx'):
+    """
+    Open the VRBO store of a model directory. When it is created, the stays of the VRBO Date Organizer workbook in
+    the same directory are imported into it.
+
+    Args:
+        model_dir (str): Directory holding the input files.
+        organizer_name (str, optional): File name of the organizer workbook.
+
+    Returns:
+        VrboStore: The open store.
+    """
+    db_path = os.path.join(model_dir, VRBO_STORE_NAME)
+    is_new = not os.path.exists(db_path)
+    store = VrboStore(db_path)
+    organizer_path = os.path.join(model_dir, organizer_name)
+    if is_new and os.path.exists(organizer_path):
+        store.import_organizer(organizer_path)
+    return store
+
+
+def copy_vrbo_store(model_dir, target_dir, organizer_name='VRBO Date Organizer.xlsx'):
+    """
+    Copy the VRBO store of a model directory, and the organizer workbook it is created from, to another directory, so
+    a trial run can update the copy and leave the stored stays unchanged.
+
+    Args:
+        model_dir (str): Directory holding the input files.
+        target_dir (str): Directory to copy to, e.g. a temporary directory.
+        organizer_name (str, optional): File name of the organizer workbook.
+
+    Returns:
+        str: target_dir, to open with open_vrbo_store.
+    """
+    for name in (VRBO_STORE_NAME, organizer_name):
+        if os.path.exists(os.path.join(model_dir, name)):
+            shutil.copyfile(os.path.join(model_dir, name), os.path.join(target_dir, name))
+    return target_dir
+
+
+def carry_over_vrbo_stays(vrbo, store, month, year):
+    """
+    Update the store with this month's VRBO export and return the stays carried over into the month.
+
+    Stays checking out in another month are stored, stays that checked out before the report month are removed, and
+    the stays checking out in the report month are returned to be invoiced. A stay that is already stored is updated
+    from the export, so a changed check-out date moves it.
+
+    Args:
+        vrbo (pd.DataFrame): The VRBO DataFrame of the report month.
+        store (VrboStore): The open store.
+        month (int): The report month as an integer.
+        year (int): The report year.
+
+    Returns:
+        pd.DataFrame: The stored stays checking out in the report month, with the VRBO_COLUMNS.
+    """
+    check_out = vrbo['Check-out']
+    other_month = vrbo[check_out.dt.year * 12 + check_out.dt.month != year * 12 + month]
+    store.upsert(other_month.drop_duplicates('Reservation ID', keep='last'))
+    store.prune_before(year, month)
+    return store.checking_out(year, month)
+
+
+def _python_rows(df):
+    # sqlite3 only binds Python values, so numpy scalars are converted and missing values become NULL
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def _python_values(values):
+    return [value.item() if hasattr(value, 'item') else value for value in values]
@@ -0,0 +1,184 @@
+import os
+import shutil
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    # The warehouse is unavailable without pyarrow
+    pyarrow = None
+    ds = None
+    pq = None
+
+WAREHOUSE_NAME = 'Warehouse'
+# Tables kept for every month: the normalized inputs, the aggregated unit and the invoice tables
+WAREHOUSE_TABLES = ['bnb', 'vrbo', 'check', 'unit', 'entry_NCM', 'entry_CM', 'credit_memo', 'checks', 'sales_entry',
+                    'sales_receipts', 'journal_entries']
+# Columns stored as whole numbers: invoice and check numbers and counts of stays. Every other number, money included,
+# is stored as float64, text and categoricals as strings and dates as timestamps, so a column keeps the same type in
+# every month and the months can always be read together.
+WAREHOUSE_INTEGER_COLUMNS = {
+    'unit': ['Checkouts', 'VRBO_Nights'],
+    'entry_NCM': ['RefNumber'],
+    'entry_CM': ['RefNumber'],
+    'credit_memo': ['RefNumber'],
+    'sales_receipts': ['RefNumber'],
+}
+
+
+def append_to_warehouse(warehouse_dir, year, month, tables):
+    """
+    Store a month's tables in the warehouse, one Parquet partition per table and month:
+    <warehouse_dir>/<table>/year=<year>/month=<month>/part-0.parquet. Running a month again replaces its partitions.
+
+    Args:
+        warehouse_dir (str): Warehouse directory. It is created if it does not exist.
+        year (int): Year of the month.
+        month (int): Month number.
+        tables (dict): Table name -> pd.DataFrame, e.g. the WAREHOUSE_TABLES. Each is stored with the types of
+            warehouse_table.
+
+    Returns:
+        list: Paths of the partition files written.
+    """
+    _require_pyarrow()
+    written = []
+    for name, df in tables.items():
+        partition = os.path.join(warehouse_dir, name, f'year={year}', f'month={month}')
+        shutil.rmtree(partition, ignore_errors=True)
+        os.makedirs(partition)
+        file_path = os.path.join(partition, 'part-0.parquet')
+        pq.write_table(warehouse_table(df, name), file_path)
+        written.append(file_path)
+    return written
+
+
+def warehouse_table(df, table):
+    """
+    Convert a DataFrame to the Arrow table stored in the warehouse, with the same column types every month: the
+    WAREHOUSE_INTEGER_COLUMNS of the table as int64, other numbers as float64, booleans as bool, dates as
+    timestamp[us] and everything else, categoricals included, as string. Values that do not fit their column's type
+    are stored as missing.
+
+    Args:
+        df (pd.DataFrame): Table of one month.
+        table (str): Table name, e.g. 'unit'.
+
+    Returns:
+        pyarrow.Table: The table, without the DataFrame index.
+    """
+    integer_columns = WAREHOUSE_INTEGER_COLUMNS.get(table, [])
+    columns = {}
+    fields = []
+    for column in df.columns:
+        name = str(column)
+        values = df[column]
+        if name in integer_columns:
+            values, arrow_type = pd.to_numeric(values, errors='coerce').astype('Int64'), pyarrow.int64()
+        elif values.dtype.kind == 'b':
+            arrow_type = pyarrow.bool_()
+        elif values.dtype.kind in 'iuf':
+            values, arrow_type = values.astype('float64'), pyarrow.float64()
+        elif values.dtype.kind == 'M':
+            values = values.dt.tz_localize(None) if values.dt.tz is not None else values
+            values, arrow_type = values.astype('datetime64[us]'), pyarrow.timestamp('us')
+        else:
+            values = values.astype(object)
+            values, arrow_type = values.astype(str).where(values.notna(), None), pyarrow.string()
+        columns[name] = values.reset_index(drop=True)
+        fields.append(pyarrow.field(name, arrow_type))
+    return pyarrow.Table.from_pandas(pd.DataFrame(columns), schema=pyarrow.schema(fields), preserve_index=False)
+
+
+def read_warehouse(warehouse_dir, table, filters=None, columns=None, start=None, end=None):
+    """
+    Read a table from the warehouse. The filters and the month range are pushed down to pyarrow, so only the
+    matching partitions are opened and only the matching row groups are read.
+
+    Args:
+        warehouse_dir (str): Warehouse directory.
+        table (str): Table name, e.g. 'unit'.
+        filters (dict, optional): Column -> value, or list of values, the rows must match.
+        columns (list, optional): Columns to read. Defaults to all of them, plus year and month.
+        start (tuple, optional): First (year, month) to read.
+        end (tuple, optional): Last (year, month) to read.
+
+    Returns:
+        pd.DataFrame: The matching rows, with year and month columns, in month order.
+    """
+    _require_pyarrow()
+    table_dir = os.path.join(warehouse_dir, table)
+    if not os.path.isdir(table_dir):
+        raise FileNotFoundError(f'The warehouse has no "{table}" table: {table_dir}')
+
+    partitioning = ds.partitioning(pyarrow.schema([('year', pyarrow.int32()), ('month', pyarrow.int32())]),
+                                   flavor='hive')
+    dataset = ds.dataset(table_dir, format='parquet', partitioning=partitioning)
+    # Months share their column types (see warehouse_table), but a column may be missing from some of them
+    schema = pyarrow.unify_schemas([fragment.physical_schema for fragment in dataset.get_fragments()]
+                                   + [partitioning.schema])
+    dataset = ds.dataset(table_dir, schema=schema, format='parquet', partitioning=partitioning)
+
+    expression = None
+    for column, value in (filters or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        condition = ds.field(column).isin(list(values))
+        expression = condition if expression is None else expression & condition
+    for bound, compare in ((start, _on_or_after), (end, _on_or_before)):
+        if bound is not None:
+            condition = compare(*bound)
+            expression = condition if expression is None else expression & condition
+
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + ['year', 'month']))
+    df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+    return df.sort_values(['year', 'month'], kind='stable').reset_index(drop=True)
+
+
+def warehouse_months(warehouse_dir, table='unit'):
+    """
+    Return the (year, month) of every month stored for a table, in order.
+    """
+    table_dir = os.path.join(warehouse_dir, table)
+    months = []
+    for year_dir in os.listdir(table_dir) if os.path.isdir(table_dir) else []:
+        for month_dir in os.listdir(os.path.join(table_dir, year_dir)):
+            months.append((int(year_dir.split('=')[1]), int(month_dir.split('=')[1])))
+    return sorted(months)
+
+
+def owner_history(warehouse_dir, customer, table='unit', start=None, end=None):
+    """
+    Month by month history of an owner (QuickBooks customer name), e.g. their unit rows or invoice lines.
+    """
+    return read_warehouse(warehouse_dir, table, {'Customer': customer}, start=start, end=end)
+
+
+def listing_history(warehouse_dir, listing, table='unit', start=None, end=None):
+    """
+    Month by month history of a listing, e.g. its unit rows or, with table='bnb', its Airbnb payouts.
+    """
+    return read_warehouse(warehouse_dir, table, {'Listing': listing}, start=start, end=end)
+
+
+def tax_location_history(warehouse_dir, tax_location, table='sales_entry', start=None, end=None):
+    """
+    Month by month sales tax lines of a tax location.
+    """
+    return read_warehouse(warehouse_dir, table, {'Tax_Location': tax_location}, start=start, end=end)
+
+
+def _on_or_after(year, month):
+    return (ds.field('year') > year) | ((ds.field('year') == year) & (ds.field('month') >= month))
+
+
+def _on_or_before(year, month):
+    return (ds.field('year') < year) | ((ds.field('year') == year) & (ds.field('month') <= month))
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError('The warehouse requires pyarrow. Install it with: pip install pyarrow')
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+import sys
+
+import pandas as pd
+
+try:
+    import pyarrow
+    FEATHER_ERRORS = (ValueError, TypeError, pyarrow.ArrowException)
+except ImportError:
+    # Without pyarrow every entry is stored as a pickle instead of Feather.
+    pyarrow = None
+    FEATHER_ERRORS = ()
+
+DEFAULT_MAX_CACHE_BYTES = 512 * 1024 * 1024
+CACHE_EXTENSIONS = ('.feather', '.pkl', '.sheets.json')
+
+
+def default_cache_dir():
+    """
+    Return the default cache directory, next to the ModelFiles folder.
+    """
+    return os.path.join(os.getcwd(), 'WorkbookCache')
+
+
+def file_content_hash(file_path, chunk_size=1024 * 1024):
+    """
+    Compute the SHA-256 digest of a file's contents.
+
+    Args:
+        file_path (str): Path to the file.
+        chunk_size (int): Number of bytes read at a time.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(content_hash, sheet_name, columns, read_kwargs):
+    """
+    Build the cache entry name for one parsed sheet.
+
+    The content hash is kept as a prefix so all entries of a workbook can be invalidated together.
+
+    Args:
+        content_hash (str): Digest returned by file_content_hash.
+        sheet_name (str or int): Sheet that was parsed.
+        columns (list or None): Requested columns, None for all.
+        read_kwargs (dict): Any other arguments passed to pd.read_excel.
+
+    Returns:
+        str: Entry name without extension.
+    """
+    request = json.dumps([sheet_name, columns, read_kwargs], sort_keys=True, default=str)
+    return content_hash[:16] + '-' + hashlib.sha256(request.encode('utf-8')).hexdigest()[:16]
+
+
+def _entry_path(cache_dir, key):
+    """
+    Return the path of an existing entry for key, or None if it is not cached.
+    """
+    for extension in ('.feather', '.pkl'):
+        entry = os.path.join(cache_dir, key + extension)
+        if os.path.exists(entry):
+            return entry
+    return None
+
+
+def _store_frame(df, cache_dir, key):
+    """
+    Store a frame as Feather when possible, falling back to a pickle for frames pyarrow cannot encode
+    (mixed-type object columns, non-string headers).
+    """
+    df = df.reset_index(drop=True)
+    if pyarrow is not None and all(isinstance(col, str) for col in df.columns):
+        entry = os.path.join(cache_dir, key + '.feather')
+        try:
+            _atomic_write(entry, lambda tmp: df.to_feather(tmp))
+            return entry
+        except FEATHER_ERRORS:
+            pass
+    entry = os.path.join(cache_dir, key + '.pkl')
+    _atomic_write(entry, lambda tmp: df.to_pickle(tmp))
+    return entry
+
+
+def _atomic_write(entry, writer):
+    """
+    Write to a temporary file and move it into place so concurrent readers never see a partial entry.
+    """
+    tmp = f'{entry}.{os.getpid()}.tmp'
+    try:
+        writer(tmp)
+        os.replace(tmp, entry)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _load_frame(entry):
+    """
+    Load a cached frame and mark it as recently used.
+    """
+    os.utime(entry)
+    if entry.endswith('.feather'):
+        return pd.read_feather(entry)
+    return pd.read_pickle(entry)
+
+
+def _cached_frame(cache_dir, key, parse, max_bytes):
+    """
+    Return the frame cached under key, calling parse() and storing its result on a miss.
+    """
+    entry = _entry_path(cache_dir, key)
+    if entry is not None:
+        return _load_frame(entry)
+
+    df = parse()
+    _store_frame(df, cache_dir, key)
+    evict_cache(cache_dir, max_bytes)
+    return df
+
+
+def _cached_sheet_names(cache_dir, content_hash, open_workbook):
+    """
+    Return the cached sheet names of a workbook, calling open_workbook() on a miss.
+    """
+    entry = os.path.join(cache_dir, content_hash[:16] + '-sheets.sheets.json')
+    if os.path.exists(entry):
+        os.utime(entry)
+        with open(entry, 'r') as file:
+            return json.load(file)
+
+    sheet_names = open_workbook().sheet_names
+    _atomic_write(entry, lambda tmp: _write_json(tmp, sheet_names))
+    return sheet_names
+
+
+def cached_read_workbook(file_path, sheet_requests, cache_dir=None, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+    """
+    Read several sheets of one workbook, parsing the file at most once.
+
+    The workbook is only opened if at least one of the requested sheets (or its sheet names) is not cached yet,
+    and then the same open workbook serves every miss.
+
+    Args:
+        file_path (str): Path to the workbook.
+        sheet_requests (dict): Label -> request. Each request holds 'sheet', either a sheet index or a substring of
+            the wanted sheet name, plus optional 'columns' and extra pd.read_excel arguments.
+        cache_dir (str, optional): Cache directory. Defaults to default_cache_dir().
+        max_bytes (int): Size limit of the cache directory.
+
+    Returns:
+        dict: Label -> pd.DataFrame. Requests whose sheet name matches no sheet are left out.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    content_hash = file_content_hash(file_path)
+    workbook = []
+
+    def open_workbook():
+        if not workbook:
+            workbook.append(pd.ExcelFile(file_path))
+        return workbook[0]
+
+    frames = {}
+    try:
+        for label, request in sheet_requests.items():
+            request = dict(request)
+            sheet = request.pop('sheet', 0)
+            columns = request.pop('columns', None)
+            if isinstance(sheet, str):
+                sheet_names = _cached_sheet_names(cache_dir, content_hash, open_workbook)
+                sheet = ''.join(s for s in sheet_names if sheet in s)
+                if not sheet:
+                    continue
+
+            key = cache_key(content_hash, sheet, columns, request)
+            frames[label] = _cached_frame(
+                cache_dir, key, lambda: _parse_sheet(open_workbook(), sheet, columns, request), max_bytes)
+    finally:
+        if workbook:
+            workbook[0].close()
+    return frames
+
+
+def _parse_sheet(source, sheet_name, columns, read_kwargs):
+    """
+    Parse one sheet of an open pd.ExcelFile.
+    """
+    usecols = (lambda col: col in columns) if columns is not None else None
+    return pd.read_excel(source, sheet_name=sheet_name, usecols=usecols, **read_kwargs)
+
+
+def _write_json(path, value):
+    with open(path, 'w') as file:
+        json.dump(value, file)
+
+
+def _cache_entries(cache_dir):
+    """
+    List (path, size, last used) for every entry in the cache directory.
+    """
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    for name in os.listdir(cache_dir):
+        if name.endswith(CACHE_EXTENSIONS):
+            entry = os.path.join(cache_dir, name)
+            stat = os.stat(entry)
+            entries.append((entry, stat.st_size, stat.st_mtime))
+    return entries
+
+
+def evict_cache(cache_dir=None, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+    """
+    Remove least recently used entries until the cache directory fits in max_bytes.
+
+    Args:
+        cache_dir (str, optional): Cache directory. Defaults to default_cache_dir().
+        max_bytes (int): Size limit in bytes.
+
+    Returns:
+        int: Number of entries removed.
+    """
+    entries = sorted(_cache_entries(cache_dir or default_cache_dir()), key=lambda item: item[2])
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for entry, size, _ in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(entry)
+        except FileNotFoundError:
+            pass  # Removed by another process
+        total -= size
+        removed += 1
+    return removed
+
+
+def invalidate_cache(cache_dir=None, file_path=None):
+    """
+    Remove cached entries so the next run parses the workbooks again.
+
+    Args:
+        cache_dir (str, optional): Cache directory. Defaults to default_cache_dir().
+        file_path (str, optional): Only remove the entries of this workbook. Defaults to removing everything.
+
+    Returns:
+        int: Number of entries removed.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    prefix = file_content_hash(file_path)[:16] + '-' if file_path else ''
+    removed = 0
+    for entry, _, _ in _cache_entries(cache_dir):
+        if os.path.basename(entry).startswith(prefix):
+            os.remove(entry)
+            removed += 1
+    return removed
+
+
+if __name__ == '__main__':
+    # python -m helpful_tools.workbook_cache invalidate [workbook]
+    if len(sys.argv) < 2 or sys.argv[1] != 'invalidate':
+        print('Usage: python -m helpful_tools.workbook_cache invalidate [workbook]')
+        sys.exit(1)
+    target = sys.argv[2] if len(sys.argv) > 2 else None
+    print(f'{invalidate_cache(file_path=target)} cache entries removed.')
@@ -0,0 +1,190 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# Sheets of the invoice workbook, in the order they are written
+OUTPUT_SHEETS = ['Invoices', 'Credit_Memo_Invoices', 'Credit_Memos_fields', 'Checks_fields', 'Sales_tax_fields',
+                 'Sales_Receipts', 'Journal_Entries']
+# Only written when something is missing, so either side may leave them out
+MISSING_SHEETS = ['Missing Listings', 'Missing Customer', 'Missing Management', 'Missing Tax Location',
+                  'Missing VRBO']
+
+# Largest difference between two numbers that still counts as equal. Amounts are rounded to the cent, so rounding the
+# same amount differently moves it by one cent at most. Reference numbers and nights are whole numbers, so a tolerance
+# below 1 never hides a difference in them.
+MONEY_TOLERANCE = 0.01
+
+
+def compare_frames(expected, actual, sheet, money_tolerance=MONEY_TOLERANCE, max_cell_diffs=50, sort_rows=False):
+    """
+    Compare two versions of a sheet cell by cell.
+
+    Numbers are equal within money_tolerance, empty cells equal empty cells, and everything else is compared as text.
+    Rows are matched by position, so both sheets are expected in the same order unless sort_rows is set.
+
+    Args:
+        expected (pd.DataFrame): Sheet from the reference engine.
+        actual (pd.DataFrame): Sheet from the engine under test.
+        sheet (str): Sheet name, for the report.
+        money_tolerance (float, optional): Largest difference between equal numbers. Defaults to MONEY_TOLERANCE.
+        max_cell_diffs (int, optional): Number of differing cells listed in the report. All of them are counted.
+        sort_rows (bool, optional): Sort both sheets by all their common columns before comparing.
+
+    Returns:
+        dict: Summary of the sheet: row and cell counts, missing and extra columns, the number of differing cells,
+            the largest numeric difference and the first max_cell_diffs differences.
+    """
+    columns = [column for column in expected.columns if column in actual.columns]
+    summary = {
+        'sheet': sheet,
+        'expected_rows': len(expected),
+        'actual_rows': len(actual),
+        'missing_columns': [str(column) for column in expected.columns if column not in actual.columns],
+        'extra_columns': [str(column) for column in actual.columns if column not in expected.columns],
+        'cells_compared': 0,
+        'cell_diffs': 0,
+        'max_numeric_diff': 0.0,
+        'diffs': [],
+    }
+    if sort_rows:
+        expected = _sorted_rows(expected, columns)
+        actual = _sorted_rows(actual, columns)
+
+    rows = min(len(expected), len(actual))
+    for column in columns:
+        different, numeric_diff = _compare_columns(expected[column].iloc[:rows], actual[column].iloc[:rows],
+                                                   money_tolerance)
+        summary['cells_compared'] += rows
+        summary['cell_diffs'] += int(different.sum())
+        summary['max_numeric_diff'] = max(summary['max_numeric_diff'], numeric_diff)
+
+        for row in np.flatnonzero(different)[:max(max_cell_diffs - len(summary['diffs']), 0)]:
+            summary['diffs'].append({
+                # Spreadsheet row number, after the header row
+                'row': int(row) + 2,
+                'column': str(column),
+                'expected': _plain(expected[column].iat[row]),
+                'actual': _plain(actual[column].iat[row]),
+            })
+
+    summary['equivalent'] = (summary['cell_diffs'] == 0 and len(expected) == len(actual)
+                             and not summary['missing_columns'] and not summary['extra_columns'])
+    return summary
+
+
+def compare_workbooks(expected_path, actual_path, sheets=None, money_tolerance=MONEY_TOLERANCE, max_cell_diffs=50,
+                      sort_rows=False):
+    """
+    Compare two invoice workbooks sheet by sheet and cell by cell.
+
+    Args:
+        expected_path (str): Workbook of the reference engine.
+        actual_path (str): Workbook of the engine under test.
+        sheets (list, optional): Sheets to compare. Defaults to OUTPUT_SHEETS and MISSING_SHEETS.
+        money_tolerance (float, optional): Largest difference between equal numbers. Defaults to MONEY_TOLERANCE.
+        max_cell_diffs (int, optional): Number of differing cells listed per sheet.
+        sort_rows (bool, optional): Ignore the order of the rows.
+
+    Returns:
+        dict: Diff report with the compared files, whether they are equivalent, and a summary per sheet (see
+            compare_frames). A sheet found in only one workbook is listed under missing_sheets or extra_sheets.
+    """
+    sheets = sheets or OUTPUT_SHEETS + MISSING_SHEETS
+    expected_book = pd.read_excel(expected_path, sheet_name=None)
+    actual_book = pd.read_excel(actual_path, sheet_name=None)
+
+    report = {
+        'expected': str(expected_path),
+        'actual': str(actual_path),
+        'money_tolerance': money_tolerance,
+        'missing_sheets': [sheet for sheet in sheets if sheet in expected_book and sheet not in actual_book],
+        'extra_sheets': [sheet for sheet in sheets if sheet in actual_book and sheet not in expected_book],
+        'sheets': {},
+    }
+    for sheet in sheets:
+        if sheet in expected_book and sheet in actual_book:
+            report['sheets'][sheet] = compare_frames(expected_book[sheet], actual_book[sheet], sheet,
+                                                     money_tolerance, max_cell_diffs, sort_rows)
+
+    report['equivalent'] = (not report['missing_sheets'] and not report['extra_sheets']
+                            and all(summary['equivalent'] for summary in report['sheets'].values()))
+    return report
+
+
+def format_diff_report(report):
+    """
+    Return the diff report as text: one line per sheet, followed by the differing cells.
+    """
+    lines = [f'Expected: {report["expected"]}', f'Actual:   {report["actual"]}']
+    for sheet in report['missing_sheets']:
+        lines.append(f'{sheet}: only in the expected workbook')
+    for sheet in report['extra_sheets']:
+        lines.append(f'{sheet}: only in the actual workbook')
+
+    for sheet, summary in report['sheets'].items():
+        status = 'same' if summary['equivalent'] else 'DIFFERENT'
+        lines.append(f'{sheet}: {status} ({summary["expected_rows"]:,} / {summary["actual_rows"]:,} rows, '
+                     f'{summary["cell_diffs"]:,} of {summary["cells_compared"]:,} cells differ, '
+                     f'largest numeric difference {summary["max_numeric_diff"]:.4f})')
+        if summary['missing_columns']:
+            lines.append(f'  missing columns: {", ".join(summary["missing_columns"])}')
+        if summary['extra_columns']:
+            lines.append(f'  extra columns: {", ".join(summary["extra_columns"])}')
+        for diff in summary['diffs']:
+            lines.append(f'  row {diff["row"]}, {diff["column"]}: expected {diff["expected"]!r}, '
+                         f'got {diff["actual"]!r}')
+
+    lines.append('Workbooks are equivalent.' if report['equivalent'] else 'Workbooks differ.')
+    return '\n'.join(lines)
+
+
+def write_diff_report(report, file_path):
+    """
+    Write the diff report as JSON.
+
+    Args:
+        report (dict): Report from compare_workbooks.
+        file_path (str): Path of the report file.
+
+    Returns:
+        str: file_path.
+    """
+    with open(file_path, 'w') as file:
+        json.dump(report, file, indent=2, default=str)
+    return file_path
+
+
+def _compare_columns(expected, actual, money_tolerance):
+    # Mask of differing cells, and the largest difference between cells that are numbers on both sides
+    expected = expected.reset_index(drop=True)
+    actual = actual.reset_index(drop=True)
+    expected_null = expected.isna().to_numpy()
+    actual_null = actual.isna().to_numpy()
+
+    expected_numbers = pd.to_numeric(expected, errors='coerce').to_numpy(dtype=float)
+    actual_numbers = pd.to_numeric(actual, errors='coerce').to_numpy(dtype=float)
+    numeric = ~np.isnan(expected_numbers) & ~np.isnan(actual_numbers)
+    numeric_diff = np.abs(expected_numbers - actual_numbers, where=numeric, out=np.zeros(len(expected)))
+
+    text_equal = expected.astype(str).to_numpy() == actual.astype(str).to_numpy()
+    equal = np.where(numeric, numeric_diff <= money_tolerance + 1e-9, text_equal)
+    equal |= expected_null & actual_null
+    equal &= expected_null == actual_null
+    return ~equal, float(numeric_diff.max()) if len(numeric_diff) else 0.0
+
+
+def _sorted_rows(df, columns):
+    order = df[columns].astype(str).sort_values(columns, kind='stable').index
+    return df.loc[order].reset_index(drop=True)
+
+
+def _plain(value):
+    # Cell value as a JSON friendly Python value
+    if pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
@@ -0,0 +1,167 @@
+import math
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+ACCOUNTING_FORMAT = '_($* #,##0.00_);_($* (#,##0.00);_($* "-"??_);_(@_)'
+DATE_FORMAT = 'yyyy-mm-dd hh:mm:ss'
+# Rows converted to Python values at a time. Bounds the memory used next to the DataFrame itself.
+CHUNK_ROWS = 10_000
+# Values of a float column measured to size it, and the widest column Excel allows
+SAMPLE_ROWS = 1_000
+MAX_WIDTH = 255
+
+
+class StreamingWorkbookWriter:
+    """
+    Writes DataFrames to an xlsx workbook one row at a time, in xlsxwriter's constant_memory mode.
+
+    Each row is flushed to a temporary file as soon as the next one starts, so memory stays flat however long the
+    sheets are. The catch is that a sheet has to be written completely, top to bottom, before the next one starts,
+    which is why write_sheet takes the whole DataFrame and sets the column widths and formats first.
+
+        with StreamingWorkbookWriter(file_path) as writer:
+            writer.write_sheet('Invoices', entry_NCM)
+            writer.write_sheet('Sales_tax_fields', fin_sales, money_columns=[1, 2, 3, 4], widths={0: 12})
+    """
+
+    def __init__(self, file_path):
+        """
+        Args:
+            file_path (str): Path of the workbook to write.
+        """
+        self.file_path = file_path
+        self.workbook = xlsxwriter.Workbook(file_path, {'constant_memory': True})
+        self._formats = {}
+        self.header_format = self.cell_format(bold=True, border=1, align='center', valign='top')
+        self.money_format = self.cell_format(num_format=ACCOUNTING_FORMAT)
+        self.date_format = self.cell_format(num_format=DATE_FORMAT)
+
+    def cell_format(self, **properties):
+        """
+        Return the workbook format with these properties, creating it the first time it is asked for.
+        """
+        key = tuple(sorted(properties.items()))
+        if key not in self._formats:
+            self._formats[key] = self.workbook.add_format(properties)
+        return self._formats[key]
+
+    def write_sheet(self, sheet_name, df, money_columns=None, widths=None):
+        """
+        Write a DataFrame to a new sheet: the header row, then every row in order. Empty cells are left blank.
+
+        Args:
+            sheet_name (str): Name of the sheet.
+            df (pd.DataFrame): Data to write. The index is not written.
+            money_columns (list, optional): Positions of the columns shown in the accounting format.
+            widths (dict, optional): Column widths by position. The other columns are sized to fit their contents.
+
+        Returns:
+            int: Number of data rows written.
+        """
+        worksheet = self.workbook.add_worksheet(sheet_name)
+        money_columns = set(money_columns or [])
+        column_widths = {**estimate_column_widths(df, money_columns), **(widths or {})}
+        formats = []
+        for idx, column in enumerate(df.columns):
+            if idx in money_columns:
+                cell_format = self.money_format
+            elif pd.api.types.is_datetime64_any_dtype(df[column]):
+                cell_format = self.date_format
+            else:
+                cell_format = None
+            formats.append(cell_format)
+            worksheet.set_column(idx, idx, column_widths.get(idx), cell_format)
+
+        for idx, column in enumerate(df.columns):
+            worksheet.write(0, idx, str(column), self.header_format)
+
+        row = 1
+        for start in range(0, len(df), CHUNK_ROWS):
+            chunk = df.iloc[start:start + CHUNK_ROWS]
+            columns = [_cell_values(chunk[column]) for column in chunk.columns]
+            for values in zip(*columns):
+                for idx, value in enumerate(values):
+                    if value is not None:
+                        worksheet.write(row, idx, value, formats[idx])
+                row += 1
+        return len(df)
+
+    def close(self):
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+
+def estimate_column_widths(df, money_columns=None, sample_size=SAMPLE_ROWS):
+    """
+    Width of each column, from the longest header or cell, times 1.25 for the proportional font.
+
+    Cells are not turned into strings to be measured. Text is measured with str.len(), numbers from their extremes
+    and a sample of their values, dates and booleans have a fixed width, and categorical columns are measured on their
+    categories.
+
+    Args:
+        df (pd.DataFrame): Sheet contents.
+        money_columns (list, optional): Positions of the columns shown in the accounting format. They are measured as
+            formatted amounts.
+        sample_size (int, optional): Values of a float column that are measured, besides its minimum and maximum.
+
+    Returns:
+        dict: Column width by position.
+    """
+    money_columns = set(money_columns or [])
+    widths = {}
+    for idx, column in enumerate(df.columns):
+        longest = _longest_value(df[column], idx in money_columns, sample_size) if len(df) else 0
+        widths[idx] = min(math.ceil(max(longest, len(str(column))) * 1.25), MAX_WIDTH)
+    return widths
+
+
+def _longest_value(series, money, sample_size):
+    # Length of the longest value of a column, as it shows in the sheet
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.remove_unused_categories().cat.categories
+        return _longest_value(pd.Series(categories), money, sample_size) if len(categories) else 0
+    kind = series.dtype.kind
+    if kind == 'M':
+        return len(DATE_FORMAT)
+    if kind == 'b':
+        return len('FALSE')
+    values = series.dropna()
+    if values.empty:
+        return 0
+    if kind in 'iuf':
+        if money:
+            # '$ 1,234.56 ' with the accounting format's padding
+            return max(len(f'{value:,.2f}') for value in (values.min(), values.max())) + 4
+        if kind != 'f':
+            return max(len(str(value)) for value in (values.min(), values.max()))
+        step = max(len(values) // sample_size, 1)
+        sample = np.concatenate([values.to_numpy()[::step], [values.min(), values.max()]])
+        return max(len(str(value)) for value in sample.tolist())
+    if kind != 'O':
+        return int(values.astype(str).str.len().max())
+
+    # Text, with the odd number or date mixed in. Only the cells that are not strings are converted to be measured.
+    try:
+        lengths = values.str.len()
+    except AttributeError:
+        lengths = pd.Series(np.nan, index=values.index)
+    longest = lengths.max() if lengths.notna().any() else 0
+    others = values[lengths.isna()]
+    if not others.empty:
+        longest = max(longest, others.astype(str).str.len().max())
+    return int(longest)
+
+
+def _cell_values(series):
+    # Python values of a column, with None for the empty cells
+    if series.dtype.kind == 'M':
+        series = series.dt.tz_localize(None) if series.dt.tz is not None else series
+    return series.astype(object).where(series.notna(), None).tolist()
@@ -0,0 +1,59 @@
+import os
+
+from .warehouse import WAREHOUSE_NAME
+
+MODEL_DIR_NAME = 'ModelFiles'
+NUMBERS_FILE_NAME = 'ref_number_values.txt'
+CACHE_DIR_NAME = 'WorkbookCache'
+LOG_FILE_NAME = 'line_auto.log'
+
+
+class Workspace:
+    """
+    Everything one portfolio's runs read and write, kept under one root directory:
+
+        <root>/ModelFiles                           input files, Current.xlsx and the VRBO carry-overs
+        <root>/<year> Reports/<month> Report        report folder of each month
+        <root>/ref_number_values.txt                next invoice, check and journal numbers
+        <root>/WorkbookCache                        parsed copies of the input workbooks
+        <root>/Warehouse                            history of every month
+
+    A run given a workspace touches nothing outside it and does not depend on the working directory, so the
+    portfolios of several management companies can be invoiced side by side, see run_workspaces.
+    """
+
+    def __init__(self, root, model_dir=None):
+        """
+        Args:
+            root (str): Root directory of the portfolio.
+            model_dir (str, optional): Directory holding the input files. Defaults to ModelFiles in root.
+        """
+        self.root = os.path.abspath(root)
+        self.model_dir = os.path.abspath(model_dir) if model_dir else os.path.join(self.root, MODEL_DIR_NAME)
+        self.numbers_file = os.path.join(self.root, NUMBERS_FILE_NAME)
+        self.cache_dir = os.path.join(self.root, CACHE_DIR_NAME)
+        self.warehouse_dir = os.path.join(self.root, WAREHOUSE_NAME)
+        self.log_file = os.path.join(self.root, LOG_FILE_NAME)
+
+    def __repr__(self):
+        return f'Workspace({self.root!r})'
+
+    def missing_inputs(self):
+        """
+        Return a message for each thing a run of the workspace needs but cannot find: the model directory and the
+        reference numbers file. A console run asks for missing numbers, but a worker process cannot.
+        """
+        missing = []
+        if not os.path.isdir(self.model_dir):
+            missing.append(f'{os.path.basename(self.model_dir)} missing in {self.root}')
+        if not os.path.isfile(self.numbers_file):
+            missing.append(f'{NUMBERS_FILE_NAME} missing in {self.root}')
+        return missing
+
+
+def find_workspaces(parent_dir):
+    """
+    Return a workspace for every folder of parent_dir that has a ModelFiles folder, in name order.
+    """
+    return [Workspace(os.path.join(parent_dir, name)) for name in sorted(os.listdir(parent_dir))
+            if os.path.isdir(os.path.join(parent_dir, name, MODEL_DIR_NAME))]
@@ -0,0 +1,170 @@
+import argparse
+import cProfile
+import pstats
+import sys
+from datetime import datetime
+
+import supporting_strat_auto as ssa
+from helpful_tools.date_and_reference import month_range
+from helpful_tools.exporters import EXPORTERS
+from helpful_tools.progress import ConsoleReporter
+from helpful_tools.stage_timer import StageTimer
+from helpful_tools.workbook_cache import invalidate_cache
+from helpful_tools.workspace import Workspace, find_workspaces
+
+##########################
+# Headless entry point, for running and timing the month-end invoicing without the window:
+# Type: python line_auto_cli.py run --model-dir ModelFiles --month 2023-04 --trace-memory
+# Type: python line_auto_cli.py run --no-excel --profile invoicing.prof
+# Type: python line_auto_cli.py run --format csv
+# Type: python line_auto_cli.py batch --from 2023-01 --to 2023-03 --parallel
+# Type: python line_auto_cli.py run-all --parent Portfolios --month 2023-04
+# Type: python line_auto_cli.py clear-cache
+
+##########################
+
+
+def parse_month(value):
+    """
+    Parse a YYYY-MM month argument into (month, year).
+    """
+    try:
+        date = datetime.strptime(value, '%Y-%m')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Expected a month as YYYY-MM, got "{value}".')
+    return date.month, date.year
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Create the monthly LINE invoices without the window.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Run the invoicing pipeline.')
+    run.add_argument('--model-dir', default=None,
+                     help='Directory holding the input files. Defaults to ModelFiles in the working directory.')
+    run.add_argument('--month', type=parse_month, default=None,
+                     help='Month to invoice, as YYYY-MM. Defaults to the month in the Airbnb file name.')
+    run.add_argument('--no-excel', action='store_true',
+                     help='Skip writing the invoice tables and keep the saved reference numbers and VRBO '
+                          'carry-overs.')
+    run.add_argument('--format', choices=list(EXPORTERS), default='xlsx', dest='export_format',
+                     help='Write the invoice tables as sheets of one workbook (xlsx, default), or as one csv or parquet '
+                          'file per table.')
+    run.add_argument('--trace-memory', action='store_true',
+                     help='Measure the peak memory of each stage with tracemalloc (slows the run down).')
+    run.add_argument('--profile', nargs='?', const='line_auto.prof', default=None, metavar='FILE',
+                     help='Profile the run with cProfile and save the stats to FILE (default: line_auto.prof).')
+    run.add_argument('--quiet', action='store_true', help='Only print log messages, not progress.')
+
+    batch = commands.add_parser('batch', help='Invoice a range of months, e.g. to reprocess a quarter.')
+    batch.add_argument('--from', dest='first', type=parse_month, required=True, metavar='YYYY-MM',
+                       help='First month to invoice.')
+    batch.add_argument('--to', dest='last', type=parse_month, required=True, metavar='YYYY-MM',
+                       help='Last month to invoice.')
+    batch.add_argument('--model-dir', default=None,
+                       help='Directory holding Current.xlsx and one YYYY-MM folder of exports per month. Defaults to '
+                            'ModelFiles in the working directory.')
+    batch.add_argument('--parallel', action='store_true',
+                       help='Read the exports of every month at once before invoicing them in order.')
+    batch.add_argument('--no-excel', action='store_true',
+                       help='Skip writing the invoice tables and keep the saved reference numbers and VRBO '
+                            'carry-overs.')
+    batch.add_argument('--format', choices=list(EXPORTERS), default='xlsx', dest='export_format',
+                       help='Format of the invoice tables, as for run.')
+    batch.add_argument('--trace-memory', action='store_true', help='Measure the peak memory of each stage.')
+    batch.add_argument('--quiet', action='store_true', help='Only print log messages, not progress.')
+
+    run_all = commands.add_parser('run-all', help='Invoice several portfolios at once, one worker process each.')
+    run_all.add_argument('workspaces', nargs='*', metavar='WORKSPACE',
+                         help='Portfolio directories, each holding its own ModelFiles folder.')
+    run_all.add_argument('--parent', default=None,
+                         help='Invoice every folder of this directory that has a ModelFiles folder.')
+    run_all.add_argument('--month', type=parse_month, default=None,
+                         help='Month to invoice, as YYYY-MM. Defaults to the month in each Airbnb file name.')
+    run_all.add_argument('--workers', type=int, default=None,
+                         help='Number of portfolios invoiced at the same time. Defaults to one per portfolio, up to '
+                              'the CPU count.')
+    run_all.add_argument('--no-excel', action='store_true',
+                         help='Skip writing the invoice tables and keep the saved reference numbers and VRBO '
+                              'carry-overs.')
+    run_all.add_argument('--format', choices=list(EXPORTERS), default='xlsx', dest='export_format',
+                         help='Format of the invoice tables, as for run.')
+    run_all.add_argument('--trace-memory', action='store_true', help='Measure the peak memory of each stage.')
+
+    clear = commands.add_parser('clear-cache', help='Remove the cached copies of the input workbooks.')
+    clear.add_argument('--workbook', default=None, help='Only remove the entries of this workbook.')
+    return parser
+
+
+def run(args):
+    reporter = ConsoleReporter(show_progress=not args.quiet)
+    timer = StageTimer(trace_memory=args.trace_memory)
+    month, year = args.month if args.month else (None, None)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        path, month_name = ssa.line_invoice_generation(reporter, model_dir=args.model_dir, month=month, year=year,
+                                                       write_excel=not args.no_excel, timer=timer,
+                                                       export_format=args.export_format)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+
+    reporter.log(f'Invoice generation for {month_name} complete: {path}')
+    if profiler:
+        print(f'Profile saved to {args.profile}')
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+    return 0
+
+
+def batch(args):
+    months = month_range(args.first, args.last)
+    if not months:
+        raise SystemExit('--to must not be before --from.')
+    reporter = ConsoleReporter(show_progress=not args.quiet)
+    results = ssa.line_invoice_batch(reporter, months, model_dir=args.model_dir, write_excel=not args.no_excel,
+                                     export_format=args.export_format, parallel=args.parallel,
+                                     trace_memory=args.trace_memory)
+    for path, month_name in results:
+        reporter.log(f'Invoice generation for {month_name} complete: {path}')
+    return 0
+
+
+def run_all(args):
+    workspaces = [Workspace(root) for root in args.workspaces]
+    if args.parent:
+        workspaces += find_workspaces(args.parent)
+    if not workspaces:
+        raise SystemExit('No workspaces given. Pass their directories or --parent.')
+    month, year = args.month if args.month else (None, None)
+    reporter = ConsoleReporter(show_progress=False)
+    results = ssa.run_workspaces(reporter, workspaces, month=month, year=year, write_excel=not args.no_excel,
+                                 export_format=args.export_format, max_workers=args.workers,
+                                 trace_memory=args.trace_memory)
+    failed = [result for result in results if result['error']]
+    reporter.log(f'{len(results) - len(failed)} of {len(results)} portfolios invoiced.')
+    return 1 if failed else 0
+
+
+def clear_cache(args):
+    removed = invalidate_cache(file_path=args.workbook)
+    print(f'Workbook cache cleared ({removed} entries removed).')
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'run':
+        return run(args)
+    if args.command == 'batch':
+        return batch(args)
+    if args.command == 'run-all':
+        return run_all(args)
+    return clear_cache(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
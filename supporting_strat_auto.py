@@ -1,11 +1,14 @@
 #######################################################################################################################
 # Modules
-import datetime
 import os
+import shutil
+import tempfile
+import time
+import traceback
 from collections import defaultdict
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-import numpy as np
+import pandas as pd
 
 from helpful_tools import *
 
@@ -20,631 +23,400 @@ pd.options.mode.chained_assignment = None
 # Check check and CM dates, make sure that they are set to the first of the month.
 
 
-def line_invoice_generation(app):
-    app.progress_bar["value"] = 1
-    app.progress_bar.update()
+def line_invoice_generation(app, model_dir=None, month=None, year=None, write_excel=True, timer=None,
+                            export_format='xlsx', warehouse_dir=None, exports_dir=None, reference_frames=None,
+                            numbers_file=None, save_numbers=None, workspace=None, vrbo_dir=None):
+    """
+    Create the month's invoices, checks, journal entries and sales tax sheets from the files in the model directory.
+
+    Args:
+        app: Progress sink with log and progress_bar, or progress, e.g. the window or a QueueReporter.
+        model_dir (str, optional): Directory holding the input files. Defaults to the workspace's ModelFiles.
+        month (int, optional): Month to invoice. Defaults to the month in the Airbnb file name.
+        year (int, optional): Year of month. Required when month is given.
+        write_excel (bool, optional): Write the invoice tables, save the next reference numbers and update the stored
+            VRBO carry-overs. Without it the carry-overs are updated on a copy, and the month's report folder is left
+            as it is: the other report files are written to a new temporary folder instead. Defaults to True.
+        timer (StageTimer, optional): Measures each stage. The measurements are logged at the end of the run and
+            written to run_report.json in the report directory.
+        export_format (str, optional): How the invoice tables are written: 'xlsx' as sheets of one workbook, 'csv' or
+            'parquet' as one file per table. Defaults to 'xlsx'.
+        warehouse_dir (str, optional): Parquet warehouse the month's normalized inputs, unit and invoice tables are
+            stored in when write_excel is set. Defaults to the workspace's Warehouse.
+        exports_dir (str, optional): Directory holding the month's Airbnb, reservations and VRBO exports. Defaults to
+            model_dir. Current.xlsx and the VRBO carry-overs are always taken from model_dir.
+        reference_frames (dict, optional): Sheets of Current.xlsx already loaded with load_reference_data, so a batch
+            of months reads them once.
+        numbers_file (str, optional): File holding the next invoice, check and journal numbers. Defaults to the
+            workspace's ref_number_values.txt.
+        save_numbers (bool, optional): Save the next numbers to numbers_file at the end. Defaults to write_excel.
+        workspace (Workspace, optional): Portfolio directory the reports, numbers, workbook cache and warehouse are
+            kept in. Defaults to the working directory.
+        vrbo_dir (str, optional): Directory of the VRBO carry-over store to use, e.g. a copy made with
+            copy_vrbo_store. Defaults to model_dir, or to a copy of its store without write_excel.
+
+    Returns:
+        tuple: Report directory, the temporary one without write_excel, and month name.
+    """
+    timer = timer or StageTimer()
+    workspace = workspace or Workspace(os.getcwd())
+    numbers_file = numbers_file or workspace.numbers_file
+    save_numbers = write_excel if save_numbers is None else save_numbers
 
     ####################################################################################################################
     # Setup and initialization
-    filenames = ['reservations', 'airbnb', 'Current', 'VRBO_']
-    month, year = date_from_airbnb_name(filenames[1])
-    invoice_date, due_date = generate_dates(month, year)
-    month_name = month_number_to_name(month)
-
-    app.progress_bar["value"] = 2
-    app.progress_bar.update()
-
-    path_month = setup_directory_structure(app, month_name, year)
-    filepath = os.path.join(os.getcwd(), 'ModelFiles')
-    dataframes, reformat_info = load_files(app, filepath, filenames, path_month)
-
-    # Data cleaning and reformatting
-    customer_info_df = dataframes.get('customer_info', pd.DataFrame())
-    for key, df in dataframes.items():
-        if key in ['bnb', 'check', 'vrbo']:  # Apply reformatting to these specific dataframes
-            dataframes[key] = reformat_and_update_files(df, customer_info_df)
-
-    dataframes = clean_dataframes(dataframes)
+    with timer.span('Setup'):
+        update_progress_bar(app, 1)
+        filenames = ['reservations', 'airbnb', 'Current', 'VRBO_']
+        filepath = model_dir or workspace.model_dir
+        if month is None:
+            month, year = date_from_airbnb_name(filenames[1], exports_dir or filepath)
+        invoice_date, due_date = generate_dates(month, year)
+        month_name = month_number_to_name(month)
+
+        update_progress_bar(app, 2)
+
+        if write_excel:
+            path_month = setup_directory_structure(app, month_name, year, workspace.root)
+        else:
+            # A trial run must not wipe the month's report folder, so its files go to a temporary folder
+            path_month = tempfile.mkdtemp(prefix=f'{month_name} {year} trial ')
+            app.log(f'Trial run, the report files are written to {path_month}')
+        path = path_month
+
+    with timer.span('Load files') as stage:
+        exports_dir = exports_dir or filepath
+        if reference_frames is None and exports_dir == filepath:
+            dataframes, reformat_info = load_files(app, filepath, filenames, path_month, workspace.cache_dir)
+        else:
+            # The month's exports and Current.xlsx come from different places
+            dataframes, reformat_info = load_files(app, exports_dir, [name for name in filenames if name != 'Current'],
+                                                   path_month, workspace.cache_dir)
+            if reference_frames is None:
+                reference_frames, _ = load_reference_data(app, filepath, workspace.cache_dir)
+            dataframes.update({key: df.copy() for key, df in reference_frames.items()})
+        stage['rows_out'] = sum(len(df) for df in dataframes.values())
+
+    # Data cleaning and reformatting: attach the customer Code and QBO name of each listing
+    with timer.span('Enrich and clean', rows_in=stage['rows_out']):
+        cleaning_df = dataframes.get('cleaning', pd.DataFrame())
+        for key in ['bnb', 'check']:
+            dataframes[key] = reformat_and_update_files(dataframes[key], cleaning_df)
+        dataframes['vrbo'] = reformat_and_update_files(dataframes['vrbo'], cleaning_df, 'Property ID', 'VRBO_ID',
+                                                       reformat=False)
+
+        dataframes = clean_dataframes(dataframes)
+        bnb, cleaning, customer_info, check, vrbo = (dataframes[key] for key in
+                                                     ['bnb', 'cleaning', 'customer_info', 'check', 'vrbo'])
 
     ####################################################################################################################
     # Create data frames of information
-    app.log("Optimizing Data...")
-    app.progress_bar["value"] = 16
-    app.progress_bar.update()
-
-    replace_re = "[^A-Za-z0-9_ -:&]+"
-    # Assuming bnb, cleaning, customer_info, check, and vrbo are previously defined DataFrames
-    bnb_col = prepare_dataframe_columns(bnb, ['Listing', 'Amount', 'Type', 'Confirmation Code', 'Nights'], replace_re)
-    cleaning_col = prepare_dataframe_columns(cleaning,
-                                             ['ListingBNB', 'QBO', 'Cleaning', 'Tax_Location', 'Pest', 'Landscape',
-                                              'Internet/Cable', 'Bus_Lic', 'VRBO_ID', 'Code', 'Output'], replace_re)
-    customer_col = prepare_dataframe_columns(customer_info,
-                                             ['Customer-QBO', 'Expense_Flat', 'Credit', 'Clean', 'Hosp', 'Management',
-                                              'Magpercent'], replace_re)
-    check_col = prepare_dataframe_columns(check, ['Listing'], replace_re)
-    # vrbo_col preparation would follow a similar pattern
-
-    # VRBO data management - placeholder functions for mtn and number2month need to be defined or imported
-    vrbo_save_path = os.path.join(filepath, 'VRBO Date Organizer.xlsx')
-    manage_vrbo_data(vrbo, vrbo_save_path, datetime.now().month, datetime.now().strftime("%B"), datetime.now().year,
-                     month_name_to_number, month_number_to_name)
-
-    # Copy VRBO Excel file to report folder
-    copy_excel_file(vrbo_save_path, os.path.join(path, 'VRBO Date Organizer.xlsx'))
+    with timer.span('Prepare columns', rows_in=len(bnb) + len(check) + len(vrbo)):
+        app.log("Optimizing Data...")
+        update_progress_bar(app, 16)
+
+        replace_re = "[^A-Za-z0-9_ -:&]+"
+        # Only the name columns are cleaned, the other columns keep the dtypes declared in SOURCE_SCHEMAS
+        bnb_col = prepare_dataframe_columns(bnb, ['Listing', 'Amount', 'Type', 'Confirmation Code', 'Nights'],
+                                            replace_re, text_columns=['Listing'])
+        cleaning_col = prepare_dataframe_columns(cleaning,
+                                                 ['ListingBNB', 'QBO', 'Cleaning', 'Tax_Location', 'Pest', 'Landscape',
+                                                  'Internet/Cable', 'Bus_Lic', 'VRBO_ID', 'Code', 'Output'],
+                                                 replace_re, text_columns=['ListingBNB', 'QBO'])
+        customer_col = prepare_dataframe_columns(customer_info,
+                                                 ['Customer-QBO', 'Expense_Flat', 'Credit', 'Clean', 'Hosp',
+                                                  'Management', 'Magpercent'], replace_re,
+                                                 text_columns=['Customer-QBO'])
+        check_col = prepare_dataframe_columns(check, ['Listing'], replace_re)
+        vrbo_col = pd.DataFrame(vrbo, columns=['Property ID', 'Reservation ID', 'Payout', 'Nights', 'Check-out'])
+
+    with timer.span('VRBO carry-over', rows_in=len(vrbo)) as stage:
+        # Stays paid out in an earlier month that check out this month are invoiced with this month's VRBO data
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            if vrbo_dir is None and not write_excel:
+                # A trial run updates a copy of the store, so the stored stays are left unchanged
+                vrbo_dir = copy_vrbo_store(filepath, scratch_dir)
+            with open_vrbo_store(vrbo_dir or filepath) as store:
+                carried_over = carry_over_vrbo_stays(vrbo, store, month, year)
+                # Readable copy of the stored stays in the report folder
+                store.export_xlsx(os.path.join(path, 'VRBO Date Organizer.xlsx'))
+        vrbo_col = pd.concat([vrbo_col, carried_over], ignore_index=True)
+        stage['rows_out'] = len(carried_over)
+
     ###################################################################################################################
     # Missing information and general housekeeping
-    app.log("Finding Missing Information...")
+    with timer.span('Missing information', rows_in=len(bnb_col) + len(vrbo_col)) as stage:
+        app.log("Finding Missing Information...")
 
-    # Assuming bnb_col, cleaning_col, check_col are defined DataFrames
-    bnb_col = remove_extra_spaces(bnb_col, ['Listing'])
-    cleaning_col = remove_extra_spaces(cleaning_col, ['ListingBNB'])
-    check_col = remove_extra_spaces(check_col, ['Listing'])
+        # Assuming bnb_col, cleaning_col, check_col are defined DataFrames
+        bnb_col = remove_extra_spaces(bnb_col, ['Listing'])
+        cleaning_col = remove_extra_spaces(cleaning_col, ['ListingBNB'])
+        check_col = remove_extra_spaces(check_col, ['Listing'])
 
-    listing_diff = find_diff_and_concat(bnb_col, cleaning_col, 'Listing', 'ListingBNB')
-    vrbo_diff = find_diff_and_concat(vrbo_col, cleaning_col, 'Property ID', 'VRBO_ID')
+        listing_diff = find_diff_and_concat(bnb_col, cleaning_col, 'Listing', 'ListingBNB')
+        vrbo_diff = find_diff_and_concat(vrbo_col, cleaning_col, 'Property ID', 'VRBO_ID')
+        # Customers of the Cleaning Fee Report that are not in the Customer Report
+        customer_diff = cleaning[~cleaning_col['QBO'].isin(customer_col['Customer-QBO'])]
+        stage['rows_out'] = len(listing_diff) + len(vrbo_diff) + len(customer_diff)
 
-    # Assuming customer_diff_qbo logic and modifications are done elsewhere based on the context
+    with timer.span('Owner reservations', rows_in=len(bnb) + len(vrbo)) as stage:
+        app.log("Separating Aviad's Listings...")
+        owner_workbooks = separate_listings_based_on_output(cleaning_col, bnb, vrbo, path, month, year)
+        stage['rows_out'] = len(owner_workbooks)
 
-    app.log("Separating Aviad's Listings...")
-    separate_listings_based_on_output(cleaning_col, bnb, vrbo, path, month, year)
     ###################################################################################################################
-    app.log("Creating total unit containing all necessary data...")
-    unit = aggregate_customer_data(customer_col, cleaning_col, bnb_col, check_col, vrbo_col, month)
+    with timer.span('Aggregate unit', rows_in=len(bnb_col) + len(check_col) + len(vrbo_col)) as stage:
+        app.log("Creating total unit containing all necessary data...")
+        unit = aggregate_customer_data(customer_col, cleaning_col, bnb_col, check_col, vrbo_col, month)
+        stage['rows_out'] = len(unit)
 
     ###################################################################################################################
     # Data Extraction
-    app.log("=== Beginning Invoicing ===", True)
-
-    # Sort unit
-    unit = unit.sort_values(by=['Customer'])
-    unit_names = unit['Customer'].unique()
-
-    # If the cleaning fee is a nan, change it to 0
-    unit['CleaningFee'] = unit['CleaningFee'].apply(pd.to_numeric, errors='coerce')
-    unit['CleaningFee'] = unit['CleaningFee'].fillna(0)
-
-    unit.loc[unit["CreditMemo"].isnull(), 'CreditMemo'] = 'NULL'
-    unit_grouped = unit.groupby('CreditMemo')
-
-    num_invoices = len(unit_names)
-    progress_vals = np.linspace(25, 95, num=num_invoices)
-
-    for ug in range(len(unit_grouped.groups.keys())):
-        entry = pd.DataFrame()
-        if ug == 0:
-            unit = unit_grouped.get_group('CM')
-        elif ug == 1:
-            unit = unit_grouped.get_group('NULL')
-        else:
-            app.log('There was an error separating by CM!!! Have Steven look into it please!')
-
-        for n in range(len(unit_names)):
-
-            app.progress_bar["value"] = int(progress_vals[n])
-            app.progress_bar.update()
-
-            # InvoiceNo
-            invoice_no += 1
-
-            # Separate by name
-            unit_loop = unit[unit['Customer'] == unit_names[n]]
-
-            # Customer name
+    with timer.span('Invoicing', rows_in=len(unit)) as stage:
+        app.log("=== Beginning Invoicing ===", True)
+
+        # Sort unit
+        unit = sort_and_prepare_unit(unit)
+
+        # Beginning ref numbers...
+        invoice_no, check_no, journal_no = read_reference_numbers(numbers_file)
+
+        tax_rates = build_tax_rates(dataframes.get('tax_rates'))
+        invoice_tables, (invoice_no, check_no, journal_no) = process_invoices(
+            app, unit, invoice_date, due_date, month, invoice_no, check_no, journal_no, tax_rates)
+        stage['rows_out'] = sum(len(table) for table in invoice_tables.values())
+
+        # Save the last invoice number used, the next month starts after it
+        if save_numbers:
+            write_reference_numbers(invoice_no, check_no, journal_no, month, year, numbers_file)
+
+    entry_CM = invoice_tables['entry_CM']
+    entry_NCM = invoice_tables['entry_NCM']
+    sales_entry = invoice_tables['sales_entry']
+    credit_memo = invoice_tables['credit_memo']
+    checks = invoice_tables['checks']
+    sales_receipts = invoice_tables['sales_receipts']
+    journal_entries = invoice_tables['journal_entries']
+    tax_issues = invoice_tables['tax_issues']
+    man_issues = invoice_tables['man_issues']
+
+    # For the sales sheet, sum the sales tax lines of each Tax Location
+    with timer.span('Sales tax rollup', rows_in=len(sales_entry)) as stage:
+        fin_sales = rollup_sales_tax(sales_entry)
+        stage['rows_out'] = len(fin_sales)
+    update_progress_bar(app, 100)
+
+    if write_excel:
+        sheets = [('Invoices', entry_NCM), ('Credit_Memo_Invoices', entry_CM), ('Credit_Memos_fields', credit_memo),
+                  ('Checks_fields', checks), ('Sales_tax_fields', fin_sales), ('Sales_Receipts', sales_receipts),
+                  ('Journal_Entries', journal_entries)]
+        # Sheets only written when something is missing, with the explanation on their first row
+        missing_sheets = [
+            ('Missing Listings', listing_diff,
+             'Listing was found in bnb but it was not found in Cleaning Fee Report'),
+            ('Missing Customer', customer_diff,
+             'Customer was found in Cleaning Fee Report but it was not found in Customer Report'),
+            ('Missing Management', man_issues,
+             'The Management Percent (Magpercent) is empty and there is no "omit" in the Management column.'),
+            ('Missing Tax Location', tax_issues,
+             'The Tax Location (TaxLocation) is empty and there is no "omit" in the Hosp column.'),
+            ('Missing VRBO', vrbo_diff,
+             'These VRBO entries did not have a customer attached to the ID, so their payouts were not invoiced.'),
+        ]
+
+        with timer.span(f'Export ({export_format})', rows_in=sum(len(df) for _, df in sheets)) as stage:
+            # The workbook is streamed sheet by sheet, so memory does not grow with the size of the month
+            with open_exporter(export_format, path, month_name) as exporter:
+                rows = 0
+                for sheet_name, df in sheets:
+                    # Amounts in the accounting format, or with two decimals in a CSV file
+                    widths = {0: 12, 1: 18, 2: 18, 3: 18, 4: 18} if sheet_name == 'Sales_tax_fields' else None
+                    rows += exporter.write_table(sheet_name, df, money_columns=money_column_positions(df),
+                                                 widths=widths)
+
+                for sheet_name, df, explanation in missing_sheets:
+                    if not df.empty:
+                        df = explanation_for_missing_data(df.reset_index(drop=True), explanation)
+                        rows += exporter.write_table(sheet_name, df)
+            stage['rows_out'] = rows
+        app.log(f'Invoice tables written to {exporter.location}')
+
+    if write_excel:
+        with timer.span('Warehouse') as stage:
+            warehouse_dir = warehouse_dir or workspace.warehouse_dir
+            tables = {'bnb': bnb_col, 'vrbo': vrbo_col, 'check': check_col, 'unit': unit}
+            tables.update({name: invoice_tables[name] for name in WAREHOUSE_TABLES if name in invoice_tables})
             try:
-                customer_name = unit_loop['Customer'].iloc[0]
-            except IndexError:
-                # Because of Credit Memo split, this may be in the other section. Just move on
-                continue
-
-            # Determine the total income
-            income_total_init = unit_loop['Income'].sum()
-
-            # If VRBO, add to income but keep separate for tax information
-            if not all(unit_loop['VRBO_ID'] == 'none'):
-                income_total = income_total_init + unit_loop['VRBO_PAYOUT'].sum()
-            else:
-                income_total = income_total_init
-
-            # Check if un-invoiced
-            un_invoiced = False
-            # If all entries say omit, this is un-invoiced
-            if unit_loop['Clean'].iloc[0] == 'omit' and unit_loop['Hosp'].iloc[0] == 'omit' and \
-                    unit_loop['Management'].iloc[
-                        0] == 'omit':
-                un_invoiced = True
-
-            # Initialization
-            total_cleaning_fee = 0
-            total_amount = 0
-            # management_fee = 0
-            pest_fee = 0
-            bus_lic = 0
-            landscaping_fee = 0
-            cable_fee = 0
-            expense = 0
-            clean_count = 0
-            cleaning_written = False
-            # hospitality_written = False
-            tax_adjustment_90_day = 0
-
-            # Separate based on cleaning fee and tax location
-            unique_cleaning = unit_loop['CleaningFee'].unique()
-            unique_tax = unit_loop['TaxLocation'].unique()
-
-            for tax in unique_tax:
-                # Get Rid Of Later
-                # if code
-
-                if not isnan(tax):
-                    unit_tax = unit_loop[unit_loop['TaxLocation'] == tax]
-                else:
-                    unit_tax = unit_loop[unit_loop['TaxLocation'].isna()]
-
-                for clean in unique_cleaning:
-                    unit_repeat = unit_tax[unit_tax['CleaningFee'] == clean]
-                    if unit_repeat.empty:
-                        continue
-
-                    # Initialize necessary values
-                    cleaning_fee = 0
-                    num_cleaning_fee = 0
-                    amount_less_clean = 0
-                    hospitality_tax = 0
-                    tax_adjustment_90_day = 0
-
-                    # Cleaning fee
-                    if not isnan(unit_repeat['CleaningFee'].iloc[0]) or \
-                            not unit_repeat['Clean'].str.contains('omit', case=False).any():
-                        cleaning_fee = unit_repeat['CleaningFee'].iloc[0]
-                        num_cleaning_fee = unit_repeat['Checkouts'].sum()
-                        # Add a cleaning fee for VRBO reports
-                        num_cleaning_fee = num_cleaning_fee + unit_repeat['VRBO_Nights'].sum()
-                        total_cleaning_fee = total_cleaning_fee + cleaning_fee * num_cleaning_fee
-
-                    # Hospitality tax
-                    if not unit_repeat['Clean'].str.contains('omit', regex=False, case=False).any():
-                        tax_adjustment_90_day = unit_repeat['BNB_90_Day'].sum() + unit_repeat['VRBO_90_Day'].sum()
-                        amount_less_clean = unit_repeat[
-                                                'Income'].sum() - cleaning_fee * num_cleaning_fee - tax_adjustment_90_day
-                        total_amount += amount_less_clean
-                        hospitality_tax = 0.03 * amount_less_clean
-
-                    # If the customer has nothing to invoice, skip it
-                    if total_cleaning_fee == 0 and unit_repeat['Income'].sum() == 0:
-                        continue
-
-                    # Log sales taxes
-                    if not hospitality_tax == 0 and not isnan(tax):
-                        sales_entry_new = pd.DataFrame(
-                            [tax, round(amount_less_clean, 2), round(hospitality_tax / 2, 2),
-                             round(hospitality_tax / 2, 2),
-                             round(hospitality_tax, 2)])
-                        sales_entry = pd.concat([sales_entry, sales_entry_new.transpose()], ignore_index=True)
-                    elif isnan(tax):
-                        tax_issues = pd.concat([tax_issues, unit_repeat], ignore_index=True)
-
-                    # Log Cleaning Fee
-                    if not un_invoiced:
-                        # Was there a cleaning fee already reported for this customer? If so add this to what is listed
-                        # already.
-                        if not entry.empty:
-                            prev_cleaning = entry[entry[1].str.contains(customer_name, regex=False)]
-                            prev_cleaning = prev_cleaning[prev_cleaning[5].str.contains('CLEANING', regex=False)]
-                            prev_cleaning = prev_cleaning[prev_cleaning[8] == clean]
-
-                        if prev_cleaning.empty:
-                            if not unit_repeat['Clean'].str.contains('del', regex=False, case=False).any():
-                                cleaning_written = True
-                                clean_count += 1
-                                entry_new = pd.DataFrame(
-                                    [invoice_no, unit_repeat['Customer'].iloc[0], invoice_date, due_date, '', item[0],
-                                     item[0],
-                                     num_cleaning_fee,
-                                     round(cleaning_fee, 2), round(cleaning_fee * num_cleaning_fee, 2), tax,
-                                     invoice_date])
-                                entry = pd.concat([entry, entry_new.transpose()], ignore_index=True)
-                        else:
-                            cleaning_written = True
-                            new_cleaning_number = entry.loc[prev_cleaning.index, 7].iloc[0] + num_cleaning_fee
-                            new_cleaning_amount = new_cleaning_number * clean
-                            entry.loc[prev_cleaning.index, 7] = new_cleaning_number
-                            entry.loc[prev_cleaning.index, 9] = new_cleaning_amount
-
-                # If any fee is below 0, then make them 0.
-                total_amount = max(0, total_amount)
-
-                # If the customer has nothing to invoice, skip it
-                if total_cleaning_fee == 0 and total_amount == 0:
-                    continue
-
-            # If the customer has nothing to invoice, skip it
-            if total_cleaning_fee == 0 and total_amount == 0 and tax_adjustment_90_day == 0 \
-                    and unit_loop['VRBO_PAYOUT'].sum() == 0:
-                continue
-
-            if not isnan(unit_loop['Expense'].iloc[0]):
-                expense = unit_loop['Expense'].iloc[0]
-            # Management fee
-            total_management = income_total - total_cleaning_fee - expense
-            man_rate = unit_loop['Magpercent'].iloc[0]
-            if isnan(man_rate):
-                if unit_loop['Management'].str.contains('omit', regex=False, case=False).any():
-                    man_rate = 0.00
-                else:
-                    man_issues = pd.concat([man_issues, unit_loop], ignore_index=True)
-            management_fee = 0.01 * man_rate * total_management
-            if management_fee < 0.00:
-                management_fee = 0.00
-
-            # If any fee is below 0, then make them 0.
-            total_management = max(0, total_management)
-
-            # Create the memo
-            # Change formatting of memo values
-            income_memo = '${0:,.2f}'.format(round(income_total, 2))
-            expense_memo = '${0:,.2f}'.format(round(expense, 2))
-            cleaning_memo = '${0:,.2f}'.format(round(total_cleaning_fee, 2))
-            total_memo = '${0:,.2f}'.format(round(total_management, 2))
-            manage_memo = '${0:,.2f}'.format(round(management_fee, 2))
-
-            # If cleaning fee or expenses are 0, do not include in memo
-            memo = 'INCOME ' + income_memo
-            if total_cleaning_fee != 0:
-                memo += ' - CLEANING ' + cleaning_memo
-            if expense != 0:
-                memo += ' - EXPENSES ' + expense_memo
-            memo += ' = ' + total_memo + ' | MANAGEMENT FEE ' + str(man_rate) + '% --> ' + manage_memo
-
-            # Place the memo in the cleaning fee and hospitality tax sections
-            if cleaning_written:
-                entry.iloc[-1, 4] = memo
-                for cl in (n + 2 for n in range(clean_count - 1)):
-                    entry.iloc[-cl, 4] = memo
-
-            # Log Management Fee
-            tax_location = entry.iloc[-1, 10]
-            if not unit_loop['Management'].iloc[0] == 'omit':
-                if not unit_loop['Management'].str.contains('del', regex=False, case=False).any():
-                    entry_new = pd.DataFrame(
-                        [invoice_no, customer_name, invoice_date, due_date, memo, item[2], item[2], 0.01 * man_rate,
-                         round(total_management, 2), round(management_fee, 2), tax_location, invoice_date])
-                    entry = pd.concat([entry, entry_new.transpose()], ignore_index=True)
-
-            # Log Pest Control Fee
-            if not unit_loop['Pest'].isnull().values.all():
-                pest_fee = unit_loop['Pest'].sum()
-                entry_new = pd.DataFrame(
-                    [invoice_no, customer_name, invoice_date, due_date, memo, 'SERVICES', 'PEST CONTROL', 1,
-                     round(pest_fee, 2), round(pest_fee, 2), tax_location, invoice_date])
-                entry = pd.concat([entry, entry_new.transpose()], ignore_index=True)
-
-            # Log Landscaping Fee
-            if not unit_loop['Landscape'].isnull().values.all():
-                landscaping_fee = unit_loop['Landscape'].sum()
-                entry_new = pd.DataFrame(
-                    [invoice_no, customer_name, invoice_date, due_date, memo, 'SERVICES', 'LANDSCAPING', 1,
-                     round(landscaping_fee, 2), round(landscaping_fee, 2), tax_location, invoice_date])
-                entry = pd.concat([entry, entry_new.transpose()], ignore_index=True)
-
-            # Log Internet/Cable Fee
-            if not unit_loop['Internet/Cable'].isnull().values.all():
-                cable_fee = unit_loop['Internet/Cable'].sum()
-                entry_new = pd.DataFrame(
-                    [invoice_no, customer_name, invoice_date, due_date, memo, 'SERVICES', 'INTERNET_CABLE', 1,
-                     round(cable_fee, 2), round(cable_fee, 2), tax_location, invoice_date])
-                entry = pd.concat([entry, entry_new.transpose()], ignore_index=True)
-
-            # Log Pest Control Fee
-            if not unit_loop['Bus_Lic'].isnull().values.all():
-                bus_lic = unit_loop['Bus_Lic'].sum()
-                entry_new = pd.DataFrame(
-                    [invoice_no, customer_name, invoice_date, due_date, memo, 'SERVICES', 'BUSINESS LICENSE', 1,
-                     round(bus_lic, 2), round(bus_lic, 2), tax_location, invoice_date])
-                entry = pd.concat([entry, entry_new.transpose()], ignore_index=True)
-
-            # Credit Memo/Checks
-            if (unit_loop['CreditMemo'] == 'CM').any():
-                # Create item description for Credit Memo
-                item_cm = 'Deposits in Trust'
-                item_cm_desc = 'Funds Collected on Behalf of Client'
-
-                # Log Credit Memo
-                credit_memo_new = pd.DataFrame(
-                    [invoice_no, customer_name, invoice_date, invoice_date, item_cm, item_cm_desc,
-                     1, round(income_total, 2), round(income_total, 2), tax_location])
-                credit_memo = pd.concat([credit_memo, credit_memo_new.transpose()], ignore_index=True)
-
-                # Sales Receipts
-                item_sr = 'TRUST Clearing Account'
-                bnb_sales = False
-                vrbo_sales = False
-                bnb_income = unit_loop['Income'].sum()
-                vrbo_income = unit_loop['VRBO_PAYOUT'].sum()
-                total_sale_amt = round(bnb_income + vrbo_income, 2)
-                if not bnb_income == 0.0:
-                    bnb_sales = True
-                if not vrbo_income == 0.0:
-                    vrbo_sales = True
-                if bnb_sales and not vrbo_sales:
-                    pmnt_meth = 'AirBNB'
-                elif not bnb_sales and vrbo_sales:
-                    pmnt_meth = 'VRBO'
-                elif bnb_sales and vrbo_sales:
-                    pmnt_meth = 'BOTH'
-                else:
-                    pmnt_meth = ''
-
-                bnb_income = '${0:,.2f}'.format(round(bnb_income, 2))
-                vrbo_income = '${0:,.2f}'.format(round(vrbo_income, 2))
-                sales_msg = f'Receipt income in trust from - AirBNB Amount: {bnb_income} | VRBO Amount: {vrbo_income}'
-                line_itm = 'Deposits in Trust'
-
-                # Log Sales Receipts
-                sr_new = pd.DataFrame(
-                    [invoice_no, customer_name, invoice_date, tax_location, item_sr, pmnt_meth,
-                     sales_msg, 'N', 'N', invoice_date, line_itm, sales_msg, 1, total_sale_amt, total_sale_amt, 'NON'])
-                sales_receipts = pd.concat([sales_receipts, sr_new.transpose()], ignore_index=True)
-
-                # Checks
-                # Reference number
-                ref_num = 'ABB TR ' + f'{check_no:05d}'
-                # Bank Account
-                bank = 'ABB Trust #5241'
-
-                # Expense descriptions
-                expense_desc_object = datetime.strptime(str(month), '%m')
-                expense_desc_month = expense_desc_object.strftime('%B')
-                expense_desc = expense_desc_month + ' Earning'
-                expense_acc = 'Accounts Receivable (A/R)'
-
-                # Create an expense amount by taking the total income and subtracting the total cleaning fees, the
-                # hospitality tax and the management fee.
-                total_invoice = round(
-                    total_cleaning_fee + management_fee + pest_fee + bus_lic + landscaping_fee + cable_fee,
-                    2)
-                expense_amt = income_total - total_invoice
-
-                # Memo
-                income_check_memo = '${0:,.2f}'.format(round(income_total, 2))
-                total_invoice_memo = '${0:,.2f}'.format(round(total_invoice, 2))
-                expense_check_memo = '${0:,.2f}'.format(round(expense_amt, 2))
-                private_note = 'INCOME ' + income_check_memo + ' - CREDIT MEMO APPLIED TO INVOICE ' + total_invoice_memo + \
-                               ' = MONTHLY EARNINGS ' + expense_check_memo
-
-                checks_new = pd.DataFrame(
-                    [ref_num, bank, invoice_date, customer_name, expense_amt, private_note, expense_desc,
-                     expense_acc])
-                checks = pd.concat([checks, checks_new.transpose()], ignore_index=True)
-                check_no += 1
-
-                # Journal Entries
-                ref_num = 'PMT ' + f'{journal_no:05d}'
-                customer = unit_loop['Customer'].iloc[0]
-                prvt_note = f'Payment {customer} to #{invoice_no}'
-                debit_acct = 'Accounts Receivable (A/R)'
-                credit_acct = 'ABB Trust #5241'
-
-                # Log Journal Entries
-                # Debit
-                je_new = pd.DataFrame(
-                    [ref_num, invoice_date, prvt_note, 'False', debit_acct, total_invoice, debit_acct, tax_location,
-                     customer])
-                journal_entries = pd.concat([journal_entries, je_new.transpose()], ignore_index=True)
-                # Credit
-                je_new = pd.DataFrame(
-                    [ref_num, invoice_date, prvt_note, 'False', credit_acct, -total_invoice, credit_acct, tax_location,
-                     customer])
-                journal_entries = pd.concat([journal_entries, je_new.transpose()], ignore_index=True)
-                journal_no += 1
-
-        if ug == 0:
-            entry_CM = entry
-        elif ug == 1:
-            entry_NCM = entry
-        else:
-            app.log('There was an error separating by CM!!! Have Steven look into it please!')
-
-    # Save the final invoice number
-    reference_number_write(invoice_no - 1, check_no, journal_no, month, year)
-
-    # Create field names for entry and sales_entry
-    entry_CM.columns = ['RefNumber', 'Customer', 'TxnDate', 'DueDate', 'Msg', 'LineItem', 'LineDesc', 'LineQty',
-                        'LineUnitPrice', 'LineAmount', 'Location', 'LineServiceDate']
-    entry_NCM.columns = ['RefNumber', 'Customer', 'TxnDate', 'DueDate', 'Msg', 'LineItem', 'LineDesc', 'LineQty',
-                         'LineUnitPrice', 'LineAmount', 'Location', 'LineServiceDate']
-    sales_entry.columns = ['Tax_Location', 'Income', 'Municipality', 'County', 'Hospitality_Tax']
-
-    # Create field names for credit_memo and checks
-    credit_memo.columns = ['RefNumber', 'Customer', 'TxnDate', 'LineServiceDate', 'LineItem', 'LineDesc',
-                           'LineQty', 'LineUnitPrice', 'LineAmount', 'Location']
-    checks.columns = ['RefNumber', 'BankAccount', 'TxnDate', 'Vendor', 'ExpenseAmount', 'PrivateNote', 'ExpenseDesc',
-                      'ExpenseAccount']
-    sales_receipts.columns = ['RefNumber', 'Customer', 'TxnDate', 'Location', 'BankAccount', 'PaymentMethod', 'Msg',
-                              'ToBePrinted', 'ToBeEmailed', 'LineServiceDate', 'LineItem', 'LineDesc', 'LineQty',
-                              'LineUnitPrice', 'LineAmount', 'LineTaxable']
-    journal_entries.columns = ['RefNumber', 'TxnDate', 'PrivateNote', 'IsAdjustment', 'Account', 'LineAmount',
-                               'LineDesc', 'Location', 'Entity']
-
-    # Change data type and apply formatting to specific columns
-    entry_CM['LineUnitPrice'] = entry_CM['LineUnitPrice'].astype(float)  # ItemRate
-    entry_CM['LineAmount'] = entry_CM['LineAmount'].astype(float)  # ItemAmount
-    entry_NCM['LineUnitPrice'] = entry_NCM['LineUnitPrice'].astype(float)  # ItemRate
-    entry_NCM['LineAmount'] = entry_NCM['LineAmount'].astype(float)  # ItemAmount
-    credit_memo['LineUnitPrice'] = credit_memo['LineUnitPrice'].astype(float)  # ItemRate
-    credit_memo['LineAmount'] = credit_memo['LineAmount'].astype(float)  # ItemAmount
-    checks['ExpenseAmount'] = checks['ExpenseAmount'].astype(float)  # Expense Amount
-
-    # For the sales sheet, create a unique list of Tax Locations and sum all corresponding elements
-    unique_sales = sales_entry['Tax_Location'].unique()
-
-    fin_sales = pd.DataFrame()
-    num_updates = len(unique_sales)
-    progress_vals = np.linspace(95, 100, num=num_updates)
-    update_idx = 0
-    for i in unique_sales:
-        app.progress_bar["value"] = int(progress_vals[update_idx])
-        app.progress_bar.update()
-        update_idx += 1
-
-        sales_idx = sales_entry[sales_entry['Tax_Location'] == i]
-
-        # Sum the values
-        s_inc = sales_idx['Income'].sum()
-        s_mun = sales_idx['Municipality'].sum()
-        s_co = sales_idx['County'].sum()
-        s_hosp = sales_idx['Hospitality_Tax'].sum()
-        t_loc = sales_idx['Tax_Location'].iloc[0]
-
-        # Create the final sales data array from these values
-        new_s = pd.DataFrame([t_loc, s_inc, s_mun, s_co, s_hosp])
-        fin_sales = pd.concat([fin_sales, new_s.transpose()], ignore_index=True)
-
-    fin_sales.columns = sales_entry.columns
-
-    # When writing to excel, format the data columns with accounting format for easier viewing.
-    # Create a Pandas Excel writer using XlsxWriter as the engine.
-    writer = pd.ExcelWriter(path + '\\' + finish, engine='xlsxwriter')
-
-    with pd.ExcelWriter(path + '\\' + finish, engine='xlsxwriter') as writer:
-        # Convert the dataframe to an XlsxWriter Excel object.
-        for i in sheet_names:
-
-            # Define a function to automatically fit columns
-            def get_col_widths(df, sn):
-
-                xl_sht_name = str(sn)
-
-                for col in df:
-                    column_wid = max(df[col].astype(str).map(len).max(), len(col))
-                    col_index = df.columns.get_loc(col)
-                    writer.sheets[xl_sht_name].set_column(col_index, col_index, math.ceil(column_wid * 1.25))
-
-            if i == 'Invoices':
-                entry_NCM.to_excel(writer, index=False, sheet_name=i)
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
-
-                # Auto-adjust columns' width
-                get_col_widths(entry_NCM, i)
-
-            elif i == 'Credit_Memo_Invoices':
-                entry_CM.to_excel(writer, index=False, sheet_name=i)
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
-
-                # Auto-adjust columns' width
-                get_col_widths(entry_CM, i)
-
-            elif i == 'Credit_Memos_fields':
-                credit_memo.to_excel(writer, index=False, sheet_name=i)
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
-
-                # Auto-adjust columns' width
-                get_col_widths(credit_memo, i)
-
-            elif i == 'Checks_fields':
-                checks.to_excel(writer, index=False, sheet_name=i)
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
-
-                # Auto-adjust columns' width
-                get_col_widths(checks, i)
-
-            elif i == 'Sales_tax_fields':
-                fin_sales.to_excel(writer, index=False, sheet_name=i)
-
-                # Get the xlsxwriter workbook and worksheet objects.
-                workbook = writer.book
-                worksheet = writer.sheets[i]
-
-                # Add some cell formats.
-                format_col = workbook.add_format({'num_format': '_($* #,##0.00_);_($* (#,##0.00);_($* "-"??_);_(@_)'})
-
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
-
-                # Format Accounting cells
-                worksheet.set_column(1, 4, 18, format_col)
-                worksheet.set_column(0, 0, 12)
-
-            elif i == 'Sales_Receipts':
-                sales_receipts.to_excel(writer, index=False, sheet_name=i)
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
-
-                # Auto-adjust columns' width
-                get_col_widths(sales_receipts, i)
-
-            elif i == 'Journal_Entries':
-                journal_entries.to_excel(writer, index=False, sheet_name=i)
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
-
-                # Auto-adjust columns' width
-                get_col_widths(journal_entries, i)
-
-            # If there needs to be a sheet containing missing information, place here:
-            if not listing_diff.empty:
-                # Provide an explanation
-                list_exp = 'Listing was found in bnb but it was not found in Cleaning Fee Report'
-                listing_diff = explanation_missing(listing_diff, list_exp)
-
-                listing_diff.to_excel(writer, index=False, sheet_name='Missing Listings')
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
-
-                # Auto-adjust columns' width
-                get_col_widths(listing_diff, 'Missing Listings')
-
-            if not customer_diff.empty:
-                # Provide an explanation
-                customer_exp = 'Customer was found in Cleaning Fee Report but it was not found in Customer Report'
-                customer_diff = explanation_missing(customer_diff, customer_exp)
-
-                customer_diff.to_excel(writer, index=False, sheet_name='Missing Customer')
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
+                append_to_warehouse(warehouse_dir, year, month, tables)
+                stage['rows_out'] = sum(len(df) for df in tables.values())
+            except ImportError as error:
+                app.log(f'{error}. The month was not added to the warehouse.')
 
-                # Auto-adjust columns' width
-                get_col_widths(customer_diff, 'Missing Customer')
+    # Keep the timings of the run next to its output, so a slow month can be traced to the stage that regressed
+    timer.write_report(os.path.join(path, 'run_report.json'))
+    app.log('Stage timings:\n' + timer.format_table(), True)
 
-            if not man_issues.empty:
-                # Provide an explanation
-                management_exp = 'The Management Percent (Magpercent) is empty and there is no "omit" in the ' \
-                                 'Management column.'
-                man_issues = explanation_missing(man_issues, management_exp)
-
-                man_issues.to_excel(writer, index=False, sheet_name='Missing Management')
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
-
-                # Auto-adjust columns' width
-                get_col_widths(man_issues, 'Missing Management')
-
-            if not tax_issues.empty:
-                # Provide an explanation
-                tax_exp = 'The Tax Location (TaxLocation) is empty and there is no "omit" in the Hosp column.'
-                tax_issues = explanation_missing(tax_issues, tax_exp)
-
-                tax_issues.to_excel(writer, index=False, sheet_name='Missing Tax Location')
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
-
-                # Auto-adjust columns' width
-                get_col_widths(tax_issues, 'Missing Tax Location')
-
-            if not vrbo_diff.empty:
-                # Provide an explanation
-                vrbo_exp = 'These VRBO entries did not have a customer attached to the ID, so their payouts were ' \
-                           'not invoiced.'
-                vrbo_diff = explanation_missing(vrbo_diff, vrbo_exp)
-
-                vrbo_diff.to_excel(writer, index=False, sheet_name='Missing VRBO')
-                # Note: It isn't possible to format any cells that already have a format such
-                # as the index or headers or any cells that contain dates or datetimes.
+    return path, month_name
 
-                # Auto-adjust columns' width
-                get_col_widths(tax_issues, 'Missing VRBO')
 
-    return path, month_name
+def line_invoice_batch(app, months, model_dir=None, write_excel=True, export_format='xlsx', parallel=False,
+                       numbers_file=None, trace_memory=False, workspace=None):
+    """
+    Invoice a range of months in one go, e.g. to reprocess a quarter after a rate correction.
+
+    The exports of each month are read from a <year>-<month> folder of the model directory, e.g. ModelFiles/2023-04,
+    while Current.xlsx is read once from the model directory itself and shared by every month. The months are
+    invoiced in order, each continuing the invoice, check and journal numbers of the one before and seeing the VRBO
+    stays carried over from it. With parallel, the exports of every month are read up front by a pool of worker
+    processes, so the months themselves are served from the workbook cache.
+
+    Args:
+        app: Progress sink, see line_invoice_generation.
+        months (list): (month, year) tuples to invoice, in order. See month_range.
+        model_dir (str, optional): Directory holding Current.xlsx and the month folders. Defaults to the
+            workspace's ModelFiles.
+        write_excel (bool, optional): Write the invoice tables, save the next reference numbers and update the stored
+            VRBO carry-overs. Without it the numbers and carry-overs are still threaded from month to month, through
+            temporary copies, numbers_file and the store are left unchanged, and each month's report files are
+            written to a temporary folder. Defaults to True.
+        export_format (str, optional): See line_invoice_generation. Defaults to 'xlsx'.
+        parallel (bool, optional): Read the exports of all months at once before invoicing. Defaults to False.
+        numbers_file (str, optional): File holding the numbers the first month starts from. Defaults to the
+            workspace's ref_number_values.txt.
+        trace_memory (bool, optional): Measure the peak memory of each stage. Defaults to False.
+        workspace (Workspace, optional): Portfolio directory, see line_invoice_generation. Defaults to the working
+            directory.
+
+    Returns:
+        list: (report directory, month name) of each month.
+    """
+    workspace = workspace or Workspace(os.getcwd())
+    numbers_file = numbers_file or workspace.numbers_file
+    filepath = model_dir or workspace.model_dir
+    exports_dirs = [os.path.join(filepath, f'{year}-{month:02d}') for month, year in months]
+    missing = [exports_dir for exports_dir in exports_dirs if not os.path.isdir(exports_dir)]
+    if missing:
+        raise FileNotFoundError('No exports found for ' + ', '.join(missing))
+
+    if parallel:
+        app.log('Reading the exports of every month...')
+        warm_workbook_cache(exports_dirs, ['reservations', 'airbnb', 'VRBO_'], workspace.cache_dir)
+    reference_frames, current_file = load_reference_data(app, filepath, workspace.cache_dir)
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        vrbo_dir = filepath
+        if not write_excel:
+            # Thread the numbers and the VRBO carry-overs through scratch copies, so a trial batch leaves the saved
+            # ones unchanged. Without a numbers file the starting numbers are asked for once.
+            scratch_numbers = os.path.join(scratch_dir, NUMBERS_FILE_NAME)
+            write_reference_numbers(*read_reference_numbers(numbers_file), *months[0], scratch_numbers)
+            numbers_file = scratch_numbers
+            vrbo_dir = copy_vrbo_store(filepath, scratch_dir)
+
+        for (month, year), exports_dir in zip(months, exports_dirs):
+            app.log(f'=== {month_number_to_name(month)} {year} ===', True)
+            path, month_name = line_invoice_generation(
+                app, model_dir=filepath, month=month, year=year, write_excel=write_excel,
+                timer=StageTimer(trace_memory=trace_memory), export_format=export_format, exports_dir=exports_dir,
+                reference_frames=reference_frames, numbers_file=numbers_file, save_numbers=True, workspace=workspace,
+                vrbo_dir=vrbo_dir)
+            if current_file:
+                shutil.copyfile(current_file, os.path.join(path, os.path.basename(current_file)))
+            results.append((path, month_name))
+    return results
+
+
+def invoice_workspace(workspace, month=None, year=None, write_excel=True, export_format='xlsx', trace_memory=False):
+    """
+    Invoice one workspace, logging to its line_auto.log. Runs inside the worker processes of run_workspaces, so a
+    failure is returned instead of raised. A workspace missing its model directory or reference numbers file is not
+    run, since the numbers cannot be asked for from a worker process.
+
+    Args:
+        workspace (Workspace): Portfolio to invoice.
+        month (int, optional): Month to invoice. Defaults to the month in the workspace's Airbnb file name.
+        year (int, optional): Year of month. Required when month is given.
+        write_excel (bool, optional): See line_invoice_generation. Defaults to True.
+        export_format (str, optional): See line_invoice_generation. Defaults to 'xlsx'.
+        trace_memory (bool, optional): Measure the peak memory of each stage. Defaults to False.
+
+    Returns:
+        dict: The workspace root, report directory, month name and seconds taken, and the error if it failed: the
+            traceback, or what the workspace is missing.
+    """
+    result = {'workspace': workspace.root, 'path': None, 'month_name': None, 'error': None, 'seconds': 0.0}
+    missing = workspace.missing_inputs()
+    if missing:
+        result['error'] = '; '.join(missing)
+        return result
+
+    start = time.perf_counter()
+    with open(workspace.log_file, 'a', encoding='utf-8') as log:
+        reporter = ConsoleReporter(stream=log, show_progress=False)
+        try:
+            result['path'], result['month_name'] = line_invoice_generation(
+                reporter, month=month, year=year, write_excel=write_excel, timer=StageTimer(trace_memory=trace_memory),
+                export_format=export_format, workspace=workspace)
+        except Exception:
+            result['error'] = traceback.format_exc()
+            reporter.log(result['error'])
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_workspaces(app, workspaces, month=None, year=None, write_excel=True, export_format='xlsx', max_workers=None,
+                   trace_memory=False):
+    """
+    Invoice several portfolios at once, each workspace in its own worker process.
+
+    Workspaces share nothing: each has its own input files, report folders, reference numbers, VRBO carry-overs,
+    workbook cache and warehouse, and each run logs to the line_auto.log of its workspace. A portfolio that fails
+    does not stop the others; its traceback is returned with the results.
+
+    Args:
+        app: Progress sink, told as each workspace finishes.
+        workspaces (list): Workspace objects, or their root directories. See find_workspaces.
+        month (int, optional): Month to invoice. Defaults to the month in each workspace's Airbnb file name.
+        year (int, optional): Year of month. Required when month is given.
+        write_excel (bool, optional): See line_invoice_generation. Defaults to True.
+        export_format (str, optional): See line_invoice_generation. Defaults to 'xlsx'.
+        max_workers (int, optional): Number of worker processes. Defaults to one per workspace, up to the CPU count.
+            1 invoices the workspaces one after the other in this process.
+        trace_memory (bool, optional): Measure the peak memory of each stage. Defaults to False.
+
+    Returns:
+        list: Result of each workspace, in the order given, see invoice_workspace.
+    """
+    workspaces = [workspace if isinstance(workspace, Workspace) else Workspace(workspace) for workspace in workspaces]
+    roots = [workspace.root for workspace in workspaces]
+    if len(set(roots)) != len(roots):
+        raise ValueError('A workspace was given more than once, its runs would overwrite each other.')
+    if not workspaces:
+        return []
+
+    options = (month, year, write_excel, export_format, trace_memory)
+    max_workers = max_workers or min(len(workspaces), os.cpu_count() or 1)
+    results = {}
+    if max_workers == 1:
+        for workspace in workspaces:
+            results[workspace.root] = invoice_workspace(workspace, *options)
+            _log_workspace_result(app, results[workspace.root])
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(invoice_workspace, workspace, *options) for workspace in workspaces]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result['workspace']] = result
+                _log_workspace_result(app, result)
+    return [results[root] for root in roots]
+
+
+def _log_workspace_result(app, result):
+    if result['error']:
+        reason = result['error'].strip()
+        if reason.startswith('Traceback'):
+            reason = f'{reason.splitlines()[-1]}, see {os.path.join(result["workspace"], LOG_FILE_NAME)}'
+        app.log(f'{result["workspace"]} failed: {reason}')
+    else:
+        app.log(f'{result["workspace"]}: {result["month_name"]} invoiced in {result["seconds"]}s ({result["path"]})')
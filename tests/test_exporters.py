@@ -0,0 +1,21 @@
+import csv
+import os
+
+import pandas as pd
+
+from helpful_tools.exporters import CsvExporter
+from helpful_tools.invoice_processing import INVOICE_COLUMNS, money_column_positions
+
+
+def test_csv_invoice_amounts_have_two_decimals(tmp_path):
+    invoices = pd.DataFrame([[30001, 'Jane Doe', '04/30/2023', '05/15/2023', '', 'CLEANING FEE', 'CLEANING FEE', 1,
+                              89.0, 89.0, 'MB', '04/30/2023']], columns=INVOICE_COLUMNS)
+
+    with CsvExporter(str(tmp_path), 'April') as exporter:
+        exporter.write_table('Invoices', invoices, money_columns=money_column_positions(invoices))
+
+    with open(os.path.join(exporter.location, 'Invoices.csv'), newline='') as file:
+        row = next(csv.DictReader(file))
+    assert row['LineUnitPrice'] == '89.00'
+    assert row['LineAmount'] == '89.00'
+    assert row['LineQty'] == '1'
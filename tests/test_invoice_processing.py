@@ -0,0 +1,48 @@
+import pandas as pd
+
+from helpful_tools.customer_data_aggregation import sort_and_prepare_unit
+from helpful_tools.invoice_processing import process_invoices
+from helpful_tools.progress import NullReporter
+from helpful_tools.sales_tax import build_tax_rates
+
+
+def unit_row(customer, listing, tax_location, income, cleaning_fee=89.0, checkouts=1, **overrides):
+    row = {'Customer': customer, 'Listing': listing, 'Income': income, 'CleaningFee': cleaning_fee,
+           'Checkouts': checkouts, 'TaxLocation': tax_location, 'Pest': float('nan'), 'Landscape': float('nan'),
+           'Internet/Cable': float('nan'), 'Bus_Lic': float('nan'), 'Expense': float('nan'), 'CreditMemo': None,
+           'Clean': 'yes', 'Hosp': 'yes', 'Management': 'yes', 'Magpercent': 15.0, 'VRBO_ID': 'none',
+           'VRBO_PAYOUT': 0.0, 'VRBO_Nights': 0, 'Code': 'C1', 'BNB_90_Day': 0.0, 'VRBO_90_Day': 0.0}
+    row.update(overrides)
+    return row
+
+
+def test_management_line_takes_the_location_of_the_last_tax_partition():
+    unit = sort_and_prepare_unit(pd.DataFrame([
+        unit_row('Jane Doe', 'Beach House', 'MB', 500.0),
+        unit_row('Jane Doe', 'Lake House', 'NMB', 700.0, cleaning_fee=120.0),
+    ]))
+
+    tables, _ = process_invoices(NullReporter(), unit, '04/30/2023', '05/15/2023', 4, 30000, 1, 1,
+                                 build_tax_rates())
+
+    invoices = tables['entry_NCM']
+    cleaning = invoices[invoices['LineItem'] == 'CLEANING FEE']
+    management = invoices[invoices['LineItem'] == 'MANAGEMENT FEE']
+    assert list(cleaning['Location']) == ['MB', 'NMB']
+    assert list(management['Location']) == ['NMB']
+
+
+def test_customer_without_cleaning_lines_does_not_take_another_customers_location():
+    unit = sort_and_prepare_unit(pd.DataFrame([
+        unit_row('Adam Owner', 'Cottage', 'COUNTY', 400.0, Clean='omit', Hosp='omit', Management='omit',
+                 Pest=25.0),
+        unit_row('Beth Owner', 'Villa', 'MB', 600.0),
+    ]))
+
+    tables, _ = process_invoices(NullReporter(), unit, '04/30/2023', '05/15/2023', 4, 30000, 1, 1,
+                                 build_tax_rates())
+
+    invoices = tables['entry_NCM']
+    adam = invoices[invoices['Customer'] == 'Adam Owner']
+    assert not adam.empty
+    assert set(adam['Location']) == {'COUNTY'}
@@ -0,0 +1,15 @@
+import queue
+from datetime import datetime
+
+from helpful_tools.progress import QueueReporter
+
+
+def test_log_events_carry_the_time_they_were_posted():
+    events = queue.Queue()
+    before = datetime.now()
+    QueueReporter(events).log('Loading files...')
+    after = datetime.now()
+
+    kind, message, no_time, logged_at = events.get_nowait()
+    assert (kind, message, no_time) == ('log', 'Loading files...', False)
+    assert before <= logged_at <= after
@@ -0,0 +1,14 @@
+import os
+
+import supporting_strat_auto as ssa
+from helpful_tools.workspace import MODEL_DIR_NAME, Workspace
+
+
+def test_workspace_without_numbers_file_is_reported_not_run(tmp_path):
+    os.makedirs(tmp_path / MODEL_DIR_NAME)
+
+    result = ssa.invoice_workspace(Workspace(str(tmp_path)))
+
+    assert result['error'] == f'ref_number_values.txt missing in {tmp_path}'
+    assert result['path'] is None
+    assert not os.path.exists(tmp_path / 'line_auto.log')